@@ -0,0 +1,113 @@
+"""Compare cold and warm latency of the local conversation cache.
+
+Usage:
+    python benchmarks/bench_cache.py [--live [CONVERSATION_UUID]] [--latency MS] [--bandwidth MB/s] [--messages N]
+
+By default the network is simulated with a fixed round-trip latency and
+bandwidth, serving a synthetic conversation of N messages. With --live the active account is used
+against claude.ai (the active conversation unless a UUID is given).
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.cache as cache
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.status_code = 200
+        self._data = data
+    
+    def json(self):
+        return self._data
+
+
+class FakeSession:
+    """Pretends to be claude.ai with a fixed round-trip time"""
+    
+    def __init__(self, conversation, latency, bandwidth):
+        self.conversation = conversation
+        self.latency = latency
+        self.bandwidth = bandwidth
+    
+    def get(self, url, **kwargs):
+        if '/chat_conversations?' in url:
+            data = [{'uuid': self.conversation['uuid'], 'updated_at': self.conversation['updated_at']}]
+        else:
+            data = self.conversation
+        time.sleep(self.latency + len(json.dumps(data)) / self.bandwidth)
+        return FakeResponse(data)
+
+
+def synthetic_conversation(messages):
+    return {
+        'uuid': 'bench-0000',
+        'name': 'Benchmark conversation',
+        'updated_at': '2026-01-01T00:00:00Z',
+        'chat_messages': [
+            {
+                'uuid': f'msg-{i}',
+                'sender': 'human' if i % 2 == 0 else 'assistant',
+                'content': [{'type': 'text', 'text': f'Message {i} ' + 'lorem ipsum dolor sit amet ' * 40}],
+            }
+            for i in range(messages)
+        ],
+    }
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(argv):
+    latency = 0.25
+    bandwidth = 5e6
+    messages = 400
+    live = '--live' in argv
+    if '--latency' in argv:
+        latency = float(argv[argv.index('--latency') + 1]) / 1000
+    if '--bandwidth' in argv:
+        bandwidth = float(argv[argv.index('--bandwidth') + 1]) * 1e6
+    if '--messages' in argv:
+        messages = int(argv[argv.index('--messages') + 1])
+    
+    if live:
+        from src.helpers import get_active_session, get_active_conversation
+        session, org_id = get_active_session()
+        i = argv.index('--live')
+        conversation_uuid = argv[i + 1] if len(argv) > i + 1 and not argv[i + 1].startswith('--') else get_active_conversation()
+        if not session or not conversation_uuid:
+            sys.exit("No active account or conversation")
+    else:
+        conversation = synthetic_conversation(messages)
+        session, org_id, conversation_uuid = FakeSession(conversation, latency, bandwidth), 'bench-org', conversation['uuid']
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache._cache = cache.ConversationCache(os.path.join(tmp, 'cache.db'))
+        
+        def fetch(**kwargs):
+            response = cache.get_conversation_details(session, org_id, conversation_uuid, **kwargs)
+            assert response.status_code == 200, response.status_code
+        
+        cold = timed(fetch)
+        cache.forget_listings()
+        warm = timed(fetch)
+        memo = timed(fetch)
+        offline = timed(lambda: fetch(offline=True))
+        cache._cache.close()
+    
+    print(f"cold (full download + store):        {cold:8.1f} ms")
+    print(f"warm (list revalidation + cache hit): {warm:8.1f} ms")
+    print(f"warm (already revalidated):          {memo:8.1f} ms")
+    print(f"offline (cache only):                {offline:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
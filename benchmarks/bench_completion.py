@@ -0,0 +1,95 @@
+"""Measure shell completion latency and fail when it exceeds a budget.
+
+Usage:
+    python benchmarks/bench_completion.py [--budget MS] [--runs N] [--conversations N]
+
+Each case runs the CLI in a fresh interpreter, the way a shell does on
+TAB, against a temporary directory holding auth.json, config.json and a
+metadata cache of N conversations. Interpreter startup is measured too and
+subtracted, so the budget covers only the CLI's own cost. Exits with
+status 1 when any fast-path case has a median above the budget.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.metadata import MetadataCache
+
+ORG_ID = '0f0f0f0f-0000-4000-8000-000000000000'
+
+# (words, index of the word being completed, answered by the fast path)
+CASES = [
+    ("claude sw", 1, True),
+    ("claude switch-account ", 2, True),
+    ("claude delete 00001", 2, True),
+    ("claude conversations conv", 2, True),
+    ("claude export choose md out -c 0000", 6, True),
+    ("claude export --", 2, False),
+]
+
+
+def write_state(directory, conversations):
+    with open(os.path.join(directory, 'auth.json'), 'w') as f:
+        json.dump({'work': f'sessionKey=x; lastActiveOrg={ORG_ID}', 'personal': 'lastActiveOrg=ffff'}, f)
+    with open(os.path.join(directory, 'config.json'), 'w') as f:
+        json.dump({'active_account': 'work'}, f)
+
+    metadata = MetadataCache(os.path.join(directory, 'metadata.db'))
+    regular = [
+        {'uuid': f'{i:08d}-0000-4000-8000-000000000000', 'name': f'Conversation {i} about topic {i % 50}',
+         'updated_at': f'2026-01-01T00:00:{i % 60:02d}Z'}
+        for i in range(conversations)
+    ]
+    metadata.store_listing(ORG_ID, regular, [])
+    metadata.close()
+
+
+def median_ms(args, env, cwd, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, env=env, cwd=cwd, stdout=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main(argv):
+    budget = 50.0
+    runs = 15
+    conversations = 2000
+    if '--budget' in argv:
+        budget = float(argv[argv.index('--budget') + 1])
+    if '--runs' in argv:
+        runs = int(argv[argv.index('--runs') + 1])
+    if '--conversations' in argv:
+        conversations = int(argv[argv.index('--conversations') + 1])
+
+    cli = [sys.executable, '-c', 'from src.cli import cli; cli(prog_name="claude")']
+    failed = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_state(tmp, conversations)
+        env = dict(os.environ, PYTHONPATH=ROOT, _CLAUDE_COMPLETE='bash_complete')
+        baseline = median_ms([sys.executable, '-c', 'pass'], env, tmp, runs)
+        print(f"interpreter startup: {baseline:6.1f} ms (subtracted below, budget {budget:.0f} ms)\n")
+
+        for words, cword, fast in CASES:
+            env.update(COMP_WORDS=words, COMP_CWORD=str(cword))
+            elapsed = median_ms(cli, env, tmp, runs) - baseline
+            over = fast and elapsed > budget
+            failed = failed or over
+            path = "fast " if fast else "click"
+            print(f"{path} {words!r:42} {elapsed:7.1f} ms{'  OVER BUDGET' if over else ''}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
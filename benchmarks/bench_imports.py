@@ -0,0 +1,146 @@
+"""Measure per-command import time and fail when a command exceeds its budget.
+
+Usage:
+    python benchmarks/bench_imports.py [--runs N] [--scale FACTOR] [--verbose]
+
+Each command runs in a fresh interpreter under `python -X importtime`,
+with output piped, against a temporary directory holding an account, an
+active conversation and a cached copy of it (so nothing touches the
+network). Runs of each command alternate with runs of a bare
+interpreter, and the median of the paired differences is the time spent
+importing modules beyond interpreter startup. Budgets grow with the
+startup time when this machine is slower than the one they were set on,
+and --scale multiplies them further. A command only fails when its median
+is over budget by more than HEADROOM and the spread of its own runs, so
+a noisy machine doesn't fail it. Modules listed as forbidden must not be
+imported at all, e.g. rich when output is piped. Exits with status 1 on
+any violation.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.cache import ConversationCache
+
+ORG_ID = '0f0f0f0f-0000-4000-8000-000000000000'
+CONVERSATION_UUID = '00000001-0000-4000-8000-000000000000'
+
+# (arguments, import budget in ms, modules that must not be imported)
+CASES = [
+    (['test'], 35, ['requests', 'rich', 'mimetypes']),
+    (['accounts'], 35, ['requests', 'rich', 'mimetypes']),
+    (['link'], 35, ['requests', 'rich', 'mimetypes']),
+    (['daemon', 'status'], 35, ['requests', 'rich', 'mimetypes']),
+    (['history', '--offline'], 150, ['rich']),
+    (['history', '--offline', '--raw'], 150, ['rich']),
+    (['search', 'sqlite', '--offline'], 150, ['rich']),
+    (['export', '--help'], 45, ['requests', 'rich']),
+    (['conversations', '--help'], 45, ['requests', 'rich']),
+    (['chat', '--help'], 45, ['requests', 'rich']),
+    (['batch', '--help'], 45, ['requests', 'rich']),
+]
+
+# Interpreter startup imports (ms) on the machine the budgets were set on
+REFERENCE_STARTUP = 50
+
+# Fraction of a budget a median may exceed it by before it counts
+HEADROOM = 0.15
+
+
+def write_state(directory):
+    with open(os.path.join(directory, 'auth.json'), 'w') as f:
+        json.dump({'bench': f'sessionKey=x; lastActiveOrg={ORG_ID}'}, f)
+    with open(os.path.join(directory, 'config.json'), 'w') as f:
+        json.dump({'active_account': 'bench', 'active_conversation': CONVERSATION_UUID}, f)
+
+    cache = ConversationCache(os.path.join(directory, 'cache.db'))
+    cache.put(ORG_ID, CONVERSATION_UUID, {
+        'uuid': CONVERSATION_UUID,
+        'name': 'Benchmark conversation',
+        'updated_at': '2026-01-01T00:00:00Z',
+        'chat_messages': [
+            {
+                'uuid': f'msg-{i}',
+                'sender': 'human' if i % 2 == 0 else 'assistant',
+                'content': [{'type': 'text', 'text': f'Message {i} about **sqlite** and `python`'}],
+            }
+            for i in range(20)
+        ],
+    })
+    cache.close()
+
+
+def import_profile(code, args, cwd, env):
+    """(total import ms, imported module names) of running code with args"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code, *args],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    total = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        # Only top-level imports; nested ones are part of their parent's cumulative time
+        if not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1000, modules
+
+
+def main(argv):
+    runs = 5
+    scale = 1.0
+    verbose = '--verbose' in argv
+    if '--runs' in argv:
+        runs = int(argv[argv.index('--runs') + 1])
+    if '--scale' in argv:
+        scale = float(argv[argv.index('--scale') + 1])
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        write_state(tmp)
+        env = dict(os.environ, PYTHONPATH=ROOT, CLAUDE_NO_DAEMON='1')
+        import_profile('pass', [], tmp, env)
+        startups = []
+
+        for args, budget, forbidden in CASES:
+            differences = []
+            modules = set()
+            for _ in range(runs):
+                startup = import_profile('pass', [], tmp, env)[0]
+                total, modules = import_profile('from src.client import main; main()', args, tmp, env)
+                startups.append(startup)
+                differences.append(total - startup)
+            elapsed = statistics.median(differences)
+            spread = statistics.median(abs(d - elapsed) for d in differences)
+            budget *= scale * max(1.0, statistics.median(startups) / REFERENCE_STARTUP)
+            leaked = [m for m in forbidden if m in modules]
+
+            problems = []
+            if elapsed > budget * (1 + HEADROOM) + 3 * spread:
+                problems.append(f"over {budget:.0f} ms budget")
+            if leaked:
+                problems.append(f"imported {', '.join(leaked)}")
+            failed = failed or bool(problems)
+
+            command = ' '.join(args)
+            print(f"{command:32} {elapsed:7.1f} ms  ±{spread:5.1f}  (budget {budget:4.0f})  {'; '.join(problems) or 'ok'}")
+            if verbose:
+                heavy = sorted({m.split('.')[0] for m in modules} & {'requests', 'rich', 'urllib3', 'mimetypes', 'sqlite3'})
+                print(f"    {', '.join(heavy) or '-'}")
+
+        print(f"\ninterpreter startup imports: {statistics.median(startups):6.1f} ms (subtracted above)")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
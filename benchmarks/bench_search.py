@@ -0,0 +1,109 @@
+"""Time `search --all` over the local index, and check that it and `related` forget deleted conversations.
+
+Usage:
+    python benchmarks/bench_search.py [--conversations N] [--messages N]
+
+Fills a throwaway cache.db with synthetic conversations, indexes them and
+times a query. Then one conversation is dropped from the cache and one
+from a mirror directory, and the next incremental update of the search
+index, and of the related index when numpy is installed, must stop
+returning both. Exits non-zero when a removed conversation still matches.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ORG = 'bench-org'
+
+
+def synthetic_conversation(index, messages):
+    return {
+        'uuid': f'conv-{index:05d}',
+        'name': f'Conversation {index}',
+        'updated_at': '2026-01-01T00:00:00Z',
+        'chat_messages': [
+            {
+                'uuid': f'conv-{index:05d}-{i}',
+                'sender': 'human' if i % 2 == 0 else 'assistant',
+                'content': [{'type': 'text', 'text': f'topic{index} message {i} ' + 'lorem ipsum dolor sit amet ' * 20}],
+            }
+            for i in range(messages)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--conversations', type=int, default=300)
+    parser.add_argument('--messages', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        import src.cache as cache
+        from src.search_index import SearchIndex
+        from src.mirror_state import save_mirror_state, conversation_path
+
+        for i in range(args.conversations):
+            cache.store_conversation(ORG, f'conv-{i:05d}', synthetic_conversation(i, args.messages))
+
+        mirror_dir = os.path.join(directory, 'mirror')
+        os.makedirs(os.path.join(mirror_dir, 'conversations'))
+        mirrored = synthetic_conversation(args.conversations, args.messages)
+        with open(conversation_path(mirror_dir, mirrored['uuid']), 'w', encoding='utf-8') as f:
+            json.dump(mirrored, f)
+        save_mirror_state(mirror_dir, {mirrored['uuid']: mirrored['updated_at']})
+
+        index = SearchIndex()
+        start = time.perf_counter()
+        indexed, _ = index.update(ORG, mirror_dir)
+        index_ms = (time.perf_counter() - start) * 1000
+
+        try:
+            from src.related import RelatedIndex, vectorize
+            related = RelatedIndex()
+            related.update(ORG, mirror_dir)
+        except ImportError:
+            related = None
+
+        start = time.perf_counter()
+        results = index.search('lorem topic7', ORG)
+        search_ms = (time.perf_counter() - start) * 1000
+        print(f"indexed {indexed} conversations in {index_ms:.0f} ms, query in {search_ms:.1f} ms")
+
+        # One conversation deleted from the cache, one pruned from the mirror
+        cache.get_cache().delete('conv-00007')
+        os.remove(conversation_path(mirror_dir, mirrored['uuid']))
+        save_mirror_state(mirror_dir, {})
+        _, removed = index.update(ORG, mirror_dir)
+
+        failures = []
+        for query, conversation_uuid in [('topic7', 'conv-00007'), (f'topic{args.conversations}', mirrored['uuid'])]:
+            if any(r['conversation_uuid'] == conversation_uuid for r in index.search(query, ORG)):
+                failures.append(conversation_uuid)
+        if not any(r['conversation_uuid'] == 'conv-00008' for r in index.search('topic8', ORG)):
+            failures.append('conv-00008 (should still match)')
+
+        if related is not None:
+            related.update(ORG, mirror_dir)
+            similar = {r['uuid'] for r in related.query(vectorize('topic7 lorem ipsum'), ORG, k=len(related.rows) + 2)}
+            failures += [f"{u} (related)" for u in ('conv-00007', mirrored['uuid']) if u in similar]
+            if 'conv-00008' not in similar:
+                failures.append('conv-00008 (related, should still be there)')
+        index.close()
+        cache.get_cache().close()
+        os.chdir(os.path.dirname(directory))
+
+    print(f"removed {removed} conversations on the next update")
+    if failures:
+        print(f"FAIL: wrong matches after removal: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
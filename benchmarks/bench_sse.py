@@ -0,0 +1,118 @@
+"""Replay recorded completion streams through the old and new SSE decoders.
+
+Usage:
+    python benchmarks/bench_sse.py [stream.txt ...] [--repeat N]
+
+Each file should contain a raw text/event-stream body as received from the
+completion endpoint. Without files a synthetic artifact-heavy stream is used.
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from src.sse import iter_json_events
+
+
+def synthetic_stream(text_deltas=4000, json_deltas=6000):
+    """Build a stream shaped like a long answer that writes a big file"""
+    def event(payload):
+        name = payload['type']
+        return f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode()
+    
+    parts = [event({'type': 'message_start', 'message': {'uuid': '0000', 'content': []}})]
+    parts.append(event({'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}}))
+    for i in range(text_deltas):
+        parts.append(event({'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': f'word{i} '}}))
+    parts.append(event({'type': 'content_block_stop', 'index': 0}))
+    parts.append(event({'type': 'content_block_start', 'index': 1, 'content_block': {'type': 'tool_use', 'id': 't1', 'name': 'create_file'}}))
+    for i in range(json_deltas):
+        parts.append(event({'type': 'content_block_delta', 'index': 1, 'delta': {'type': 'input_json_delta', 'partial_json': f'line {i}\\n    x = \\"{i}\\"\\n'}}))
+    parts.append(event({'type': 'content_block_stop', 'index': 1}))
+    parts.append(event({'type': 'message_stop'}))
+    return b''.join(parts)
+
+
+class PacketStream:
+    """Stand-in for urllib3's response that hands out data packet by packet"""
+    
+    def __init__(self, data, packet_size=1400):
+        self.data = data
+        self.packet_size = packet_size
+    
+    def stream(self, amt=None, decode_content=True):
+        step = min(amt or self.packet_size, self.packet_size)
+        for i in range(0, len(self.data), step):
+            yield self.data[i:i + step]
+
+
+def make_response(data):
+    response = requests.Response()
+    response.raw = PacketStream(data)
+    response.status_code = 200
+    return response
+
+
+def legacy_decode(data):
+    count = 0
+    for line in make_response(data).iter_lines():
+        if not line:
+            continue
+        line = line.decode('utf-8')
+        if not line.startswith('data: '):
+            continue
+        try:
+            event = json.loads(line[6:])
+            event.get('type')
+            count += 1
+        except json.JSONDecodeError:
+            pass
+    return count
+
+
+def incremental_decode(data):
+    count = 0
+    for _ in iter_json_events(make_response(data).iter_content(chunk_size=None)):
+        count += 1
+    return count
+
+
+def bench(func, data, repeat):
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = func(data)
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main(argv):
+    repeat = 5
+    if '--repeat' in argv:
+        i = argv.index('--repeat')
+        repeat = int(argv[i + 1])
+        del argv[i:i + 2]
+    
+    streams = []
+    for path in argv:
+        with open(path, 'rb') as f:
+            streams.append((os.path.basename(path), f.read()))
+    if not streams:
+        streams.append(('synthetic', synthetic_stream()))
+    
+    for name, data in streams:
+        old, old_count = bench(legacy_decode, data, repeat)
+        new, new_count = bench(incremental_decode, data, repeat)
+        mb = len(data) / 1e6
+        print(f"{name}: {mb:.2f} MB, {new_count} events")
+        print(f"  iter_lines + json.loads: {old * 1000:8.1f} ms  ({mb / old:6.1f} MB/s, {old_count} events)")
+        print(f"  SSEDecoder:              {new * 1000:8.1f} ms  ({mb / new:6.1f} MB/s)")
+        print(f"  speedup: {old / new:.2f}x")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
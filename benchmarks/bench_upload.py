@@ -0,0 +1,107 @@
+"""Peak memory and throughput of uploading a large file.
+
+Usage:
+    python benchmarks/bench_upload.py [--size MB] [--budget MB]
+
+Uploads a file of random bytes through claude.upload_file to a local HTTP
+server that drains the body, and compares it with building the same
+multipart body the way requests does for files=. Exits non-zero when the
+streaming upload allocates more than --budget MB at its peak.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import src.claude as claude
+
+
+class DrainHandler(BaseHTTPRequestHandler):
+    """Reads the request body in small pieces and answers like the upload endpoint"""
+
+    def do_POST(self):
+        remaining = int(self.headers['Content-Length'])
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 64 * 1024)))
+        body = json.dumps({'success': True, 'file_uuid': 'bench-file'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LocalSession:
+    """Sends every request to the local server instead of claude.ai"""
+
+    def __init__(self, url):
+        self.url = url
+        self.session = requests.Session()
+
+    def post(self, url, **kwargs):
+        return self.session.post(self.url, **kwargs)
+
+
+def measure(upload):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = upload()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    response.raise_for_status()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=float, default=64, help='File size in MB')
+    parser.add_argument('--budget', type=float, default=4, help='Allowed peak allocation of the streaming upload in MB')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DrainHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/upload"
+    session = LocalSession(url)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.pdf')
+        with open(path, 'wb') as f:
+            for _ in range(int(args.size)):
+                f.write(os.urandom(1024 * 1024))
+        size = os.path.getsize(path) / 1e6
+
+        def buffered():
+            with open(path, 'rb') as f:
+                return session.session.post(url, files={'file': ('bench.pdf', f, 'application/pdf')})
+
+        results = [
+            ('files= (in memory)', measure(buffered)),
+            ('upload_file (streamed)', measure(lambda: claude.upload_file(session, 'bench-org', path))),
+        ]
+
+    server.shutdown()
+
+    print(f"{size:.0f} MB file")
+    for label, (elapsed, peak) in results:
+        print(f"  {label:24} peak {peak / 1e6:7.1f} MB   {size / elapsed:7.1f} MB/s")
+
+    peak = results[-1][1][1] / 1e6
+    if peak > args.budget:
+        print(f"FAIL: streamed upload peaked at {peak:.1f} MB, budget {args.budget:.1f} MB")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,9 +10,13 @@ setup(
         "requests",
         "rich",
     ],
+    extras_require={
+        "related": ["numpy"],
+        "zstd": ["zstandard"],
+    },
     entry_points={
         "console_scripts": [
-            "claude=src.cli:cli",
+            "claude=src.client:main",
         ],
     },
 )
\ No newline at end of file
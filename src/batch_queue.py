@@ -0,0 +1,91 @@
+import json
+import sqlite3
+import threading
+import time
+
+QUEUE_SUFFIX = ".queue.db"
+
+
+class BatchQueue:
+    """Jobs of a batch run and their results, kept in SQLite next to the output
+
+    A job is 'pending' until a worker takes it ('running') and then 'done'
+    or 'failed'. Opening the queue again puts interrupted and failed jobs
+    back to 'pending', so rerunning a batch only sends what hasn't finished.
+    Once jobs are loaded, only those take part: jobs of an earlier run that
+    are no longer in the input are kept but not sent or reported.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = None
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " position INTEGER,"
+            " job TEXT,"
+            " status TEXT,"
+            " result TEXT,"
+            " finished_at REAL)"
+        )
+        self._db.execute("UPDATE jobs SET status = 'pending' WHERE status IN ('running', 'failed')")
+        self._db.commit()
+
+    def load(self, jobs):
+        """Add jobs (dicts with an 'id'); unfinished jobs with a known id take the new definition"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO jobs (id, position, job, status) VALUES (?, ?, ?, 'pending')"
+                " ON CONFLICT(id) DO UPDATE SET position = excluded.position, job = excluded.job"
+                " WHERE status != 'done'",
+                [(job['id'], position, json.dumps(job, ensure_ascii=False)) for position, job in enumerate(jobs)]
+            )
+            self._db.commit()
+            self._loaded = {job['id'] for job in jobs}
+
+    def _in_run(self, job_id):
+        return self._loaded is None or job_id in self._loaded
+
+    def pending(self):
+        """Unfinished jobs in input order"""
+        with self._lock:
+            rows = self._db.execute("SELECT id, job FROM jobs WHERE status = 'pending' ORDER BY position").fetchall()
+        return [json.loads(job) for job_id, job in rows if self._in_run(job_id)]
+
+    def start(self, job_id):
+        self._set(job_id, 'running')
+
+    def finish(self, job_id, result, failed=False):
+        self._set(job_id, 'failed' if failed else 'done', json.dumps(result, ensure_ascii=False))
+
+    def _set(self, job_id, status, result=None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = COALESCE(?, result), finished_at = ? WHERE id = ?",
+                (status, result, time.time() if result else None, job_id)
+            )
+            self._db.commit()
+
+    def finished_results(self):
+        """Result lines of jobs already done, in input order"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, result FROM jobs WHERE status = 'done' ORDER BY position"
+            ).fetchall()
+        return [result for job_id, result in rows if self._in_run(job_id)]
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT id, status FROM jobs").fetchall()
+        counts = {}
+        for job_id, status in rows:
+            if self._in_run(job_id):
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,66 @@
+import hashlib
+import threading
+
+BLOB_DIR = "blobs"
+
+# Bodies smaller than this stay inline; a reference would barely be shorter
+MIN_BLOB_BYTES = 512
+
+# tool_use name -> input field holding the body worth deduplicating
+BODY_FIELDS = {
+    'artifacts': 'content',
+    'create_file': 'file_text',
+}
+
+
+class BlobStore:
+    """Stores artifact and file bodies of an export once, keyed by SHA-256
+
+    Blobs are written through the export target (a directory or an archive)
+    as blobs/<hash>, and exported conversations refer to them by path.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self._lock = threading.Lock()
+        self.referenced = 0
+        self.referenced_bytes = 0
+        self.stored = 0
+        self.stored_bytes = 0
+
+    def put(self, text):
+        """Store a body unless an identical one exists; returns its path, or None to keep it inline"""
+        data = text.encode('utf-8')
+        if len(data) < MIN_BLOB_BYTES:
+            return None
+
+        path = f"{BLOB_DIR}/{hashlib.sha256(data).hexdigest()}"
+        written = self.target.write_blob(path, data)
+
+        with self._lock:
+            self.referenced += 1
+            self.referenced_bytes += len(data)
+            if written:
+                self.stored += 1
+                self.stored_bytes += len(data)
+        return path
+
+    def replace_bodies(self, msg):
+        """Copy of a message with large tool_use bodies swapped for blob references"""
+        contents = []
+        for content in msg.get('content', []):
+            field = BODY_FIELDS.get(content.get('name')) if content.get('type') == 'tool_use' else None
+            cdata = content.get('input') or {}
+            body = cdata.get(field) if field else None
+
+            if isinstance(body, str) and (path := self.put(body)):
+                content = {**content, 'input': {**cdata, field: {'blob': path, 'size': len(body.encode('utf-8'))}}}
+            contents.append(content)
+        return {**msg, 'content': contents}
+
+    def report(self):
+        saved = self.referenced_bytes - self.stored_bytes
+        return (
+            f"{self.referenced} bodies ({self.referenced_bytes / 1e6:.2f} MB) stored as "
+            f"{self.stored} new blobs ({self.stored_bytes / 1e6:.2f} MB), {saved / 1e6:.2f} MB saved"
+        )
@@ -0,0 +1,249 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import src.claude as claude
+
+CACHE_FILE = "cache.db"
+MAX_CACHED_CONVERSATIONS = 500
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# How many recently updated conversations to list when revalidating
+REVALIDATE_LIMIT = 100
+
+OFFLINE_MISS_MESSAGE = "This conversation isn't cached yet. Run the command once without --offline."
+
+
+class CachedResponse:
+    """Minimal stand-in for a requests.Response served from the cache"""
+
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+        self.from_cache = True
+
+    def json(self):
+        return self._data
+
+
+class ConversationCache:
+    """Persistent LRU cache of full conversation trees keyed by UUID"""
+
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_CACHED_CONVERSATIONS, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " uuid TEXT PRIMARY KEY,"
+            " org_id TEXT,"
+            " name TEXT,"
+            " is_starred INTEGER,"
+            " updated_at TEXT,"
+            " data BLOB,"
+            " size INTEGER,"
+            " accessed_at REAL)"
+        )
+        self._db.commit()
+
+    def get(self, conversation_uuid):
+        """Return (updated_at, data) for a cached conversation or (None, None)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT updated_at, data FROM conversations WHERE uuid = ?",
+                (conversation_uuid,)
+            ).fetchone()
+            if not row:
+                return None, None
+            self._db.execute(
+                "UPDATE conversations SET accessed_at = ? WHERE uuid = ?",
+                (time.time(), conversation_uuid)
+            )
+            self._db.commit()
+        return row[0], json.loads(zlib.decompress(row[1]))
+
+    def get_updated_at(self, conversation_uuid):
+        """Return the cached updated_at without loading the conversation"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT updated_at FROM conversations WHERE uuid = ?",
+                (conversation_uuid,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, org_id, conversation_uuid, data):
+        blob = zlib.compress(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (conversation_uuid, org_id, data.get('name'), int(bool(data.get('is_starred'))),
+                 data.get('updated_at'), blob, len(blob), time.time())
+            )
+            self._evict()
+            self._db.commit()
+
+    def list_conversations(self, org_id):
+        """Return metadata for every cached conversation of an org, newest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT uuid, name, is_starred, updated_at FROM conversations"
+                " WHERE org_id = ? ORDER BY updated_at DESC",
+                (org_id,)
+            ).fetchall()
+        return [
+            {'uuid': row[0], 'name': row[1], 'is_starred': bool(row[2]), 'updated_at': row[3]}
+            for row in rows
+        ]
+
+    def delete(self, conversation_uuid):
+        with self._lock:
+            self._db.execute("DELETE FROM conversations WHERE uuid = ?", (conversation_uuid,))
+            self._db.commit()
+
+    def _evict(self):
+        count, total = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM conversations"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        rows = self._db.execute(
+            "SELECT uuid, size FROM conversations ORDER BY accessed_at ASC"
+        ).fetchall()
+        evicted = []
+        for conversation_uuid, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append((conversation_uuid,))
+            count -= 1
+            total -= size
+        self._db.executemany("DELETE FROM conversations WHERE uuid = ?", evicted)
+
+    def close(self):
+        self._db.close()
+
+
+_cache = None
+_listed_updated_at = {}
+_listed_orgs = set()
+
+
+def get_cache():
+    """Return the process-wide conversation cache"""
+    global _cache
+    if _cache is None:
+        _cache = ConversationCache()
+    return _cache
+
+
+def remember_updated_at(conversations):
+    """Record updated_at values from a conversation listing for revalidation"""
+    for convo in conversations:
+        if convo.get('uuid'):
+            _listed_updated_at[convo['uuid']] = convo.get('updated_at')
+
+
+def forget_listings():
+    """Drop remembered updated_at values so the next lookup lists conversations again"""
+    _listed_updated_at.clear()
+    _listed_orgs.clear()
+
+
+def lookup_updated_at(session, org_id, conversation_uuid):
+    """Find a conversation's current updated_at with one lightweight list request"""
+    if conversation_uuid not in _listed_updated_at and org_id not in _listed_orgs:
+        response = claude.get_conversations(session, org_id, REVALIDATE_LIMIT)
+        if response.status_code != 200:
+            return None
+        _listed_orgs.add(org_id)
+        remember_updated_at(response.json())
+    return _listed_updated_at.get(conversation_uuid)
+
+
+def get_conversation_details(session, org_id, conversation_uuid, offline=False, updated_at=None, fresh=False):
+    """Read-through version of claude.get_conversation_details
+
+    A cached tree is used when its updated_at still matches the server's,
+    taken from `updated_at` or from a recent conversation listing. With
+    offline=True the network is never touched and a cache miss returns a
+    504, like an HTTP only-if-cached request. fresh=True always fetches
+    the tree and refreshes the cache with it, for callers that pick the
+    next parent message from it: the listing is only eventually
+    consistent and can lag behind a reply that was just sent.
+    """
+    cache = get_cache()
+
+    if offline:
+        cached_updated_at, data = cache.get(conversation_uuid)
+        return CachedResponse(200, data) if data is not None else CachedResponse(504)
+
+    cached_updated_at = None if fresh else cache.get_updated_at(conversation_uuid)
+    if cached_updated_at is not None:
+        if updated_at is None:
+            updated_at = lookup_updated_at(session, org_id, conversation_uuid)
+        if updated_at is not None and updated_at == cached_updated_at:
+            _, data = cache.get(conversation_uuid)
+            return CachedResponse(200, data)
+
+    response = claude.get_conversation_details(session, org_id, conversation_uuid)
+    if response.status_code == 200:
+        store_conversation(org_id, conversation_uuid, response.json())
+    elif response.status_code == 404:
+        cache.delete(conversation_uuid)
+    return response
+
+
+def store_conversation(org_id, conversation_uuid, data):
+    """Put a freshly fetched conversation tree into the cache"""
+    get_cache().put(org_id, conversation_uuid, data)
+    _listed_updated_at[conversation_uuid] = data.get('updated_at')
+
+
+def stored_conversation_uuids(org_id, mirror_dir=None):
+    """UUIDs of every conversation iter_changed_conversations can yield for an org
+
+    Anything a local index holds outside this set was deleted, evicted from
+    the cache or pruned from the mirror, and should be dropped.
+    """
+    uuids = {convo['uuid'] for convo in get_cache().list_conversations(org_id)}
+    if mirror_dir and os.path.isdir(mirror_dir):
+        from src.mirror_state import load_mirror_state, conversation_path
+        uuids.update(
+            conversation_uuid for conversation_uuid in load_mirror_state(mirror_dir)
+            if os.path.exists(conversation_path(mirror_dir, conversation_uuid))
+        )
+    return uuids
+
+
+def iter_changed_conversations(org_id, known_versions, mirror_dir=None):
+    """Yield stored conversation trees whose updated_at differs from known_versions
+
+    Looks at the conversation cache and, if given, a `claude mirror`
+    directory, so local indexes can be brought up to date incrementally.
+    """
+    conversation_cache = get_cache()
+    seen = set()
+    for convo in conversation_cache.list_conversations(org_id):
+        seen.add(convo['uuid'])
+        if known_versions.get(convo['uuid']) == convo['updated_at']:
+            continue
+        _, data = conversation_cache.get(convo['uuid'])
+        if data is not None:
+            yield data
+
+    if not mirror_dir or not os.path.isdir(mirror_dir):
+        return
+
+    from src.mirror_state import load_mirror_state, conversation_path
+    for conversation_uuid, updated_at in load_mirror_state(mirror_dir).items():
+        if conversation_uuid in seen or known_versions.get(conversation_uuid) == updated_at:
+            continue
+        path = conversation_path(mirror_dir, conversation_uuid)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                yield json.load(f)
@@ -1,9 +1,18 @@
 from src.config import USER_AGENT
-from src.file import process_prompt_with_files
-import mimetypes
+from src.transport import request
+
+# (connect, longest gap between bytes) for completions; the stream itself may run far longer
+COMPLETION_TIMEOUT = (10, 60)
+
+# Completion statuses that may mean a file_uuid in the request isn't valid (any more)
+REJECTED_STATUSES = {400, 404, 410}
+
+# Uploads at least this big always report their throughput
+LARGE_UPLOAD = 10 * 1000 * 1000
 
 def get_conversation_count(session, org_id):
-    response = session.get(
+    response = request(
+            session, "GET",
             f"https://claude.ai/api/organizations/{org_id}/chat_conversations/count_all",
             headers={
                 "User-Agent": USER_AGENT,
@@ -14,10 +23,11 @@ def get_conversation_count(session, org_id):
         )
     return response
 
-def get_conversations(session, org_id, limit=200, starred=False):
-    """Get conversations for an organization"""
-    return session.get(
-        f"https://claude.ai/api/organizations/{org_id}/chat_conversations?limit={limit}&starred={str(starred).lower()}&consistency=eventual",
+def get_conversations(session, org_id, limit=200, starred=False, offset=0):
+    """Get one page of conversations for an organization, most recently updated first"""
+    return request(
+        session, "GET",
+        f"https://claude.ai/api/organizations/{org_id}/chat_conversations?limit={limit}&offset={offset}&starred={str(starred).lower()}&consistency=eventual",
         headers={
             "User-Agent": USER_AGENT,
             "referer": "https://claude.ai/new",
@@ -26,10 +36,16 @@ def get_conversations(session, org_id, limit=200, starred=False):
         timeout=10
     )
 
-def send_completion(session, org_id, conversation_uuid, prompt, parent_message_uuid, tools=None):
-    """Send a completion request and return streaming response"""
+def send_completion(session, org_id, conversation_uuid, prompt, parent_message_uuid, tools=None, extra_files=(), progress=True):
+    """Send a completion request and return streaming response
+
+    progress=False hides the progress bar of attaching several files.
+    If a request that reused earlier uploads is rejected, those uploads
+    are dropped from the upload cache and the files sent again once.
+    """
+    from src.file import process_prompt_with_files
     
-    file_result = process_prompt_with_files(prompt, session, org_id)
+    file_result = process_prompt_with_files(prompt, session, org_id, extra_files, progress)
     
     if tools is None:
         tools = [
@@ -60,22 +76,40 @@ def send_completion(session, org_id, conversation_uuid, prompt, parent_message_u
         "rendering_mode": "messages"
     }
     
-    return session.post(
-        f"https://claude.ai/api/organizations/{org_id}/chat_conversations/{conversation_uuid}/completion",
-        headers={
-            "User-Agent": USER_AGENT,
-            "accept": "text/event-stream, text/event-stream",
-            "referer": f"https://claude.ai/chat/{conversation_uuid}",
-            "content-type": "application/json",
-        },
-        json=body,
-        stream=True,
-        timeout=60
-    )
+    def post():
+        return request(
+            session, "POST",
+            f"https://claude.ai/api/organizations/{org_id}/chat_conversations/{conversation_uuid}/completion",
+            headers={
+                "User-Agent": USER_AGENT,
+                "accept": "text/event-stream, text/event-stream",
+                "referer": f"https://claude.ai/chat/{conversation_uuid}",
+                "content-type": "application/json",
+            },
+            json=body,
+            stream=True,
+            timeout=COMPLETION_TIMEOUT
+        )
+    
+    response = post()
+    
+    if response.status_code in REJECTED_STATUSES and file_result['cached_files']:
+        # A reused upload may have expired; forget it, upload the files again and resend
+        from src.upload_cache import get_upload_cache
+        
+        response.close()
+        get_upload_cache().forget(org_id, file_result['cached_files'])
+        file_result = process_prompt_with_files(prompt, session, org_id, extra_files, progress)
+        body["attachments"] = file_result['attachments']
+        body["files"] = file_result['files']
+        response = post()
+    
+    return response
 
 def get_conversation_details(session, org_id, conversation_uuid):
     """Get full conversation tree with message history"""
-    return session.get(
+    return request(
+        session, "GET",
         f"https://claude.ai/api/organizations/{org_id}/chat_conversations/{conversation_uuid}?tree=True&rendering_mode=messages&render_all_tools=true&consistency=strong",
         headers={
             "User-Agent": USER_AGENT,
@@ -87,7 +121,8 @@ def get_conversation_details(session, org_id, conversation_uuid):
 
 def delete_conversation(session, org_id, conversation_uuid):
     """Delete a conversation"""
-    return session.delete(
+    return request(
+        session, "DELETE",
         f"https://claude.ai/api/organizations/{org_id}/chat_conversations/{conversation_uuid}",
         headers={
             "User-Agent": USER_AGENT,
@@ -108,7 +143,8 @@ def create_conversation(session, org_id, conversation_uuid, name="", is_temporar
         "is_temporary": is_temporary
     }
     
-    return session.post(
+    return request(
+        session, "POST",
         url, 
         json=payload,
         headers={
@@ -129,7 +165,7 @@ def rename_conversation(session, org_id, conversation_uuid, new_name):
     }
     body = {"name": new_name}
     
-    return session.put(url, headers=headers, json=body)
+    return request(session, "PUT", url, headers=headers, json=body)
 
 def update_conversation_settings(session, org_id, conversation_uuid, settings):
     """Update conversation settings (web_search, paprika_mode, artifacts)"""
@@ -141,28 +177,44 @@ def update_conversation_settings(session, org_id, conversation_uuid, settings):
         "content-type": "application/json",
     }
     body = {"settings": settings}
-    return session.put(url, headers=headers, json=body, params={"rendering_mode": "raw"})
+    return request(session, "PUT", url, headers=headers, json=body, params={"rendering_mode": "raw"})
 
 def upload_file(session, org_id, file_path):
-    """Upload a binary file and return response"""
+    """Upload a binary file and return response
+
+    The multipart body is streamed from disk, so memory use doesn't grow
+    with the file. Throughput is printed for large files, and for every
+    upload with -v.
+    """
     import os
+    import mimetypes
+    import click
+    from src.multipart import MultipartFile
+    from src.transport import log
     
     file_name = os.path.basename(file_path)
+    body = MultipartFile(file_path, 'file', file_name, mimetypes.guess_type(file_path)[0] or 'application/octet-stream')
     
-    with open(file_path, 'rb') as f:
-        files = {
-            'file': (file_name, f, mimetypes.guess_type(file_path)[0] or 'application/octet-stream')
-        }
-        
-        response = session.post(
+    try:
+        response = request(
+            session, "POST",
             f"https://claude.ai/api/{org_id}/upload",
             headers={
                 "User-Agent": USER_AGENT,
                 "accept": "*/*",
                 "referer": "https://claude.ai/new",
+                "content-type": body.content_type,
             },
-            files=files,
+            data=body,
             timeout=30
         )
+    finally:
+        body.close()
+    
+    line = f"Uploaded {file_name}: {body.size / 1e6:.1f} MB in {body.elapsed():.1f}s ({body.throughput() / 1e6:.1f} MB/s)"
+    if body.size >= LARGE_UPLOAD:
+        click.echo(line, err=True)
+    else:
+        log(line)
     
     return response
\ No newline at end of file
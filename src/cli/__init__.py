@@ -1,7 +1,15 @@
-import click
+import importlib
 import sys
 import os
 
+# Answer common TAB completions before click, requests and rich are imported
+if "_CLAUDE_COMPLETE" in os.environ:
+    from src.completion import fast_complete
+    if fast_complete():
+        sys.exit(0)
+
+import click
+
 if sys.platform == 'win32':
     if sys.stdout.encoding != 'utf-8':
         sys.stdout.reconfigure(encoding='utf-8')
@@ -9,43 +17,72 @@ if sys.platform == 'win32':
         sys.stderr.reconfigure(encoding='utf-8')
     os.system('chcp 65001 >nul 2>&1')
 
-@click.group()
-def cli():
-    pass
+class LazyGroup(click.Group):
+    """Group that imports a command's module only when that command is used"""
 
-@cli.command()
-def test():
-    click.echo("Everything is working!")
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # command name -> "module:attribute", relative to this package
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            module_name, attribute = self.lazy_commands[cmd_name].split(":")
+            module = importlib.import_module(f"{__name__}.{module_name}")
+            self.add_command(getattr(module, attribute), cmd_name)
+        return super().get_command(ctx, cmd_name)
 
-def register_commands():
-    from .accounts import accounts, add_account, update_account, switch_account, remove_account
-    from .conversations import conversations, new, name, delete, link, search, export
-    from .chat import chat, sync, history, repl
-    from .settings import settings
-    
+
+LAZY_COMMANDS = {
     # Account commands
-    cli.add_command(accounts)
-    cli.add_command(add_account)
-    cli.add_command(update_account)
-    cli.add_command(switch_account)
-    cli.add_command(remove_account)
+    'accounts': 'accounts:accounts',
+    'add-account': 'accounts:add_account',
+    'update-account': 'accounts:update_account',
+    'switch-account': 'accounts:switch_account',
+    'remove-account': 'accounts:remove_account',
 
     # Conversation commands
-    cli.add_command(conversations)
-    cli.add_command(new)
-    cli.add_command(name)
-    cli.add_command(delete)
-    cli.add_command(link)
-    cli.add_command(search)
-    cli.add_command(export)
+    'conversations': 'conversations:conversations',
+    'new': 'conversations:new',
+    'name': 'conversations:name',
+    'delete': 'conversations:delete',
+    'link': 'conversations:link',
+    'search': 'conversations:search',
+    'related': 'conversations:related',
+    'export': 'conversations:export',
 
     # Chat commands
-    cli.add_command(chat)
-    cli.add_command(sync)
-    cli.add_command(history)
-    cli.add_command(repl)
+    'chat': 'chat:chat',
+    'sync': 'chat:sync',
+    'history': 'chat:history',
+    'repl': 'chat:repl',
 
     # Settings commands
-    cli.add_command(settings)
+    'settings': 'settings:settings',
+
+    # Bulk commands
+    'mirror': 'mirror:mirror',
+    'batch': 'batch:batch',
+
+    # Daemon
+    'daemon': 'daemon:daemon_command',
+}
+
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS)
+@click.option('--verbose', '-v', is_flag=True, help='Report retries and time spent backing off on stderr')
+@click.pass_context
+def cli(ctx, verbose):
+    if verbose:
+        # Process-wide, which is why src.client never forwards -v to the daemon
+        from src import transport
 
-register_commands()
\ No newline at end of file
+        transport.set_verbose(True)
+        since = transport.stats()
+        ctx.call_on_close(lambda: click.echo(transport.report(since), err=True))
+
+@cli.command()
+def test():
+    click.echo("Everything is working!")
@@ -10,6 +10,7 @@ from src.helpers import (
     extract_org_id,
 )
 import src.claude as claude
+from src.completion import click_completer, complete_accounts
 
 
 @click.command()
@@ -44,7 +45,7 @@ def add_account():
 
 
 @click.command()
-@click.argument('account_name', required=False)
+@click.argument('account_name', required=False, shell_complete=click_completer(complete_accounts))
 @click.argument('cookies', required=False)
 def update_account(account_name, cookies):
     """Update an existing account's cookies"""
@@ -70,7 +71,7 @@ def update_account(account_name, cookies):
 
 
 @click.command()
-@click.argument('account_name', required=False)
+@click.argument('account_name', required=False, shell_complete=click_completer(complete_accounts))
 def switch_account(account_name):
     """Switch to a different Claude account"""
     accounts_list = load_accounts()
@@ -114,7 +115,7 @@ def switch_account(account_name):
 
 
 @click.command()
-@click.argument('account_name', required=False)
+@click.argument('account_name', required=False, shell_complete=click_completer(complete_accounts))
 def remove_account(account_name):
     """Remove a Claude account"""
     accounts = load_accounts()
@@ -0,0 +1,382 @@
+import click
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from src.batch_queue import BatchQueue, QUEUE_SUFFIX
+from src.helpers import (
+    get_active_account,
+    open_atomic,
+    get_parent_message_uuid,
+    get_conversation_settings,
+    set_conversation_state,
+)
+from src.state import get_state
+from src.metadata import get_metadata
+from src.completion import click_completer, complete_accounts
+from src.sse import iter_json_events
+from src.cli.chat import build_tools, message_markdown, StreamState, EVENT_HANDLERS, DEFAULT_PARENT_UUID, DEFAULT_SETTINGS
+import src.claude as claude
+
+
+class JobError(Exception):
+    """A job that failed after its conversation was known"""
+
+    def __init__(self, message, conversation_uuid=None):
+        super().__init__(message)
+        self.conversation_uuid = conversation_uuid
+
+
+def job_digest(job):
+    """Short hash of what a job sends"""
+    content = json.dumps([job['prompt'], job.get('conversation'), job.get('attachments', [])], ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+
+
+def read_jobs(f):
+    """Parse JSONL jobs; a job is {"prompt": ..., "id"?, "conversation"?, "account"?, "attachments"?, "name"?}
+
+    Plain JSON strings are taken as prompts. Ids default to a hash of the
+    prompt, conversation and attachments, so they still match the queue
+    after lines are added, removed or reordered; the second and later
+    copies of the same job get -2, -3, ...
+    """
+    jobs = []
+    seen = set()
+    for number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            raise click.UsageError(f"Line {number}: invalid JSON ({e})")
+        if isinstance(job, str):
+            job = {'prompt': job}
+        if not isinstance(job, dict) or not job.get('prompt'):
+            raise click.UsageError(f"Line {number}: a job needs a non-empty 'prompt'")
+        if not isinstance(job.get('attachments', []), list):
+            raise click.UsageError(f"Line {number}: 'attachments' must be a list of file paths")
+
+        if 'id' in job:
+            job['id'] = str(job['id'])
+        else:
+            job['id'] = job_digest(job)
+            copy = 1
+            while job['id'] in seen:
+                copy += 1
+                job['id'] = f"{job_digest(job)}-{copy}"
+        if job['id'] in seen:
+            raise click.UsageError(f"Line {number}: duplicate job id {job['id']}")
+        seen.add(job['id'])
+        jobs.append(job)
+    return jobs
+
+
+def group_by_conversation(jobs):
+    """Chains of jobs that must run in order
+
+    Jobs naming the same conversation are sent one after another, each as
+    a reply to the previous one; every other job gets a chain of its own.
+    """
+    chains = {}
+    singles = []
+    for job in jobs:
+        if job.get('conversation'):
+            chains.setdefault(job['conversation'], []).append(job)
+        else:
+            singles.append([job])
+    return list(chains.values()) + singles
+
+
+def read_completion(response):
+    """Consume an SSE completion
+
+    Returns (text, message uuid, time of the first token, seconds until an
+    exceeded message limit resets or None, whether the stream ended properly).
+    """
+    from src.scheduler import message_limit_cooldown
+    from src.recovery import watch_stall
+
+    first_token = []
+    limit = None
+    stopped = False
+
+    def on_text(text):
+        if not first_token:
+            first_token.append(time.monotonic())
+
+    state = StreamState(True, None, on_text)
+    for event_type, event in watch_stall(iter_json_events(response.iter_content(chunk_size=None))):
+        stopped = stopped or event_type in ('message_stop', 'error')
+        if event_type == 'message_limit':
+            limit = message_limit_cooldown(event)
+        handler = EVENT_HANDLERS.get(event_type)
+        if handler:
+            handler(state, event)
+    return state.markdown_buffer, state.new_message_uuid, first_token[0] if first_token else None, limit, stopped
+
+
+def milliseconds(start, end):
+    return round((end - start) * 1000) if start is not None and end is not None else None
+
+
+def run_job(job, account, retries, temporary):
+    """Send one job on a pool account and read the whole reply; returns its result line as a dict
+
+    Raises AccountThrottled when the account is rate limited before a reply
+    was produced, so the job can move to another account.
+    """
+    import requests
+    from src.concurrency import RETRY_STATUSES, call_with_retry
+    from src.scheduler import AccountThrottled, throttle_seconds
+    from src.recovery import send_or_recover, recover_reply, StreamStalled
+
+    session, org_id = account.session, account.org_id
+    # 429s come back to us instead of being retried in place
+    statuses = RETRY_STATUSES - {429}
+    started = time.monotonic()
+    result = {'id': job['id'], 'account': account.name, 'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+
+    conversation_uuid = job.get('conversation')
+    if conversation_uuid:
+        parent_message_uuid = get_parent_message_uuid(conversation_uuid)
+        settings = get_conversation_settings(conversation_uuid) or DEFAULT_SETTINGS
+    else:
+        conversation_uuid = str(uuid.uuid4())
+        name = job.get('name', '')
+        response = call_with_retry(
+            lambda: claude.create_conversation(session, org_id, conversation_uuid, name, temporary),
+            account.bucket, retries, statuses=statuses
+        )
+        if response.status_code == 429:
+            raise AccountThrottled(throttle_seconds(response))
+        if response.status_code not in (200, 201):
+            raise JobError(f"creating the conversation failed with status code {response.status_code}")
+        if not temporary:
+            data = response.json()
+            get_metadata().put(org_id, conversation_uuid, data.get('name') or name, updated_at=data.get('updated_at'))
+        parent_message_uuid = DEFAULT_PARENT_UUID
+        settings = DEFAULT_SETTINGS
+
+    sent = time.monotonic()
+    first_token = limit = None
+    try:
+        def send():
+            account.bucket.acquire()
+            return claude.send_completion(
+                session, org_id, conversation_uuid, job['prompt'], parent_message_uuid,
+                tools=build_tools(settings), extra_files=job.get('attachments', []), progress=False
+            )
+
+        # Sent once: after an error or a 5xx the reply is looked for in the conversation,
+        # and the prompt only goes out again if it never arrived
+        response, recovered = send_or_recover(
+            send, session, org_id, conversation_uuid, parent_message_uuid, job['prompt']
+        )
+        headers_received = time.monotonic()
+        if response is not None:
+            with response:
+                if response.status_code == 429:
+                    raise AccountThrottled(throttle_seconds(response))
+                if response.status_code != 200:
+                    raise JobError(f"status code {response.status_code}", conversation_uuid)
+                try:
+                    text, message_uuid, first_token, limit, stopped = read_completion(response)
+                except (requests.RequestException, StreamStalled):
+                    stopped = False
+            if not stopped and limit is None:
+                recovered = recover_reply(session, org_id, conversation_uuid, parent_message_uuid, job['prompt'])
+        if recovered:
+            text, message_uuid = message_markdown(recovered), recovered.get('uuid')
+    except (JobError, AccountThrottled):
+        raise
+    except Exception as e:
+        raise JobError(str(e), conversation_uuid)
+    finished = time.monotonic()
+
+    if limit is not None:
+        if not message_uuid:
+            raise AccountThrottled(limit)
+        account.cool_down(limit)
+    if not message_uuid:
+        raise JobError("the reply ended without a message", conversation_uuid)
+    if job.get('conversation'):
+        # The next job of this conversation replies to this one
+        set_conversation_state(conversation_uuid, message_uuid)
+        get_state().flush()
+
+    result.update({
+        'status': 'ok',
+        'conversation_uuid': conversation_uuid,
+        'message_uuid': message_uuid,
+        'response': text,
+        'setup_ms': milliseconds(started, sent),
+        'ttfb_ms': milliseconds(sent, headers_received),
+        'first_token_ms': milliseconds(sent, first_token),
+        'total_ms': milliseconds(started, finished),
+    })
+    return result
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else None
+
+
+@click.command()
+@click.argument('jobs_file', type=click.File('r', encoding='utf-8'))
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='NDJSON results file [default: JOBS_FILE with .results.ndjson]')
+@click.option('--jobs', '-j', 'workers', default=4, show_default=True, help='Number of prompts in flight at once')
+@click.option('--rate', default=2.0, show_default=True, help='Maximum requests per second per account (0 for no limit)')
+@click.option('--retries', default=3, show_default=True, help='Retries per request on rate limits and server errors')
+@click.option('--temporary', is_flag=True, help='Create temporary conversations that stay out of your history')
+@click.option('--account', '-a', 'accounts', multiple=True, shell_complete=click_completer(complete_accounts),
+              help='Spread jobs over this account (repeatable) [default: the active account]')
+@click.option('--assign', type=click.Choice(['least-loaded', 'round-robin']), default='least-loaded', show_default=True,
+              help='How jobs are handed to accounts')
+def batch(jobs_file, output, workers, rate, retries, temporary, accounts, assign):
+    """Send every prompt of a JSONL file, several at a time
+
+    Each line is a job like {"id": "q1", "prompt": "...", "attachments":
+    ["spec.pdf"]}. Jobs get a new conversation each unless they name an
+    existing one with "conversation"; jobs of the same conversation are
+    sent in order. Results are appended to an NDJSON file as they finish.
+    Progress is kept next to it, so running the same batch again only
+    sends the jobs that haven't finished.
+
+    With several --account options, jobs go to whichever account is least
+    busy (or to each in turn), each account with its own --rate limit. An
+    account that is rate limited sits out until the limit resets. Jobs that
+    continue a conversation run on the job's "account", or the active one.
+    """
+    from src.concurrency import run_concurrently
+    from src.scheduler import AccountThrottled, account_pool
+
+    if not output:
+        output = 'batch.results.ndjson' if jobs_file.name == '<stdin>' else os.path.splitext(jobs_file.name)[0] + '.results.ndjson'
+
+    queue = BatchQueue(output + QUEUE_SUFFIX)
+    try:
+        queue.load(read_jobs(jobs_file))
+        chains = group_by_conversation(queue.pending())
+
+        def pinned_account(job):
+            return job.get('account') or (get_active_account() if job.get('conversation') else None)
+
+        pinned = {pinned_account(job) for chain in chains for job in chain} - {None}
+        pool = account_pool(accounts, rate, workers, assign, pinned=pinned)
+        if not pool:
+            click.echo("No active account. Use 'switch-account' to select one.")
+            return
+        finished_before = queue.counts().get('done', 0)
+
+        # Results of earlier runs first, so the file holds exactly one line per finished job
+        with open_atomic(output) as f:
+            for line in queue.finished_results():
+                f.write(line + "\n")
+
+        pending = sum(len(chain) for chain in chains)
+        if not pending:
+            click.echo(f"All {finished_before} jobs already finished, results in {output}")
+            return
+        if finished_before:
+            click.echo(f"Resuming: {finished_before} jobs already finished, {pending} to go")
+
+        lock = threading.Lock()
+        stopping = threading.Event()
+        abandoned = threading.Event()
+        in_flight = threading.Condition(lock)
+        running = []
+        latencies = []
+        failed = []
+
+        with open(output, 'a', encoding='utf-8') as out:
+
+            def record(job, result, error=None):
+                if error:
+                    result = {'id': job['id'], 'status': 'error', 'conversation_uuid': getattr(error, 'conversation_uuid', None), 'error': str(error)}
+                line = json.dumps(result, ensure_ascii=False)
+                with lock:
+                    # Interrupted twice: the job stays 'running' and is sent again next time
+                    if abandoned.is_set():
+                        return
+                    queue.finish(job['id'], result, failed=bool(error))
+                    out.write(line + "\n")
+                    out.flush()
+                    if error:
+                        failed.append((job, error))
+                    else:
+                        latencies.append(result['total_ms'])
+
+            def run_on_pool(job):
+                # A throttled account hands the job to the next one; give up after a few moves
+                for _ in range(retries + len(pool.shared)):
+                    try:
+                        with pool.use(pinned_account(job)) as account:
+                            return run_job(job, account, retries, temporary)
+                    except AccountThrottled as e:
+                        throttled = e
+                raise JobError(f"still rate limited after {retries + len(pool.shared)} attempts ({throttled})")
+
+            def run_chain(chain):
+                for index, job in enumerate(chain):
+                    # Interrupted: jobs that haven't started stay pending for the next run
+                    with lock:
+                        if stopping.is_set():
+                            return
+                        running.append(job['id'])
+                    queue.start(job['id'])
+                    try:
+                        record(job, run_on_pool(job))
+                    except Exception as e:
+                        record(job, None, e)
+                        # Later prompts of the conversation expect this reply; retry them on the next run
+                        for skipped in chain[index + 1:]:
+                            record(skipped, None, JobError(f"job {job['id']} of this conversation failed first", e.conversation_uuid if isinstance(e, JobError) else None))
+                        return
+                    finally:
+                        with lock:
+                            running.remove(job['id'])
+                            in_flight.notify_all()
+
+            started = time.monotonic()
+            try:
+                run_concurrently(chains, run_chain, workers, label='Running', item_name=lambda chain: chain[0]['id'] if chain else '')
+            finally:
+                # Queued chains were cancelled; let prompts already sent finish and keep their results
+                with lock:
+                    stopping.set()
+                    if running:
+                        click.echo(f"\nWaiting for {len(running)} jobs in flight to finish...", err=True)
+                    try:
+                        while running:
+                            in_flight.wait()
+                    except KeyboardInterrupt:
+                        abandoned.set()
+                        raise
+            elapsed = time.monotonic() - started
+
+        for job, error in failed[:20]:
+            click.echo(f"Job {job['id']} failed: {error}", err=True)
+        if len(failed) > 20:
+            click.echo(f"... and {len(failed) - 20} more failures, see {output}", err=True)
+
+        click.echo(
+            f"\n{len(latencies)} succeeded, {len(failed)} failed in {elapsed:.1f}s"
+            f" ({len(latencies) / elapsed if elapsed else 0:.2f} jobs/s)"
+        )
+        if latencies:
+            click.echo(f"Latency p50 {percentile(latencies, 0.5) / 1000:.1f}s, p95 {percentile(latencies, 0.95) / 1000:.1f}s")
+        if len(pool.accounts) > 1 or any(a.throttled for a in pool.accounts.values()):
+            click.echo("Accounts:")
+            for line in pool.summary():
+                click.echo(line)
+        click.echo(f"Results in {output}")
+        if failed:
+            click.echo("Run the same command again to retry the failed jobs.")
+    finally:
+        queue.close()
@@ -1,9 +1,5 @@
 import click
-from rich.console import Console
-from rich.markdown import Markdown
-from rich.live import Live
 import json as json_lib
-import re
 import sys
 from src.helpers import (
     get_active_session,
@@ -11,10 +7,34 @@ from src.helpers import (
     set_active_conversation,
     get_parent_message_uuid,
     get_conversation_settings,
+    set_conversation_state,
 )
+from src.state import get_state
+from src.completion import click_completer, complete_conversation_uuids
+from src.sse import iter_json_events
+from src.partial_json import StreamingJSONObject
+from src.stream_buffer import StreamReader, FrameWriter
 import src.claude as claude
+import src.cache as cache
 
-console = Console()
+_console = None
+
+
+def get_console():
+    """The shared rich console; rich is only imported once something is rendered"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+def show(text, style=None):
+    """Print a message, styled by rich on a terminal and as plain text when piped"""
+    if sys.stdout.isatty():
+        get_console().print(text, style=style)
+    else:
+        click.echo(text)
 
 SEPARATOR = "-" * 80
 DEFAULT_PARENT_UUID = "00000000-0000-4000-8000-000000000000"
@@ -25,16 +45,16 @@ DEFAULT_SETTINGS = {
 }
 
 
-def get_auth_context():
+def get_auth_context(conversation_uuid=None):
     session, org_id = get_active_session()
-    conversation_uuid = get_active_conversation()
+    conversation_uuid = conversation_uuid or get_active_conversation()
     
     if not session or not org_id:
-        console.print("No active account. Use 'switch-account' to select one.", style="red")
+        show("No active account. Use 'switch-account' to select one.", style="red")
         return None
     
     if not conversation_uuid:
-        console.print("No active conversation. Use 'conversations' or 'new' to select/create one.", style="red")
+        show("No active conversation. Use 'conversations' or 'new' to select/create one.", style="red")
         return None
     
     return session, org_id, conversation_uuid
@@ -51,30 +71,6 @@ def build_tools(settings):
     return tools
 
 
-def unescape_json_string(s):
-    s = s.replace('\\n', '\n')
-    s = s.replace('\\t', '\t')
-    s = s.replace('\\r', '\r')
-    s = s.replace('\\"', '"')
-    s = s.replace('\\\\', '\\')
-    return s
-
-
-def extract_file_content(partial_json):
-    match = re.search(r'"file_text"\s*:\s*"(.*)', partial_json, re.DOTALL)
-    if match:
-        content = match.group(1)
-        if content.endswith('"}') or content.endswith('"'):
-            content = content.rstrip('"}')
-        return unescape_json_string(content)
-    return None
-
-
-def extract_file_path(partial_json):
-    match = re.search(r'"path"\s*:\s*"([^"]*)"', partial_json)
-    return match.group(1) if match else None
-
-
 def parse_artifact(artifact_json):
     try:
         data = json_lib.loads(artifact_json)
@@ -133,172 +129,278 @@ def format_tool_use(tool_name, tool_input):
         return ""
 
 
-def send_message(prompt, session, org_id, conversation_uuid, parent_message_uuid, settings, use_raw=False, output_file=None):
+class StreamState:
+    """Mutable state shared by the SSE event handlers of one response"""
+
+    def __init__(self, use_raw, renderer, write=None):
+        self.use_raw = use_raw
+        self.renderer = renderer
+        self.write = write or (lambda text: click.echo(text, nl=False))
+        self.markdown_buffer = ""
+        self.new_message_uuid = None
+        self.tool_use_buffer = {}
+        self.current_tool_id = None
+
+
+def on_message_start(state, event):
+    state.new_message_uuid = event.get('message', {}).get('uuid')
+
+
+def on_content_block_start(state, event):
+    block = event.get('content_block', {})
+    
+    if block.get('type') == 'tool_use':
+        tool_id = block.get('id')
+        state.current_tool_id = tool_id
+        state.tool_use_buffer[tool_id] = {
+            'name': block.get('name'),
+            'input_parts': [],
+            'parser': StreamingJSONObject(),
+            'complete': False,
+            'header_shown': False
+        }
+
+
+def on_text_delta(state, delta):
+    text_chunk = delta['text']
+    state.markdown_buffer += text_chunk
+    
+    if state.use_raw:
+        state.write(text_chunk)
+    else:
+        state.renderer.update(state.markdown_buffer)
+
+
+def file_stream_header(parser):
+    file_path = parser.get('path') if 'path' in parser.complete else None
+    ext = file_path.split('.')[-1] if file_path and '.' in file_path else ''
+    return file_path or "...", ext
+
+
+def artifact_stream_header(parser):
+    return parser.get('title') or 'Artifact', parser.get('language', '')
+
+
+# Tools whose input is streamed to the screen: (field to stream, header builder)
+STREAMED_TOOLS = {
+    'create_file': ('file_text', file_stream_header),
+    'artifacts': ('content', artifact_stream_header),
+}
+
+
+def on_input_json_delta(state, delta):
+    if not state.current_tool_id:
+        return
+    
+    tool_data = state.tool_use_buffer[state.current_tool_id]
+    json_chunk = delta['partial_json']
+    tool_data['input_parts'].append(json_chunk)
+    
+    streamed = STREAMED_TOOLS.get(tool_data['name'])
+    if not streamed:
+        return
+    
+    field, build_header = streamed
+    parser = tool_data['parser']
+    new_content = parser.feed(json_chunk).get(field, '')
+    
+    if field not in parser.fields:
+        return
+    
+    if state.use_raw:
+        if not tool_data['header_shown']:
+            name, lang = build_header(parser)
+            if tool_data['name'] == 'create_file':
+                state.write(f"\n\n### Created File: `{name}`\n\n```{lang}\n")
+            else:
+                state.write(f"\n\n### {name}\n\n```{lang}\n")
+            tool_data['header_shown'] = True
+        
+        if new_content:
+            state.write(new_content)
+    
+    elif new_content or not tool_data['header_shown']:
+        tool_data['header_shown'] = True
+        
+        def stream_content():
+            name, lang = build_header(parser)
+            title = f"Creating: `{name}`" if tool_data['name'] == 'create_file' else name
+            return f"\n\n### {title}\n\n```{lang}\n{parser.get(field)}\n```\n"
+        
+        state.renderer.update(state.markdown_buffer, stream_content)
+
+
+DELTA_HANDLERS = {
+    'text_delta': on_text_delta,
+    'input_json_delta': on_input_json_delta,
+}
+
+
+def on_content_block_delta(state, event):
+    delta = event.get('delta', {})
+    handler = DELTA_HANDLERS.get(delta.get('type'))
+    if handler:
+        handler(state, delta)
+
+
+def on_content_block_stop(state, event):
+    tool_id = state.current_tool_id
+    if not tool_id or tool_id not in state.tool_use_buffer:
+        return
+    
+    tool_data = state.tool_use_buffer[tool_id]
+    tool_data['complete'] = True
+    
+    if tool_data['name'] in ('create_file', 'artifacts'):
+        if state.use_raw and tool_data['header_shown']:
+            state.write("\n```\n")
+    
+    tool_output = format_tool_use(tool_data['name'], ''.join(tool_data['input_parts']))
+    if tool_output:
+        state.markdown_buffer += tool_output
+        
+        if state.use_raw:
+            if not tool_data.get('header_shown'):
+                state.write(tool_output)
+        else:
+            state.renderer.update(state.markdown_buffer)
+    
+    state.current_tool_id = None
+
+
+EVENT_HANDLERS = {
+    'message_start': on_message_start,
+    'content_block_start': on_content_block_start,
+    'content_block_delta': on_content_block_delta,
+    'content_block_stop': on_content_block_stop,
+}
+
+
+def message_markdown(message):
+    """The markdown streaming would have built for a stored assistant message"""
+    parts = []
+    for block in message.get('content') or []:
+        if block.get('type') == 'text':
+            parts.append(block.get('text', ''))
+        elif block.get('type') == 'tool_use':
+            parts.append(format_tool_use(block.get('name'), block.get('input') or {}))
+    return "".join(parts) if parts else message.get('text', '')
+
+
+def apply_recovered(state, message):
+    """Show whatever of a recovered reply the broken stream didn't, and take over its uuid"""
+    markdown = message_markdown(message)
+    shown = state.markdown_buffer
+    
+    if state.use_raw and state.current_tool_id and state.tool_use_buffer[state.current_tool_id]['header_shown']:
+        state.write("\n```\n")
+    
+    if markdown.startswith(shown):
+        rest = markdown[len(shown):]
+    else:
+        rest = f"\n\n{SEPARATOR}\n\n{markdown}" if shown else markdown
+    
+    if state.use_raw:
+        state.write(rest)
+    else:
+        state.renderer.update(shown + rest)
+    
+    state.markdown_buffer = markdown
+    state.new_message_uuid = message.get('uuid')
+
+
+def send_message(prompt, session, org_id, conversation_uuid, parent_message_uuid, settings, use_raw=False, output_file=None, buffered=False):
     """
     Core function to send a message and stream the response.
+    With buffered=True the socket is drained on a separate thread and output
+    is written in coalesced batches, so a slow terminal can't stall the read.
+    If the stream drops, stalls or times out, the reply is read back from
+    claude.ai instead; the prompt is only sent again if it never arrived.
     Returns (markdown_buffer, new_message_uuid) or (None, None) on error.
     """
+    import requests
+    from src.recovery import send_or_recover, recover_reply, watch_stall, StreamStalled, ReplyPending
+    
     tools = build_tools(settings)
     
+    def notify(text):
+        click.echo(text, err=True)
+    
     try:
-        response = claude.send_completion(session, org_id, conversation_uuid, prompt, parent_message_uuid, tools=tools)
+        response, recovered = send_or_recover(
+            lambda: claude.send_completion(session, org_id, conversation_uuid, prompt, parent_message_uuid, tools=tools),
+            session, org_id, conversation_uuid, parent_message_uuid, prompt, notify
+        )
         
-        if response.status_code != 200:
-            console.print(f"Failed to send message (status code: {response.status_code})", style="red")
+        if response is not None and response.status_code != 200:
+            show(f"Failed to send message (status code: {response.status_code})", style="red")
             return None, None
         
-        markdown_buffer = ""
-        new_message_uuid = None
+        live = renderer = None
+        if not use_raw:
+            from rich.live import Live
+            from src.render import MarkdownStream
+            live = Live("", console=get_console(), refresh_per_second=4)
+            renderer = MarkdownStream(live)
+            notify = lambda text: live.console.print(text, style="yellow")
+        reader = writer = None
         
-        tool_use_buffer = {}
-        current_tool_id = None
+        if buffered and response is not None:
+            reader = StreamReader(response.iter_content(chunk_size=None)).start()
+            writer = FrameWriter(lambda text: click.echo(text, nl=False))
         
-        live = None if use_raw else Live("", console=console, refresh_per_second=4)
+        state = StreamState(use_raw, renderer, writer.write if writer else None)
         
         if live:
             live.start()
         
         try:
-            for line in response.iter_lines():
-                if not line:
-                    continue
-                
-                line = line.decode('utf-8')
-                if not line.startswith('data: '):
-                    continue
-                
+            if response is not None:
+                chunks = reader.iter_chunks(on_idle=writer.flush) if reader else response.iter_content(chunk_size=None)
+                stopped = False
                 try:
-                    event = json_lib.loads(line[6:])
-                    event_type = event.get('type')
-                    
-                    if event_type == 'message_start':
-                        new_message_uuid = event.get('message', {}).get('uuid')
-                    
-                    elif event_type == 'content_block_start':
-                        block = event.get('content_block', {})
-                        block_type = block.get('type')
-                        
-                        if block_type == 'tool_use':
-                            tool_id = block.get('id')
-                            tool_name = block.get('name')
-                            current_tool_id = tool_id
-                            tool_use_buffer[tool_id] = {
-                                'name': tool_name,
-                                'input_json': '',
-                                'complete': False,
-                                'last_streamed_content': '',
-                                'header_shown': False
-                            }
-                    
-                    elif event_type == 'content_block_delta':
-                        delta = event.get('delta', {})
-                        delta_type = delta.get('type')
-                        
-                        if delta_type == 'text_delta':
-                            text_chunk = delta['text']
-                            markdown_buffer += text_chunk
-                            
-                            if use_raw:
-                                click.echo(text_chunk, nl=False)
-                            else:
-                                live.update(Markdown(markdown_buffer))
-                        
-                        elif delta_type == 'input_json_delta' and current_tool_id:
-                            json_chunk = delta['partial_json']
-                            tool_data = tool_use_buffer[current_tool_id]
-                            tool_data['input_json'] += json_chunk
-                            
-                            if tool_data['name'] == 'create_file':
-                                file_path = extract_file_path(tool_data['input_json'])
-                                file_content = extract_file_content(tool_data['input_json'])
-                                
-                                if file_content is not None:
-                                    if use_raw:
-                                        if not tool_data['header_shown']:
-                                            file_path_display = file_path or "..."
-                                            ext = file_path.split('.')[-1] if file_path and '.' in file_path else ''
-                                            header = f"\n\n### Created File: `{file_path_display}`\n\n```{ext}\n"
-                                            click.echo(header, nl=False)
-                                            tool_data['header_shown'] = True
-                                        
-                                        new_content = file_content[len(tool_data['last_streamed_content']):]
-                                        if new_content:
-                                            click.echo(new_content, nl=False)
-                                        tool_data['last_streamed_content'] = file_content
-                                    else:
-                                        ext = file_path.split('.')[-1] if file_path and '.' in file_path else ''
-                                        file_path_display = file_path or "..."
-                                        stream_content = f"\n\n### Creating: `{file_path_display}`\n\n```{ext}\n{file_content}\n```\n"
-                                        temp_buffer = markdown_buffer + stream_content
-                                        live.update(Markdown(temp_buffer))
-                            
-                            elif tool_data['name'] == 'artifacts':
-                                try:
-                                    artifact_data = json_lib.loads(tool_data['input_json'])
-                                    content = artifact_data.get('content', '')
-                                    
-                                    if content:
-                                        if use_raw:
-                                            if not tool_data['header_shown']:
-                                                title = artifact_data.get('title', 'Artifact')
-                                                lang = artifact_data.get('language', '')
-                                                header = f"\n\n### {title}\n\n```{lang}\n"
-                                                click.echo(header, nl=False)
-                                                tool_data['header_shown'] = True
-                                            
-                                            new_content = content[len(tool_data['last_streamed_content']):]
-                                            if new_content:
-                                                click.echo(new_content, nl=False)
-                                            tool_data['last_streamed_content'] = content
-                                        else:
-                                            title = artifact_data.get('title', 'Artifact')
-                                            lang = artifact_data.get('language', '')
-                                            stream_content = f"\n\n### {title}\n\n```{lang}\n{content}\n```\n"
-                                            temp_buffer = markdown_buffer + stream_content
-                                            live.update(Markdown(temp_buffer))
-                                except json_lib.JSONDecodeError:
-                                    pass
-                    
-                    elif event_type == 'content_block_stop':
-                        if current_tool_id and current_tool_id in tool_use_buffer:
-                            tool_data = tool_use_buffer[current_tool_id]
-                            tool_data['complete'] = True
-                            
-                            if tool_data['name'] in ('create_file', 'artifacts'):
-                                if use_raw and tool_data['header_shown']:
-                                    click.echo("\n```\n", nl=False)
-                            
-                            tool_output = format_tool_use(tool_data['name'], tool_data['input_json'])
-                            if tool_output:
-                                markdown_buffer += tool_output
-                                
-                                if use_raw:
-                                    if not tool_data.get('header_shown'):
-                                        click.echo(tool_output, nl=False)
-                                else:
-                                    live.update(Markdown(markdown_buffer))
-                            
-                            current_tool_id = None
-                
-                except json_lib.JSONDecodeError:
-                    pass
+                    for event_type, event in watch_stall(iter_json_events(chunks)):
+                        stopped = stopped or event_type in ('message_stop', 'error')
+                        handler = EVENT_HANDLERS.get(event_type)
+                        if handler:
+                            handler(state, event)
+                except (requests.RequestException, StreamStalled) as e:
+                    if not stopped:
+                        notify(f"Stream interrupted ({e}), fetching the rest of the reply from claude.ai...")
+                else:
+                    if not stopped:
+                        notify("Stream ended early, fetching the rest of the reply from claude.ai...")
+                if not stopped:
+                    recovered = recover_reply(session, org_id, conversation_uuid, parent_message_uuid, prompt)
+            if recovered:
+                apply_recovered(state, recovered)
         
         finally:
+            if writer:
+                writer.flush()
             if live:
+                renderer.finish()
                 live.stop()
+            if reader:
+                reader.stop()
+                click.echo(f"Stream: {reader.summary()}", err=True)
         
         if use_raw:
             click.echo()
         
         if output_file:
             with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(markdown_buffer)
+                f.write(state.markdown_buffer)
             click.echo(f"Output saved to {output_file}", err=True)
         
-        return markdown_buffer, new_message_uuid
+        return state.markdown_buffer, state.new_message_uuid
+    
+    except ReplyPending as e:
+        show(f"Error: {e}. Run 'sync' once it is done on claude.ai.", style="red")
+        return None, None
     
     except Exception as e:
-        console.print(f"Error: {e}", style="red")
+        show(f"Error: {e}", style="red")
         return None, None
 
 
@@ -306,35 +408,40 @@ def send_message(prompt, session, org_id, conversation_uuid, parent_message_uuid
 @click.argument('text', nargs=-1, required=True)
 @click.option('--output', '-o', type=click.Path(), help='Save output to file')
 @click.option('--raw', is_flag=True, help='Output raw markdown without formatting')
-def chat(text, output, raw):
+@click.option('--buffered', is_flag=True, help='Read the response on a separate thread and batch output writes')
+@click.option('--conversation', '-c', 'conversation', shell_complete=click_completer(complete_conversation_uuids),
+              help='Send to this conversation instead of the active one')
+def chat(text, output, raw, buffered, conversation):
     """Send a message to the active conversation."""
-    auth = get_auth_context()
+    auth = get_auth_context(conversation)
     if not auth:
         return
     
     session, org_id, conversation_uuid = auth
-    parent_message_uuid = get_parent_message_uuid()
+    parent_message_uuid = get_parent_message_uuid(conversation_uuid)
     prompt = " ".join(text)
     use_raw = raw or output or not sys.stdout.isatty()
     
-    settings = get_conversation_settings()
+    settings = get_conversation_settings(conversation_uuid)
     if settings is None:
-        response = claude.get_conversation_details(session, org_id, conversation_uuid)
+        response = cache.get_conversation_details(session, org_id, conversation_uuid, fresh=True)
         settings = response.json().get('settings', DEFAULT_SETTINGS) if response.status_code == 200 else DEFAULT_SETTINGS
-        set_active_conversation(conversation_uuid, parent_message_uuid, settings)
+        set_conversation_state(conversation_uuid, parent_message_uuid, settings)
     
     markdown_buffer, new_message_uuid = send_message(
         prompt, session, org_id, conversation_uuid, 
-        parent_message_uuid, settings, use_raw, output
+        parent_message_uuid, settings, use_raw, output, buffered
     )
     
+    # Only this conversation's parent changes, so a switch made meanwhile is kept
     if new_message_uuid:
-        set_active_conversation(conversation_uuid, new_message_uuid)
+        set_conversation_state(conversation_uuid, new_message_uuid)
 
 
 @click.command()
 @click.option('--raw', is_flag=True, help='Output raw markdown without formatting')
-def repl(raw):
+@click.option('--buffered', is_flag=True, help='Read responses on a separate thread and batch output writes')
+def repl(raw, buffered):
     """Start an interactive chat session with Claude."""
     auth = get_auth_context()
     if not auth:
@@ -346,9 +453,11 @@ def repl(raw):
     
     settings = get_conversation_settings()
     if settings is None:
-        response = claude.get_conversation_details(session, org_id, conversation_uuid)
+        response = cache.get_conversation_details(session, org_id, conversation_uuid, fresh=True)
         settings = response.json().get('settings', DEFAULT_SETTINGS) if response.status_code == 200 else DEFAULT_SETTINGS
-        set_active_conversation(conversation_uuid, parent_message_uuid, settings)
+        set_conversation_state(conversation_uuid, parent_message_uuid, settings)
+    
+    console = None if use_raw else get_console()
     
     if not use_raw:
         console.print("\n[bold cyan]Claude REPL[/bold cyan]")
@@ -382,12 +491,13 @@ def repl(raw):
                 
                 markdown_buffer, new_message_uuid = send_message(
                     user_input, session, org_id, conversation_uuid,
-                    parent_message_uuid, settings, use_raw
+                    parent_message_uuid, settings, use_raw, buffered=buffered
                 )
                 
                 if new_message_uuid:
                     parent_message_uuid = new_message_uuid
-                    set_active_conversation(conversation_uuid, new_message_uuid)
+                    set_conversation_state(conversation_uuid, new_message_uuid)
+                    get_state().flush()
                 else:
                     # If we failed to send, break out
                     break
@@ -411,7 +521,7 @@ def repl(raw):
                 break
     
     except Exception as e:
-        console.print(f"\nError: {e}", style="red")
+        show(f"\nError: {e}", style="red")
 
 
 @click.command()
@@ -431,7 +541,7 @@ def sync():
     click.echo("Syncing conversation...")
     
     try:
-        response = claude.get_conversation_details(session, org_id, conversation_uuid)
+        response = cache.get_conversation_details(session, org_id, conversation_uuid, fresh=True)
         
         if response.status_code == 200:
             data = response.json()
@@ -468,9 +578,12 @@ def sync():
 @click.argument('limit', default=30, type=int)
 @click.option('--output', '-o', type=click.Path(), help='Save output to file')
 @click.option('--raw', is_flag=True, help='Output raw markdown without formatting')
-def history(limit, output, raw):
+@click.option('--offline', is_flag=True, help='Read the conversation from the local cache only')
+@click.option('--conversation', '-c', 'conversation', shell_complete=click_completer(complete_conversation_uuids),
+              help='Show this conversation instead of the active one')
+def history(limit, output, raw, offline, conversation):
     """View chat history of the active conversation."""
-    auth = get_auth_context()
+    auth = get_auth_context(conversation)
     if not auth:
         return
     
@@ -478,15 +591,19 @@ def history(limit, output, raw):
     use_raw = raw or output or not sys.stdout.isatty()
     markdown_buffer = ""
     
+    if not use_raw:
+        from rich.markdown import Markdown
+        console = get_console()
+    
     try:
-        response = claude.get_conversation_details(session, org_id, conversation_uuid)
+        response = cache.get_conversation_details(session, org_id, conversation_uuid, offline=offline)
         
         if response.status_code == 200:
             messages = response.json().get('chat_messages', [])
             
             if not messages:
                 msg = "No messages in this conversation yet."
-                console.print(msg, style="yellow") if not use_raw else click.echo(msg)
+                show(msg, style="yellow") if not use_raw else click.echo(msg)
                 return
             
             messages_to_show = messages[-limit:] if len(messages) > limit else messages
@@ -499,7 +616,7 @@ def history(limit, output, raw):
                     markdown_buffer += info + "\n"
                     click.echo(info)
                 else:
-                    console.print(info, style="dim italic")
+                    show(info, style="dim italic")
             
             for msg in messages_to_show:
                 sender = msg.get('sender')
@@ -539,10 +656,12 @@ def history(limit, output, raw):
                 click.echo(f"\nOutput saved to {output}", err=True)
         
         elif response.status_code in (401, 403):
-            console.print("Authentication failed. Your cookies may have expired.", style="red")
-            console.print("Run 'update-account' to refresh your cookies.", style="red")
+            show("Authentication failed. Your cookies may have expired.", style="red")
+            show("Run 'update-account' to refresh your cookies.", style="red")
+        elif offline and response.status_code == 504:
+            show(cache.OFFLINE_MISS_MESSAGE, style="yellow")
         else:
-            console.print(f"Failed to fetch history (status code: {response.status_code})", style="red")
+            show(f"Failed to fetch history (status code: {response.status_code})", style="red")
     
     except Exception as e:
-        console.print(f"Error: {e}", style="red")
\ No newline at end of file
+        show(f"Error: {e}", style="red")
\ No newline at end of file
@@ -1,91 +1,203 @@
 import click
 import uuid
 import sys, os
+import threading
 from datetime import datetime
 from src.helpers import (
     get_active_session,
+    get_active_account,
     get_active_conversation,
     set_active_conversation,
+    pool_session,
+    open_atomic,
 )
-from src.config import extension_languages as ext_lang
+from src.listing import ListingError, list_conversations, list_with_progress
+from src.metadata import get_metadata
+from src.state import get_state
+from src.fuzzy import fuzzy_filter
+from src.completion import (
+    click_completer,
+    complete_accounts,
+    complete_conversation_names,
+    complete_conversation_uuids,
+    slugify,
+)
+from src.content import extract_message_text
 import src.claude as claude
+import src.cache as cache
+
+
+def stream_conversation_rows(session, org_id, limit=None, active_convo=None, offline=False):
+    """List conversations, printing numbered rows as each page arrives
+
+    Returns (convo_map, regular, starred) where convo_map maps the shown
+    numbers to conversations. With offline=True the cached conversations
+    are listed instead. Raises ListingError.
+    """
+    convo_map = {}
+    
+    def show_total(total):
+        click.echo(f"Loading {total} conversations...", err=True)
+    
+    def show_page(starred, page):
+        for convo in page:
+            index = len(convo_map) + 1
+            convo_map[index] = convo
+            name = convo.get('name', 'Untitled')
+            uuid = convo.get('uuid', '')
+            arrow = "-> " if uuid == active_convo else "   "
+            star = "[*] " if starred else ""
+            click.echo(f"{arrow}{index}) {star}{name} ({uuid[:8]}...)")
+    
+    if offline:
+        regular_convos, starred_convos = cached_conversation_lists(org_id)
+        show_page(True, starred_convos)
+        show_page(False, regular_convos)
+        return convo_map, regular_convos, starred_convos
+    
+    regular_convos, starred_convos = list_conversations(session, org_id, limit, on_page=show_page, on_total=show_total)
+    cache.remember_updated_at(regular_convos + starred_convos)
+    return convo_map, regular_convos, starred_convos
+
+
+def cached_conversation_lists(org_id):
+    """Return (regular, starred) conversations from the local cache"""
+    cached = cache.get_cache().list_conversations(org_id)
+    return [c for c in cached if not c['is_starred']], [c for c in cached if c['is_starred']]
+
+
+def switch_to_conversation(session, org_id, conversation_uuid, label):
+    """Make a conversation active, picking up its last message and settings"""
+    click.echo("Loading conversation...")
+    response = cache.get_conversation_details(session, org_id, conversation_uuid, fresh=True)
+    
+    if response.status_code != 200:
+        click.echo("Failed to load conversation details")
+        return
+    
+    convo_data = response.json()
+    messages = convo_data.get('chat_messages', [])
+    settings = convo_data.get('settings', {})
+
+    if messages:
+        last_message_uuid = messages[-1]['uuid']
+        set_active_conversation(conversation_uuid, last_message_uuid, settings)
+        click.echo(f"Switched to {label}")
+    else:
+        set_active_conversation(conversation_uuid, "00000000-0000-4000-8000-000000000000", settings)
+        click.echo(f"Switched to {label} (empty)")
+
+
+def pick_conversation(session, org_id):
+    """Fuzzy picker over the metadata cache, refreshed in the background when stale"""
+    from src.picker import ConversationPicker
+    
+    metadata = get_metadata()
+    picker = ConversationPicker(metadata.conversations(org_id), active_uuid=get_active_conversation())
+    
+    def refresh():
+        picker.set_status("refreshing...")
+        try:
+            regular_convos, starred_convos = list_conversations(session, org_id)
+        except Exception as e:
+            picker.set_status(f"refresh failed: {e}")
+            return
+        cache.remember_updated_at(regular_convos + starred_convos)
+        picker.set_items(metadata.conversations(org_id))
+    
+    if not metadata.is_fresh(org_id):
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    convo = picker.run()
+    if convo:
+        switch_to_conversation(session, org_id, convo['uuid'], f"'{convo.get('name') or 'Untitled'}'")
+
+
+def resolve_conversation(selector, convos):
+    """Find the conversation a selector names: a uuid, a uuid prefix or a (fuzzy) name"""
+    for convo in convos:
+        if convo['uuid'] == selector:
+            return convo
+    
+    by_prefix = [c for c in convos if c['uuid'].startswith(selector.lower())]
+    if len(by_prefix) == 1:
+        return by_prefix[0]
+    
+    for convo in convos:
+        if slugify(convo['name']) == selector.lower():
+            return convo
+    
+    matches = fuzzy_filter(selector.replace('-', ' ').replace('_', ' '), convos, key=lambda c: c['name'] or 'Untitled')
+    return matches[0] if matches else None
+
+
+def select_conversation(session, org_id, selector):
+    """Switch to the conversation named by selector, listing conversations first if none are cached"""
+    metadata = get_metadata()
+    convos = metadata.conversations(org_id)
+    convo = resolve_conversation(selector, convos)
+    
+    if not convo and not metadata.is_fresh(org_id):
+        try:
+            list_conversations(session, org_id)
+        except ListingError as e:
+            click.echo(f"Failed to fetch conversations (status: {e.status_code})")
+            return
+        convo = resolve_conversation(selector, metadata.conversations(org_id))
+    
+    if not convo:
+        click.echo(f"No conversation matches '{selector}'")
+        return
+    
+    switch_to_conversation(session, org_id, convo['uuid'], f"'{convo['name'] or 'Untitled'}'")
 
 
 @click.command()
-@click.option('--limit', default=200, help='Number of conversations to fetch')
-def conversations(limit):
-    """List all conversations for the active account and select one to switch to"""
+@click.argument('selector', required=False, shell_complete=click_completer(complete_conversation_names))
+@click.option('--limit', default=200, help='Number of conversations to fetch with --list')
+@click.option('--list', 'as_list', is_flag=True, help='Print a numbered list instead of the interactive picker')
+def conversations(selector, limit, as_list):
+    """Pick a conversation of the active account to switch to
+
+    SELECTOR switches directly to a conversation by uuid, uuid prefix or name.
+    """
     session, org_id = get_active_session()
     
     if not session or not org_id:
         click.echo("No active account. Use 'switch-account' to select one.")
         return
     
+    if selector:
+        return select_conversation(session, org_id, selector)
+    
+    if not as_list and sys.stdin.isatty() and sys.stdout.isatty():
+        return pick_conversation(session, org_id)
+    
     click.echo("Fetching conversations...")
     try:
-        response_regular = claude.get_conversations(session, org_id, limit, starred=False)
-        response_starred = claude.get_conversations(session, org_id, limit, starred=True)
+        convo_map, regular_convos, starred_convos = stream_conversation_rows(
+            session, org_id, limit, active_convo=get_active_conversation()
+        )
         
-        if response_regular.status_code == 200 and response_starred.status_code == 200:
-            regular_convos = response_regular.json()
-            starred_convos = response_starred.json()
-            
-            if not regular_convos and not starred_convos:
-                click.echo("No conversations found.")
-                return
-            
-            active_convo = get_active_conversation()
-            
-            convo_map = {}
-            
-            for i, convo in enumerate(reversed(regular_convos)):
-                index = len(regular_convos) + len(starred_convos) - i
-                name = convo.get('name', 'Untitled')
-                uuid = convo.get('uuid', '')
-                arrow = "-> " if uuid == active_convo else "   "
-                click.echo(f"{arrow}{index}) {name} ({uuid[:8]}...)")
-                convo_map[index] = uuid
-            
-            for i, convo in enumerate(reversed(starred_convos)):
-                index = len(starred_convos) - i
-                name = convo.get('name', 'Untitled')
-                uuid = convo.get('uuid', '')
-                arrow = "-> " if uuid == active_convo else "   "
-                click.echo(f"{arrow}{index}) [*] {name} ({uuid[:8]}...)")
-                convo_map[index] = uuid
-            
-            total = len(regular_convos) + len(starred_convos)
-            click.echo(f"\nTotal: {total} conversations ({len(starred_convos)} starred)")
-            
-            selection = click.prompt("\nSelect conversation (number or press Enter to skip)", 
-                                    default="", show_default=False)
-            
-            if selection and selection.isdigit():
-                index = int(selection)
-                if index in convo_map:
-                    uuid = convo_map[index]
-                    
-                    click.echo("Loading conversation...")
-                    response = claude.get_conversation_details(session, org_id, uuid)
-                    
-                    if response.status_code == 200:
-                        convo_data = response.json()
-                        messages = convo_data.get('chat_messages', [])
-                        settings = convo_data.get('settings', {})
-
-                        if messages:
-                            last_message_uuid = messages[-1]['uuid']
-                            set_active_conversation(uuid, last_message_uuid, settings)
-                            click.echo(f"Switched to conversation #{index}")
-                        else:
-                            set_active_conversation(uuid, "00000000-0000-4000-8000-000000000000", settings)
-                            click.echo(f"Switched to conversation #{index} (empty)")
-                    else:
-                        click.echo("Failed to load conversation details")
-                else:
-                    click.echo("Invalid conversation number")
-                    
-        elif response_regular.status_code == 401 or response_regular.status_code == 403:
+        if not convo_map:
+            click.echo("No conversations found.")
+            return
+        
+        total = len(regular_convos) + len(starred_convos)
+        click.echo(f"\nTotal: {total} conversations ({len(starred_convos)} starred)")
+        
+        selection = click.prompt("\nSelect conversation (number or press Enter to skip)", 
+                                default="", show_default=False)
+        
+        if selection and selection.isdigit():
+            index = int(selection)
+            if index in convo_map:
+                switch_to_conversation(session, org_id, convo_map[index]['uuid'], f"conversation #{index}")
+            else:
+                click.echo("Invalid conversation number")
+                
+    except ListingError as e:
+        if e.status_code in (401, 403):
             click.echo("Authentication failed. Your cookies may have expired.")
             click.echo("Run 'update-account' to refresh your cookies.")
         else:
@@ -114,6 +226,7 @@ def new(name):
         if response.status_code == 201 or response.status_code == 200:
             data = response.json()
             click.echo(f"Conversation created: {data['uuid'][:8]}...")
+            get_metadata().put(org_id, conversation_uuid, data.get('name') or name, updated_at=data.get('updated_at'))
 
             default_settings = {
                 "enabled_web_search": True,
@@ -132,7 +245,8 @@ def new(name):
 
 @click.command()
 @click.argument('new_name', nargs=-1, required=False)
-def name(new_name):
+@click.option('--offline', is_flag=True, help='Read the conversation from the local cache only')
+def name(new_name, offline):
     """View or rename the active conversation"""
     session, org_id = get_active_session()
     conversation_uuid = get_active_conversation()
@@ -145,8 +259,12 @@ def name(new_name):
         click.echo("No active conversation. Use 'conversations' to select one.")
         return
     
+    if offline and new_name:
+        click.echo("Can't rename a conversation with --offline.")
+        return
+    
     try:
-        response = claude.get_conversation_details(session, org_id, conversation_uuid)
+        response = cache.get_conversation_details(session, org_id, conversation_uuid, offline=offline)
         
         if response.status_code == 200:
             convo_data = response.json()
@@ -163,12 +281,15 @@ def name(new_name):
             
             if rename_response.status_code == 200 or rename_response.status_code == 202:
                 click.echo(f"Conversation renamed successfully!")
+                get_metadata().rename(conversation_uuid, new_name_str)
             else:
                 click.echo(f"Failed to rename conversation (status code: {rename_response.status_code})")
                 
         elif response.status_code == 401 or response.status_code == 403:
             click.echo("Authentication failed. Your cookies may have expired.")
             click.echo("Run 'update-account' to refresh your cookies.")
+        elif offline and response.status_code == 504:
+            click.echo(cache.OFFLINE_MISS_MESSAGE)
         else:
             click.echo(f"Failed to fetch conversation (status code: {response.status_code})")
             
@@ -177,7 +298,7 @@ def name(new_name):
 
 
 @click.command()
-@click.argument('conversation_uuid', required=False)
+@click.argument('conversation_uuid', required=False, shell_complete=click_completer(complete_conversation_uuids))
 def delete(conversation_uuid):
     """Delete a conversation"""
     session, org_id = get_active_session()
@@ -201,6 +322,10 @@ def delete(conversation_uuid):
         
         if response.status_code in [200, 204]:
             click.echo(f"Conversation deleted")
+            cache.get_cache().delete(conversation_uuid)
+            get_metadata().delete(conversation_uuid)
+            get_state().forget_conversation(conversation_uuid)
+            forget_indexed(conversation_uuid)
             
             if conversation_uuid == get_active_conversation():
                 set_active_conversation(None, None)
@@ -211,6 +336,30 @@ def delete(conversation_uuid):
         click.echo(f"Error: {e}")
 
 
+def forget_indexed(conversation_uuid):
+    """Drop a deleted conversation from the local search and related indexes, where they exist"""
+    from src.search_index import SearchIndex, INDEX_FILE
+    
+    if os.path.exists(INDEX_FILE):
+        index = SearchIndex()
+        try:
+            index.remove_conversation(conversation_uuid)
+            index.commit()
+        finally:
+            index.close()
+    
+    try:
+        from src.related import RelatedIndex, RELATED_DIR
+    except ImportError:
+        return
+    
+    if os.path.isdir(RELATED_DIR):
+        index = RelatedIndex()
+        if conversation_uuid in index.rows:
+            index.remove_conversation(conversation_uuid)
+            index.save()
+
+
 @click.command()
 def link():
     """Get the link to the active conversation"""
@@ -221,22 +370,32 @@ def link():
 @click.command()
 @click.argument('query', nargs=-1, required=True)
 @click.option('-o', '--output', default=None, help='Output file or folder path')
-def search(query, output):
-    """Search for a phrase in the active conversation"""
+@click.option('--offline', is_flag=True, help='Search the locally cached copy only')
+@click.option('--all', 'search_all', is_flag=True, help='Search every locally stored conversation')
+@click.option('--mirror', 'mirror_dir', default="mirror", help='Mirror directory to index with --all')
+@click.option('--limit', default=20, help='Number of results to show with --all')
+def search(query, output, offline, search_all, mirror_dir, limit):
+    """Search for a phrase in the active conversation, or everywhere with --all"""
     session, org_id = get_active_session()
     conversation_uuid = get_active_conversation()
     
     if not session or not org_id:
         return click.echo("No active account. Use 'switch-account' to select one.")
-    if not conversation_uuid:
-        return click.echo("No active conversation. Use 'conversations' to select one.")
     
     query_str = " ".join(query)
     
+    if search_all:
+        return search_index(query_str, org_id, mirror_dir, limit)
+    
+    if not conversation_uuid:
+        return click.echo("No active conversation. Use 'conversations' to select one.")
+    
     try:
-        response = claude.get_conversation_details(session, org_id, conversation_uuid)
+        response = cache.get_conversation_details(session, org_id, conversation_uuid, offline=offline)
         
         if response.status_code != 200:
+            if offline:
+                return click.echo(cache.OFFLINE_MISS_MESSAGE)
             msg = "Authentication failed. Your cookies may have expired.\nRun 'update-account' to refresh your cookies." if response.status_code in [401, 403] else "Failed to fetch conversation"
             return click.echo(msg)
         
@@ -244,51 +403,7 @@ def search(query, output):
         matches = []
         
         for msg in messages:
-            text_parts, file_contents = [], []
-            
-            for content in msg.get('content', []):
-                ctype, cdata = content.get('type'), content.get('input', {})
-                
-                if ctype == 'text':
-                    text_parts.append(content.get('text', ''))
-                
-                elif ctype == 'tool_use':
-                    tool = content.get('name', '')
-                    
-                    # Artifacts tool 
-                    if tool == 'artifacts':
-                        if art_content := cdata.get('content'):
-                            art_title = cdata.get('title', 'unknown')
-                            file_contents.append(f"\n--- Artifact: {art_title} ---\n{art_content}\n")
-                            text_parts.append(art_content)
-                    
-                    elif tool == 'create_file':
-                        if file_text := cdata.get('file_text'):
-                            file_contents.append(f"\n--- Created File: {cdata.get('path', 'unknown')} ---\n{file_text}\n")
-                            text_parts.append(file_text)
-                    
-                    elif tool == 'str_replace':
-                        old, new = cdata.get('old_str', ''), cdata.get('new_str', '')
-                        if old or new:
-                            text_parts.append(f"[Edit] Old: {old} -> New: {new}")
-                
-                elif ctype == 'tool_result':
-                    tool = content.get('name', '')
-                    
-                    if tool == 'present_files':
-                        for rc in content.get('content', []):
-                            if isinstance(rc, dict) and (fp := rc.get('file_path')):
-                                try:
-                                    with open(fp, 'r', encoding='utf-8') as f:
-                                        file_data = f.read()
-                                        file_contents.append(f"\n--- Presented File: {fp} ---\n{file_data}\n")
-                                        text_parts.append(file_data)
-                                except: pass
-                    
-                    elif tool in ['bash_tool', 'view']:
-                        for rc in content.get('content', []):
-                            if isinstance(rc, dict) and rc.get('type') == 'text':
-                                text_parts.append(rc.get('text', ''))
+            text_parts, file_contents = extract_message_text(msg)
             
             full_text = ' '.join(text_parts)
             if query_str.lower() in full_text.lower():
@@ -364,18 +479,128 @@ def search(query, output):
         click.echo(f"Error: {e}")
 
 
+def search_index(query_str, org_id, mirror_dir, limit):
+    """Search the local full-text index after bringing it up to date"""
+    from src.search_index import SearchIndex
+    import time
+    
+    try:
+        index = SearchIndex()
+    except Exception as e:
+        return click.echo(f"Could not open search index: {e}")
+    
+    try:
+        indexed, removed = index.update(org_id, mirror_dir)
+        if indexed:
+            click.echo(f"Indexed {indexed} new or updated conversations", err=True)
+        if removed:
+            click.echo(f"Removed {removed} conversations that are no longer stored", err=True)
+        
+        start = time.perf_counter()
+        results = index.search(query_str, org_id, limit)
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        index.close()
+    
+    if not results:
+        return click.echo("No matches found.")
+    
+    for i, r in enumerate(results, 1):
+        name = r['name'] or 'Untitled'
+        snippet = r['snippet'].replace('\n', ' ')
+        click.echo(f"{i}) {name} ({r['conversation_uuid'][:8]}...) [{r['sender']}]")
+        click.echo(f"   {snippet}")
+    
+    click.echo(f"\n{len(results)} results in {elapsed:.1f} ms", err=True)
+
+
+@click.command()
+@click.argument('query', nargs=-1, required=False)
+@click.option('--limit', '-k', default=10, help='Number of related conversations to show')
+@click.option('--mirror', 'mirror_dir', default="mirror", help='Mirror directory to include')
+@click.option('--offline', is_flag=True, help='Read the active conversation from the local cache only')
+def related(query, limit, mirror_dir, offline):
+    """Find stored conversations similar to a query or the active conversation"""
+    session, org_id = get_active_session()
+
+    if not session or not org_id:
+        click.echo("No active account. Use 'switch-account' to select one.")
+        return
+
+    try:
+        from src.related import RelatedIndex, conversation_text, vectorize
+    except ImportError:
+        return click.echo("'related' needs numpy. Install it with: pip install numpy")
+    import time
+
+    exclude = None
+    if query:
+        text = ' '.join(query)
+    else:
+        exclude = get_active_conversation()
+        if not exclude:
+            return click.echo("No query given and no active conversation. Use 'new' or 'conversations' first.")
+
+        response = cache.get_conversation_details(session, org_id, exclude, offline=offline)
+        if response.status_code != 200:
+            return click.echo(cache.OFFLINE_MISS_MESSAGE if offline else f"Failed to fetch conversation: {response.status_code}")
+        text = conversation_text(response.json())
+
+    index = RelatedIndex()
+    indexed, removed = index.update(org_id, mirror_dir)
+    if indexed:
+        click.echo(f"Vectorized {indexed} new or updated conversations", err=True)
+    if removed:
+        click.echo(f"Removed {removed} conversations that are no longer stored", err=True)
+
+    start = time.perf_counter()
+    results = index.query(vectorize(text, index.dims), org_id, limit, exclude=exclude)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if not results:
+        return click.echo("No related conversations found.")
+
+    for i, r in enumerate(results, 1):
+        click.echo(f"{i}) {r['name'] or 'Untitled'} ({r['uuid'][:8]}...) {r['score']:.3f}")
+
+    click.echo(f"\n{len(results)} of {index.count} conversations in {elapsed:.1f} ms", err=True)
+
+
 @click.command()
 @click.argument('scope', type=click.Choice(['all', 'this', 'choose']), required=False)
-@click.argument('format', type=click.Choice(['json', 'js', 'markdown', 'md']), required=False)
+@click.argument('format', type=click.Choice(['json', 'js', 'ndjson', 'markdown', 'md']), required=False)
 @click.argument('directory', required=False)
-def export(scope, format, directory):
-    """Export conversations to JSON or Markdown format"""
+@click.option('--offline', is_flag=True, help='Export from the local cache without contacting claude.ai')
+@click.option('--jobs', '-j', default=8, show_default=True, help='Number of concurrent downloads')
+@click.option('--rate', default=5.0, show_default=True, help='Maximum requests per second per account (0 for no limit)')
+@click.option('--retries', default=3, show_default=True, help='Retries per conversation on rate limits and server errors')
+@click.option('--dedupe', is_flag=True, help='Store artifact and file bodies once under blobs/ and reference them by hash')
+@click.option('--conversation', '-c', 'chosen', multiple=True, shell_complete=click_completer(complete_conversation_uuids),
+              help="Conversation uuid to export with 'choose' instead of prompting (repeatable)")
+@click.option('--account', '-a', 'accounts', multiple=True, shell_complete=click_completer(complete_accounts),
+              help='Also download with this account of the same organization (repeatable)')
+@click.option('--assign', type=click.Choice(['least-loaded', 'round-robin']), default='least-loaded', show_default=True,
+              help='How downloads are handed to accounts')
+def export(scope, format, directory, offline, jobs, rate, retries, dedupe, chosen, accounts, assign):
+    """Export conversations to JSON, NDJSON or Markdown, as files or one .tar.gz/.tar.zst"""
+    from src.concurrency import run_concurrently
+    from src.scheduler import account_pool
+    from src.blob_store import BlobStore
+    from src.export_manifest import ExportManifest
+    from src.export_writers import WRITERS, ExportArchive, is_archive_path
+    
     session, org_id = get_active_session()
     
     if not session or not org_id:
         click.echo("No active account. Use 'switch-account' to select one.")
         return
     
+    if chosen and scope not in (None, 'choose'):
+        click.echo("--conversation can only be used with 'choose'.")
+        return
+    if chosen:
+        scope = 'choose'
+    
     # Interactive mode if no arguments
     if not scope:
         click.echo("Export options:\n")
@@ -394,22 +619,22 @@ def export(scope, format, directory):
     if not format:
         click.echo("\n1) json")
         click.echo("2) markdown")
+        click.echo("3) ndjson (one message per line)")
         
         format_choice = click.prompt("\nEnter option", type=int)
         
-        if format_choice not in [1, 2]:
+        if format_choice not in [1, 2, 3]:
             click.echo("Invalid option")
             return
         
-        format = 'json' if format_choice == 1 else 'md'
+        format = ['json', 'md', 'ndjson'][format_choice - 1]
     
     # Normalize format
     if format in ['js', 'json']:
         format = 'json'
-        file_ext = 'json'
-    else:
+    elif format != 'ndjson':
         format = 'md'
-        file_ext = 'md'
+    file_ext = format
     
     # Get directory for all/choose modes
     if scope in ['all', 'choose'] and not directory:
@@ -421,205 +646,134 @@ def export(scope, format, directory):
         name = '-'.join(name.split())
         return name[:100] or 'untitled'
     
-    def format_as_markdown(convo_data):
-        lines = []
-        name = convo_data.get('name', 'Untitled')
-        uuid = convo_data.get('uuid', '')
-        created = convo_data.get('created_at', '')
-        messages = convo_data.get('chat_messages', [])
+    def fetch_conversation_lists(expected=()):
+        """Return every (regular, starred) conversation, or None on failure"""
+        if offline:
+            return cached_conversation_lists(org_id)
+        
+        try:
+            regular_convos, starred_convos = list_with_progress(session, org_id, expected=expected)
+        except ListingError:
+            return None
+        
+        cache.remember_updated_at(regular_convos + starred_convos)
+        return regular_convos, starred_convos
+    
+    # The active account always takes part; rate limited accounts sit out while the others continue
+    names = list(dict.fromkeys([get_active_account()] + list(accounts))) if accounts else []
+    pool = None if offline else account_pool(names, rate, jobs, assign, org_id=org_id)
+    
+    def open_target():
+        """Manifest-tracked directory, or a single archive when the path names one"""
+        if is_archive_path(directory):
+            if os.path.dirname(directory):
+                os.makedirs(os.path.dirname(directory), exist_ok=True)
+            return ExportArchive(directory)
+        os.makedirs(directory, exist_ok=True)
+        return ExportManifest(directory, format, dedupe)
+    
+    def export_conversation(conv_uuid, conv_name, target=None, updated_at=None, blobs=None):
+        """Fetch and write one conversation, raising on failure
 
-        def format_timestamp(ts):
-            try:
-                from datetime import datetime
-                dt = datetime.fromisoformat(ts.replace('Z', '+00:00')).astimezone()
-                return dt.strftime('%B %d, %Y at %I:%M %p')
-            except:
-                return ts
+        With a target, returns 'new', 'updated' or 'skipped' and leaves
+        conversations whose updated_at hasn't changed untouched.
+        """
+        if target and target.is_current(conv_uuid, updated_at):
+            return 'skipped'
         
-        lines.append(f"# {name}\n")
-        lines.append(f"> **Conversation ID:** `{uuid}`  ")
-        lines.append(f"> **Created:** {format_timestamp(created)}  ")
-        lines.append(f"> **Messages:** {len(messages)}\n")
-        lines.append("---\n")
+        # Up-to-date cache hits never reach claude.ai, so they skip the accounts' rate limits
+        cached = updated_at is not None and cache.get_cache().get_updated_at(conv_uuid) == updated_at
+        if offline or cached:
+            response = cache.get_conversation_details(session, org_id, conv_uuid, offline=offline, updated_at=updated_at)
+        else:
+            response = pool.call(
+                lambda account: cache.get_conversation_details(account.session, org_id, conv_uuid, updated_at=updated_at),
+                retries
+            )
         
-        for idx, msg in enumerate(messages, 1):
-            sender = msg.get('sender', 'unknown')
-            timestamp = msg.get('created_at', '')
-            
-            lines.append(f"## {sender.title()} · Message {idx}")
-            lines.append(f"<sub>{format_timestamp(timestamp)}</sub>\n")
-            
-            has_content = False
-            
-            for content in msg.get('content', []):
-                ctype = content.get('type')
-                
-                if ctype == 'text':
-                    text = content.get('text', '').strip()
-                    if text:
-                        lines.append(text + '\n')
-                        has_content = True
-                
-                elif ctype == 'tool_use':
-                    tool = content.get('name', '')
-                    cdata = content.get('input', {})
-                    
-                    if tool == 'artifacts':
-                        art_content = cdata.get('content', '').strip()
-                        
-                        if not art_content:
-                            continue
-                        
-                        title = cdata.get('title', 'Artifact')
-                        art_type = cdata.get('type', '')
-                        command = cdata.get('command', '')
-                        
-                        if command == 'update':
-                            lines.append(f"\n### Artifact Update: {title}\n")
-                        else:
-                            lines.append(f"\n### Artifact: {title}\n")
-                        
-                        lang_map = {
-                            'application/vnd.ant.code': cdata.get('language', ''),
-                            'text/html': 'html',
-                            'application/vnd.ant.react': 'jsx',
-                            'text/markdown': 'markdown',
-                            'image/svg+xml': 'svg',
-                            'application/vnd.ant.mermaid': 'mermaid'
-                        }
-                        lang = lang_map.get(art_type, '')
-                        
-                        if art_type:
-                            lines.append(f"> **Type:** `{art_type}`\n")
-                        
-                        lines.append(f"```{lang}\n{art_content}\n```\n")
-                        has_content = True
-                    
-                    elif tool == 'create_file':
-                        file_text = cdata.get('file_text', '').strip()
-                        
-                        if not file_text:
-                            continue
-                        
-                        path = cdata.get('path', 'unknown')
-                        lang = next((l for ext, l in ext_lang.items() if path.lower().endswith(ext)), '')
-                        
-                        if not lang:
-                            basename = path.split('/')[-1].lower()
-                            if basename in ['dockerfile', 'makefile', 'rakefile']:
-                                lang = basename
-                        
-                        lines.append(f"\n### Created File: `{path}`\n")
-                        lines.append(f"```{lang}\n{file_text}\n```\n")
-                        has_content = True
-                    
-                    elif tool == 'str_replace':
-                        old = cdata.get('old_str', '')
-                        new = cdata.get('new_str', '')
-                        path = cdata.get('path', '')
-                        
-                        if old or new:
-                            lines.append(f"\n### Edit: `{path}`\n")
-                            lines.append(f"```diff\n- {old}\n+ {new}\n```\n")
-                            has_content = True
-                
-                elif ctype == 'tool_result':
-                    tool = content.get('name', '')
-                    
-                    if tool == 'bash_tool':
-                        for rc in content.get('content', []):
-                            if isinstance(rc, dict) and rc.get('type') == 'text':
-                                result_text = rc.get('text', '').strip()
-                                if result_text:
-                                    lines.append(f"\n### Terminal Output\n")
-                                    lines.append(f"```bash\n{result_text}\n```\n")
-                                    has_content = True
-                    
-                    elif tool == 'view':
-                        for rc in content.get('content', []):
-                            if isinstance(rc, dict) and rc.get('type') == 'text':
-                                result_text = rc.get('text', '').strip()
-                                if result_text:
-                                    lines.append(f"\n### File View\n")
-                                    lines.append(f"```\n{result_text}\n```\n")
-                                    has_content = True
-                    
-                    elif tool == 'present_files':
-                        for rc in content.get('content', []):
-                            if isinstance(rc, dict) and (fp := rc.get('file_path')):
-                                try:
-                                    with open(fp, 'r', encoding='utf-8') as f:
-                                        file_data = f.read().strip()
-                                        if file_data:
-                                            lang = next((l for ext, l in ext_lang.items() if fp.lower().endswith(ext)), '')
-                                            lines.append(f"\n### Presented File: `{fp}`\n")
-                                            lines.append(f"```{lang}\n{file_data}\n```\n")
-                                            has_content = True
-                                except:
-                                    pass
-            
-            if not has_content:
-                lines.append("*[No content]*\n")
-            
-            lines.append("\n---\n")
+        if response.status_code != 200:
+            raise Exception("not cached" if offline else f"status code {response.status_code}")
         
-        return '\n'.join(lines)
-
-    def export_conversation(conv_uuid, conv_name, directory=None):
+        convo_data = response.json()
+        filename = sanitize_filename(conv_name or convo_data.get('name', 'untitled'))
+        
+        write = lambda f: WRITERS[format](convo_data, f, blobs)
+        
+        if not target:
+            with open_atomic(f"{filename}.{file_ext}") as f:
+                write(f)
+            return 'new'
+        
+        return target.export(conv_uuid, convo_data.get('updated_at', updated_at), filename, file_ext, write)
+    
+    def export_many(convos, target):
+        """Export conversations concurrently; returns counts of each outcome"""
+        pool_session(session, jobs)
+        blobs = BlobStore(target) if dedupe else None
         try:
-            response = claude.get_conversation_details(session, org_id, conv_uuid)
-            
-            if response.status_code != 200:
-                click.echo(f"Failed to fetch conversation {conv_uuid[:8]}...")
-                return False
-            
-            convo_data = response.json()
-            filename = sanitize_filename(conv_name or convo_data.get('name', 'untitled'))
-            
-            if directory:
-                filepath = os.path.join(directory, f"{filename}.{file_ext}")
-            else:
-                filepath = f"{filename}.{file_ext}"
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                if format == 'json':
-                    import json
-                    json.dump(convo_data, f, indent=2, ensure_ascii=False)
-                else:
-                    f.write(format_as_markdown(convo_data))
-            
-            return True
-        except Exception as e:
-            click.echo(f"Error exporting {conv_uuid[:8]}: {e}")
-            return False
+            results, failures = run_concurrently(
+                convos,
+                lambda c: export_conversation(c.get('uuid', ''), c.get('name'), target, c.get('updated_at'), blobs),
+                jobs,
+                label='Exporting',
+                item_name=lambda c: (c.get('name') or 'Untitled')[:40] if c else ''
+            )
+        except BaseException:
+            target.abort()
+            raise
+        target.save()
+        
+        for convo, e in failures:
+            click.echo(f"Failed to export {convo.get('uuid', '')[:8]}...: {e}", err=True)
+        
+        if blobs:
+            click.echo(f"\nDeduplicated {blobs.report()}")
+        if pool and len(pool.accounts) > 1:
+            click.echo("\nAccounts:")
+            for line in pool.summary():
+                click.echo(line)
+        
+        counts = {'new': 0, 'updated': 0, 'skipped': 0, 'failed': len(failures)}
+        for _, status in results:
+            counts[status] += 1
+        return counts
+    
+    def summary(counts):
+        return ", ".join(f"{n} {status}" for status, n in counts.items())
     
     # Handle different scopes
     if scope == 'this':
         conversation_uuid = get_active_conversation()
         
+        if dedupe:
+            click.echo("--dedupe needs a directory or archive, use it with 'all' or 'choose'.")
+            return
+        
         if not conversation_uuid:
             click.echo("No active conversation. Use 'conversations' to select one.")
             return
         
         click.echo("Exporting conversation...")
         
-        if export_conversation(conversation_uuid, None):
+        try:
+            export_conversation(conversation_uuid, None)
             click.echo("Export complete!")
+        except Exception as e:
+            click.echo(f"Failed to export conversation {conversation_uuid[:8]}...: {e}")
     
     elif scope == 'all':
-        os.makedirs(directory, exist_ok=True)
-        
         click.echo("Fetching conversations...")
         
         try:
-            response_regular = claude.get_conversations(session, org_id, 1000, starred=False)
-            response_starred = claude.get_conversations(session, org_id, 1000, starred=True)
+            # Exports the manifest holds are pruned by this listing, so it double-checks any it misses
+            exported = () if is_archive_path(directory) else ExportManifest(directory, format).entries
+            lists = fetch_conversation_lists(exported)
             
-            if response_regular.status_code != 200 or response_starred.status_code != 200:
+            if lists is None:
                 click.echo("Failed to fetch conversations")
                 return
             
-            all_convos = response_regular.json() + response_starred.json()
+            all_convos = lists[0] + lists[1]
             
             if not all_convos:
                 click.echo("No conversations found.")
@@ -627,58 +781,46 @@ def export(scope, format, directory):
             
             click.echo(f"Exporting {len(all_convos)} conversations...\n")
             
-            success_count = 0
-            with click.progressbar(all_convos, 
-                                label='Exporting',
-                                show_eta=True,
-                                show_percent=True,
-                                item_show_func=lambda c: c.get('name', 'Untitled')[:40] if c else '') as bar:
-                for convo in bar:
-                    conv_uuid = convo.get('uuid', '')
-                    conv_name = convo.get('name', 'Untitled')
-                    
-                    if export_conversation(conv_uuid, conv_name, directory):
-                        success_count += 1
+            target = open_target()
+            counts = export_many(all_convos, target)
+            
+            # The cache only holds some conversations, so offline can't tell which were deleted
+            if isinstance(target, ExportManifest) and not offline:
+                counts['removed'] = target.prune({c.get('uuid') for c in all_convos})
+                target.save()
             
-            click.echo(f"\nExport complete! {success_count}/{len(all_convos)} conversations exported to {directory}/")
+            click.echo(f"\nExport complete! {summary(counts)} in {directory}")
         
         except Exception as e:
             click.echo(f"Error: {e}")
     
+    elif scope == 'choose' and chosen:
+        # Names and updated_at from the metadata cache keep filenames and manifest skips working
+        known = {c['uuid']: c for c in get_metadata().conversations(org_id)}
+        convos = [known.get(conv_uuid, {'uuid': conv_uuid}) for conv_uuid in chosen]
+        
+        try:
+            target = open_target()
+            click.echo(f"Exporting {len(convos)} conversations...")
+            counts = export_many(convos, target)
+            click.echo(f"Export complete! {summary(counts)} in {directory}")
+        except Exception as e:
+            click.echo(f"Error: {e}")
+    
     elif scope == 'choose':
         click.echo("Fetching conversations...")
         
         try:
-            response_regular = claude.get_conversations(session, org_id, 200, starred=False)
-            response_starred = claude.get_conversations(session, org_id, 200, starred=True)
-            
-            if response_regular.status_code != 200 or response_starred.status_code != 200:
+            try:
+                convo_map, regular_convos, starred_convos = stream_conversation_rows(session, org_id, 200, offline=offline)
+            except ListingError:
                 click.echo("Failed to fetch conversations")
                 return
             
-            regular_convos = response_regular.json()
-            starred_convos = response_starred.json()
-            
-            if not regular_convos and not starred_convos:
+            if not convo_map:
                 click.echo("No conversations found.")
                 return
             
-            convo_map = {}
-            
-            for i, convo in enumerate(reversed(regular_convos)):
-                index = len(regular_convos) + len(starred_convos) - i
-                name = convo.get('name', 'Untitled')
-                uuid = convo.get('uuid', '')
-                click.echo(f"   {index}) {name} ({uuid[:8]}...)")
-                convo_map[index] = (uuid, name)
-            
-            for i, convo in enumerate(reversed(starred_convos)):
-                index = len(starred_convos) - i
-                name = convo.get('name', 'Untitled')
-                uuid = convo.get('uuid', '')
-                click.echo(f"   {index}) [*] {name} ({uuid[:8]}...)")
-                convo_map[index] = (uuid, name)
-            
             total = len(regular_convos) + len(starred_convos)
             click.echo(f"\nTotal: {total} conversations ({len(starred_convos)} starred)")
             
@@ -700,18 +842,13 @@ def export(scope, format, directory):
                 return
             
             # Only create directory after user confirms selection
-            os.makedirs(directory, exist_ok=True)
+            target = open_target()
             
             click.echo(f"Exporting {len(selected_indices)} conversations...")
             
-            success_count = 0
-            for index in selected_indices:
-                if index in convo_map:
-                    conv_uuid, conv_name = convo_map[index]
-                    if export_conversation(conv_uuid, conv_name, directory):
-                        success_count += 1
+            counts = export_many([convo_map[index] for index in selected_indices if index in convo_map], target)
             
-            click.echo(f"Export complete! {success_count}/{len(selected_indices)} conversations exported to {directory}/")
+            click.echo(f"Export complete! {summary(counts)} in {directory}")
         
         except Exception as e:
             click.echo(f"Error: {e}")
\ No newline at end of file
@@ -0,0 +1,64 @@
+import click
+import os
+import subprocess
+import sys
+import time
+import src.daemon as daemon
+
+
+def start_background(idle_timeout):
+    """Start a detached daemon and wait until it accepts connections"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(daemon.__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+
+    with open(daemon.LOG_FILE, "a") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.daemon", str(idle_timeout)],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=log, env=env, start_new_session=True
+        )
+
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        if process.poll() is not None:
+            return None
+        if daemon.control('status') is not None:
+            return process.pid
+        time.sleep(0.05)
+    return None
+
+
+@click.command('daemon')
+@click.argument('action', type=click.Choice(['start', 'stop', 'status']), default='status')
+@click.option('--foreground', is_flag=True, help='Run in this terminal instead of in the background')
+@click.option('--idle-timeout', default=daemon.IDLE_TIMEOUT, show_default=True, help='Seconds without commands before the daemon exits')
+def daemon_command(action, foreground, idle_timeout):
+    """Start, stop or check the background daemon that keeps sessions warm"""
+    if not daemon.supported():
+        click.echo("The daemon needs Unix domain sockets, which this platform doesn't have.")
+        return
+
+    if action == 'status':
+        status = daemon.control('status')
+        click.echo(f"Running: {status}" if status is not None else "Not running")
+
+    elif action == 'stop':
+        if daemon.control('stop') is None:
+            click.echo("Not running")
+            return
+        deadline = time.time() + 10
+        while os.path.exists(daemon.SOCKET_FILE) and time.time() < deadline:
+            time.sleep(0.05)
+        click.echo("Daemon stopped")
+
+    elif daemon.control('status') is not None:
+        click.echo(f"Already running on {daemon.SOCKET_FILE}")
+
+    elif foreground:
+        sys.exit(daemon.serve(idle_timeout))
+
+    else:
+        pid = start_background(idle_timeout)
+        if pid:
+            click.echo(f"Daemon {pid} listening on {daemon.SOCKET_FILE}")
+        else:
+            click.echo(f"Daemon failed to start, see {daemon.LOG_FILE}")
@@ -0,0 +1,118 @@
+import click
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.helpers import (
+    get_active_session,
+    pool_session,
+    write_file_atomic,
+)
+from src.listing import ListingError, list_with_progress
+from src.mirror_state import load_mirror_state, save_mirror_state, conversation_path
+import src.claude as claude
+
+CHECKPOINT_EVERY = 25
+CHECKPOINT_SECONDS = 5
+
+
+def list_all_conversations(session, org_id, limit=None, expected=()):
+    """Return every regular and starred conversation, or None on failure"""
+    try:
+        regular, starred = list_with_progress(session, org_id, limit, expected=expected)
+    except ListingError:
+        return None
+    return regular + starred
+
+
+@click.command()
+@click.argument('directory', default="mirror", required=False)
+@click.option('--workers', '-j', default=8, show_default=True, help='Number of concurrent downloads')
+@click.option('--limit', default=None, type=int, help='Only mirror the most recent N regular and N starred conversations')
+@click.option('--prune', is_flag=True, help='Delete mirrored conversations that no longer exist')
+def mirror(directory, workers, limit, prune):
+    """Mirror every conversation of the active account into a directory"""
+    session, org_id = get_active_session()
+
+    if not session or not org_id:
+        click.echo("No active account. Use 'switch-account' to select one.")
+        return
+
+    os.makedirs(os.path.join(directory, "conversations"), exist_ok=True)
+
+    state = load_mirror_state(directory)
+
+    click.echo("Fetching conversations...")
+    convos = list_all_conversations(session, org_id, limit, expected=state if prune else ())
+    if convos is None:
+        click.echo("Failed to fetch conversations")
+        return
+
+    # Only conversations that changed since the last run need downloading
+    todo = [
+        c for c in convos
+        if state.get(c['uuid']) != c.get('updated_at')
+        or not os.path.exists(conversation_path(directory, c['uuid']))
+    ]
+
+    if prune and limit is not None:
+        click.echo("Not pruning: --limit only lists part of the account.")
+    elif prune:
+        listed = {c['uuid'] for c in convos}
+        for conversation_uuid in [u for u in state if u not in listed]:
+            path = conversation_path(directory, conversation_uuid)
+            if os.path.exists(path):
+                os.remove(path)
+            del state[conversation_uuid]
+        save_mirror_state(directory, state)
+
+    click.echo(f"{len(convos)} conversations, {len(convos) - len(todo)} up to date, {len(todo)} to download")
+    if not todo:
+        return
+
+    pool_session(session, workers)
+
+    def download(convo):
+        response = claude.get_conversation_details(session, org_id, convo['uuid'])
+        if response.status_code != 200:
+            raise Exception(f"status code {response.status_code}")
+        write_file_atomic(conversation_path(directory, convo['uuid']), response.content, mode='wb')
+        return len(response.content)
+
+    done = failed = 0
+    total_bytes = 0
+    since_checkpoint = 0
+    last_checkpoint = start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    try:
+        futures = {executor.submit(download, c): c for c in todo}
+        with click.progressbar(length=len(todo), label='Mirroring', show_eta=True, show_percent=True) as bar:
+            for future in as_completed(futures):
+                convo = futures[future]
+                bar.update(1)
+                try:
+                    total_bytes += future.result()
+                except Exception as e:
+                    failed += 1
+                    click.echo(f"\nFailed to mirror {convo['uuid'][:8]}...: {e}", err=True)
+                    continue
+
+                done += 1
+                since_checkpoint += 1
+                state[convo['uuid']] = convo.get('updated_at')
+
+                if since_checkpoint >= CHECKPOINT_EVERY or time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS:
+                    save_mirror_state(directory, state)
+                    since_checkpoint = 0
+                    last_checkpoint = time.monotonic()
+
+    except KeyboardInterrupt:
+        click.echo("\nInterrupted, saving progress. Run mirror again to resume.")
+
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        save_mirror_state(directory, state)
+
+    elapsed = max(time.monotonic() - start, 1e-9)
+    click.echo(f"\nMirrored {done}/{len(todo)} conversations to {directory}/ ({failed} failed) in {elapsed:.1f}s")
+    click.echo(f"Throughput: {done / elapsed:.2f} conversations/s, {total_bytes / elapsed / 1e6:.2f} MB/s")
@@ -2,10 +2,10 @@ import click
 from src.helpers import (
     get_active_session,
     get_active_conversation,
-    set_active_conversation,
-    get_parent_message_uuid,
+    set_conversation_state,
 )
 import src.claude as claude
+import src.cache as cache
 
 
 @click.command()
@@ -26,7 +26,7 @@ def settings(web_search, thinking, artifacts):
         return
     
     try:
-        response = claude.get_conversation_details(session, org_id, conversation_uuid)
+        response = cache.get_conversation_details(session, org_id, conversation_uuid)
         
         if response.status_code == 404:
             click.echo("Conversation not found. Use 'conversations' to select a valid conversation.")
@@ -67,9 +67,9 @@ def settings(web_search, thinking, artifacts):
                 
                 refresh_response = claude.get_conversation_details(session, org_id, conversation_uuid)
                 if refresh_response.status_code == 200:
+                    cache.store_conversation(org_id, conversation_uuid, refresh_response.json())
                     new_settings = refresh_response.json().get('settings', {})
-                    parent = get_parent_message_uuid()
-                    set_active_conversation(conversation_uuid, parent, new_settings)
+                    set_conversation_state(conversation_uuid, settings=new_settings)
             else:
                 click.echo(f"Failed to update settings (status: {update_response.status_code})")
             return
@@ -162,9 +162,9 @@ def settings(web_search, thinking, artifacts):
                 
                 refresh_response = claude.get_conversation_details(session, org_id, conversation_uuid)
                 if refresh_response.status_code == 200:
+                    cache.store_conversation(org_id, conversation_uuid, refresh_response.json())
                     new_settings = refresh_response.json().get('settings', {})
-                    parent = get_parent_message_uuid()
-                    set_active_conversation(conversation_uuid, parent, new_settings)
+                    set_conversation_state(conversation_uuid, settings=new_settings)
             else:
                 click.echo(f"Failed to update (status: {update_response.status_code})")
             
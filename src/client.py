@@ -0,0 +1,66 @@
+"""Console entry point: hand commands to a running daemon, or run the CLI here
+
+Imports nothing beyond the standard library unless the command has to
+run locally, so a forwarded command costs little more than interpreter
+startup.
+"""
+import json
+import os
+import sys
+from src.config import SOCKET_FILE, VERBOSE_OPTIONS
+
+# Commands that don't prompt and can run against the daemon's warm state
+FORWARDED_COMMANDS = {'chat', 'sync', 'history', 'search', 'related', 'link', 'name', 'new'}
+
+
+def forward(args):
+    """Run a command in the daemon; returns its exit code, or None to run it locally
+
+    Only output that isn't going to a terminal is forwarded: interactive
+    use keeps the local terminal size, colours and live rendering. -v
+    always runs locally, so its summary only counts this command's requests.
+    """
+    if not args or args[0] not in FORWARDED_COMMANDS:
+        return None
+    if VERBOSE_OPTIONS & set(args):
+        return None
+    if "_CLAUDE_COMPLETE" in os.environ or os.environ.get("CLAUDE_NO_DAEMON"):
+        return None
+    if sys.stdout.isatty() or not os.path.exists(SOCKET_FILE):
+        return None
+
+    from src.daemon import connect, read_frame
+
+    sock = connect()
+    if not sock:
+        return None
+
+    with sock:
+        sock.sendall(json.dumps({"args": args}).encode() + b"\n")
+        rfile = sock.makefile("rb")
+        outputs = {b'o': sys.stdout, b'e': sys.stderr}
+        while True:
+            frame = read_frame(rfile)
+            if frame is None:
+                print("Lost connection to the daemon", file=sys.stderr)
+                return 1
+            tag, payload, value = frame
+            if tag == b'x':
+                sys.stdout.flush()
+                return value
+            try:
+                outputs[tag].buffer.write(payload)
+                outputs[tag].buffer.flush()
+            except BrokenPipeError:
+                # e.g. piped into head; silence the flush at interpreter exit too
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                return 1
+
+
+def main():
+    code = forward(sys.argv[1:])
+    if code is not None:
+        sys.exit(code)
+
+    from src.cli import cli
+    cli()
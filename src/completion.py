@@ -0,0 +1,215 @@
+"""Shell completion that answers from local state without importing the CLI
+
+Completing through click would import every command module (and with them
+requests and rich) on each TAB press. The common cases are answered here
+from auth.json, config.json and metadata.db instead; anything else falls
+through to click's own completion.
+"""
+import json
+import os
+import re
+import shlex
+from src.config import AUTH_FILE, CONFIG_FILE
+
+COMPLETE_VAR = "_CLAUDE_COMPLETE"
+
+COMMANDS = (
+    'accounts', 'add-account', 'update-account', 'switch-account', 'remove-account',
+    'conversations', 'new', 'name', 'delete', 'link', 'search', 'related', 'export',
+    'chat', 'sync', 'history', 'repl', 'settings', 'mirror', 'batch', 'daemon', 'test',
+)
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
+def slugify(name):
+    return '-'.join(re.sub(r'[^\w\s-]', '', (name or 'untitled').lower()).split()) or 'untitled'
+
+
+def active_org_id():
+    """lastActiveOrg of the active account, read straight from the state files"""
+    account = _load_json(CONFIG_FILE).get("active_account")
+    cookies = _load_json(AUTH_FILE).get(account, "") if account else ""
+    match = re.search(r'lastActiveOrg=([a-f0-9\-]+)', cookies)
+    return match.group(1) if match else None
+
+
+def _cached_conversations():
+    from src.metadata import METADATA_FILE, MetadataCache
+
+    org_id = active_org_id()
+    if not org_id or not os.path.exists(METADATA_FILE):
+        return []
+    metadata = MetadataCache()
+    try:
+        return metadata.conversations(org_id)
+    finally:
+        metadata.close()
+
+
+def complete_accounts(incomplete):
+    """(value, help) pairs of saved account names"""
+    return [(name, None) for name in _load_json(AUTH_FILE) if name.startswith(incomplete)]
+
+
+def complete_conversation_uuids(incomplete):
+    """(uuid, name) pairs of cached conversations of the active account"""
+    return [
+        (c['uuid'], c['name'] or 'Untitled')
+        for c in _cached_conversations()
+        if c['uuid'].startswith(incomplete)
+    ]
+
+
+def complete_conversation_names(incomplete):
+    """(slug, short uuid) pairs; slugs keep names shell-safe and resolve by fuzzy match"""
+    seen = set()
+    pairs = []
+    for c in _cached_conversations():
+        slug = slugify(c['name'])
+        if slug.startswith(incomplete.lower()) and slug not in seen:
+            seen.add(slug)
+            pairs.append((slug, c['uuid'][:8]))
+    return pairs
+
+
+def _choices(*values):
+    return lambda incomplete: [(v, None) for v in values if v.startswith(incomplete)]
+
+
+# command -> (positional completers, option completers, options that take a value)
+FAST_COMMANDS = {
+    'switch-account': ([complete_accounts], {}, set()),
+    'update-account': ([complete_accounts], {}, set()),
+    'remove-account': ([complete_accounts], {}, set()),
+    'delete': ([complete_conversation_uuids], {}, set()),
+    'daemon': ([_choices('start', 'stop', 'status')], {}, {'--idle-timeout'}),
+    'conversations': ([complete_conversation_names], {}, {'--limit'}),
+    'chat': ([], {'-c': complete_conversation_uuids, '--conversation': complete_conversation_uuids},
+             {'-c', '--conversation', '-o', '--output'}),
+    'history': ([], {'-c': complete_conversation_uuids, '--conversation': complete_conversation_uuids},
+                {'-c', '--conversation', '-o', '--output'}),
+    'export': (
+        [_choices('all', 'this', 'choose'), _choices('json', 'js', 'ndjson', 'markdown', 'md')],
+        {'-c': complete_conversation_uuids, '--conversation': complete_conversation_uuids,
+         '-a': complete_accounts, '--account': complete_accounts, '--assign': _choices('least-loaded', 'round-robin')},
+        {'-c', '--conversation', '-j', '--jobs', '--rate', '--retries', '-a', '--account', '--assign'},
+    ),
+    'batch': (
+        [],
+        {'-a': complete_accounts, '--account': complete_accounts, '--assign': _choices('least-loaded', 'round-robin')},
+        {'-o', '--output', '-j', '--jobs', '--rate', '--retries', '-a', '--account', '--assign'},
+    ),
+}
+
+
+def split_arg_string(string):
+    """Split like a shell would, keeping an unterminated last word (as click does)"""
+    lex = shlex.shlex(string, posix=True)
+    lex.whitespace_split = True
+    lex.commenters = ""
+    out = []
+    try:
+        for token in lex:
+            out.append(token)
+    except ValueError:
+        out.append(lex.token)
+    return out
+
+
+def completion_args(shell):
+    """(args, incomplete) from the environment, following click's shell protocols"""
+    cwords = split_arg_string(os.environ["COMP_WORDS"])
+    if shell == 'fish':
+        incomplete = os.environ["COMP_CWORD"]
+        if incomplete:
+            incomplete = split_arg_string(incomplete)[0]
+        args = cwords[1:]
+        if incomplete and args and args[-1] == incomplete:
+            args.pop()
+        return args, incomplete
+
+    cword = int(os.environ["COMP_CWORD"])
+    args = cwords[1:cword]
+    incomplete = cwords[cword] if cword < len(cwords) else ""
+    return args, incomplete
+
+
+def completions(args, incomplete):
+    """(value, help) pairs for a command line, or None when click should answer"""
+    if incomplete.startswith('-'):
+        return None
+    if not args:
+        return [(name, None) for name in COMMANDS if name.startswith(incomplete)]
+
+    command, rest = args[0], args[1:]
+    if command not in FAST_COMMANDS:
+        return None
+    positionals, options, value_options = FAST_COMMANDS[command]
+
+    if rest and rest[-1] in value_options:
+        completer = options.get(rest[-1])
+        return completer(incomplete) if completer else None
+
+    index = 0
+    skip = False
+    for arg in rest:
+        if skip:
+            skip = False
+        elif arg.startswith('-'):
+            skip = arg in value_options
+        else:
+            index += 1
+
+    if index >= len(positionals):
+        return None
+    return positionals[index](incomplete)
+
+
+def format_completion(shell, value, help):
+    if shell == 'zsh':
+        # zsh's _describe splits value and help on ":", as click's zsh script does
+        if help:
+            return "plain\n" + value.replace(":", "\\:") + "\n" + help
+        return f"plain\n{value}\n_"
+    if shell == 'fish' and help:
+        return f"plain,{value}\t{help}"
+    return f"plain,{value}"
+
+
+def fast_complete():
+    """Answer a completion request if it is one of the common cases
+
+    Returns True when the answer has been printed, False to let click
+    handle the request.
+    """
+    mode = os.environ.get(COMPLETE_VAR, "")
+    shell, _, action = mode.partition('_')
+    if action != 'complete' or shell not in ('bash', 'zsh', 'fish'):
+        return False
+
+    try:
+        pairs = completions(*completion_args(shell))
+    except Exception:
+        return False
+    if pairs is None:
+        return False
+
+    print("\n".join(format_completion(shell, value, help) for value, help in pairs))
+    return True
+
+
+def click_completer(completer):
+    """Adapt a completer for click's shell_complete=, used when the fast path declines"""
+    def shell_complete(ctx, param, incomplete):
+        from click.shell_completion import CompletionItem
+        return [CompletionItem(value, help=help) for value, help in completer(incomplete)]
+    return shell_complete
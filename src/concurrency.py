@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import click
+import requests
+from src.transport import RETRY_STATUSES, never_sent, retry_delay
+
+
+class TokenBucket:
+    """Client-side rate limiter shared by worker threads
+
+    Holds up to `burst` tokens refilled at `rate` per second; acquire()
+    blocks until a token is available. A rate of None or 0 disables it.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate or 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def call_with_retry(request, bucket=None, retries=3, backoff=1.0, statuses=RETRY_STATUSES):
+    """Call request() until it gives a status outside `statuses` or retries run out
+
+    The transport already retries idempotent requests; this is for callers
+    that know a request is safe to send again, and for pacing with a bucket.
+    Requests that were never sent, such as those refused by the open circuit
+    breaker, fail at once.
+    """
+    for attempt in range(retries + 1):
+        if bucket:
+            bucket.acquire()
+        try:
+            response = request()
+        except requests.RequestException as e:
+            if never_sent(e) or attempt == retries:
+                raise
+            time.sleep(retry_delay(None, attempt, backoff))
+            continue
+
+        if response.status_code not in statuses or attempt == retries:
+            return response
+        time.sleep(retry_delay(response, attempt, backoff))
+
+
+def run_concurrently(items, work, jobs=8, label='Working', item_name=None, err=False):
+    """Run work(item) on a thread pool behind a progress bar
+
+    The bar is only touched from the calling thread, as results complete,
+    so it stays accurate however the workers interleave. With err=True it
+    is drawn on stderr, out of the way of output on stdout. Returns
+    (results, failures): lists of (item, return value) and (item, exception).
+    """
+    results = []
+    failures = []
+    executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+
+    try:
+        futures = {executor.submit(work, item): item for item in items}
+        with click.progressbar(length=len(futures), label=label, show_eta=True, show_percent=True,
+                               item_show_func=item_name, file=click.get_text_stream('stderr') if err else None) as bar:
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    results.append((item, future.result()))
+                except Exception as e:
+                    failures.append((item, e))
+                bar.update(1, item)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results, failures
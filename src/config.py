@@ -1,3 +1,10 @@
+AUTH_FILE = "auth.json"
+CONFIG_FILE = "config.json"
+SOCKET_FILE = "claude.sock"
+
+# -v's flag and request counters are process-wide, so it never runs in the shared daemon
+VERBOSE_OPTIONS = {'-v', '--verbose'}
+
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36"
 
 extension_languages = {
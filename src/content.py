@@ -0,0 +1,54 @@
+def extract_message_text(msg):
+    """Collect the searchable text of a message
+
+    Returns (text_parts, file_contents): text_parts covers text, artifacts,
+    created files, edits and tool results; file_contents holds labelled
+    copies of artifact and file bodies for display.
+    """
+    text_parts, file_contents = [], []
+
+    for content in msg.get('content', []):
+        ctype, cdata = content.get('type'), content.get('input', {})
+
+        if ctype == 'text':
+            text_parts.append(content.get('text', ''))
+
+        elif ctype == 'tool_use':
+            tool = content.get('name', '')
+
+            # Artifacts tool
+            if tool == 'artifacts':
+                if art_content := cdata.get('content'):
+                    art_title = cdata.get('title', 'unknown')
+                    file_contents.append(f"\n--- Artifact: {art_title} ---\n{art_content}\n")
+                    text_parts.append(art_content)
+
+            elif tool == 'create_file':
+                if file_text := cdata.get('file_text'):
+                    file_contents.append(f"\n--- Created File: {cdata.get('path', 'unknown')} ---\n{file_text}\n")
+                    text_parts.append(file_text)
+
+            elif tool == 'str_replace':
+                old, new = cdata.get('old_str', ''), cdata.get('new_str', '')
+                if old or new:
+                    text_parts.append(f"[Edit] Old: {old} -> New: {new}")
+
+        elif ctype == 'tool_result':
+            tool = content.get('name', '')
+
+            if tool == 'present_files':
+                for rc in content.get('content', []):
+                    if isinstance(rc, dict) and (fp := rc.get('file_path')):
+                        try:
+                            with open(fp, 'r', encoding='utf-8') as f:
+                                file_data = f.read()
+                                file_contents.append(f"\n--- Presented File: {fp} ---\n{file_data}\n")
+                                text_parts.append(file_data)
+                        except: pass
+
+            elif tool in ['bash_tool', 'view']:
+                for rc in content.get('content', []):
+                    if isinstance(rc, dict) and rc.get('type') == 'text':
+                        text_parts.append(rc.get('text', ''))
+
+    return text_parts, file_contents
@@ -0,0 +1,297 @@
+"""Optional background process that runs CLI commands with warm state
+
+Every `claude` invocation normally pays for starting Python, importing
+requests and rich, and a fresh TLS handshake. The daemon imports the CLI
+once and keeps sessions (and their open connections), the conversation
+cache and the metadata cache alive between commands. src.client forwards
+commands to it over a Unix socket in the working directory, next to the
+other state files, and runs them locally when no daemon is listening.
+
+Wire format: the client sends one JSON line, {"args": [...]} or
+{"control": "status"|"stop"}, and receives frames of a one-byte tag and
+a 4-byte big-endian length: b'o'/b'e' carry UTF-8 stdout/stderr text and
+b'x' carries the exit code as the length, ending the response.
+"""
+import io
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import traceback
+from src.config import SOCKET_FILE, VERBOSE_OPTIONS
+
+LOG_FILE = "daemon.log"
+
+# Exit after this long without a command
+IDLE_TIMEOUT = 30 * 60
+
+FRAME = struct.Struct("!cI")
+
+
+def supported():
+    return hasattr(socket, "AF_UNIX")
+
+
+def write_frame(sock, tag, payload=b"", value=None):
+    sock.sendall(FRAME.pack(tag, len(payload) if value is None else value) + payload)
+
+
+def read_frame(rfile):
+    """(tag, payload, value) of the next frame, or None when the connection closed"""
+    header = rfile.read(FRAME.size)
+    if len(header) < FRAME.size:
+        return None
+    tag, value = FRAME.unpack(header)
+    if tag == b'x':
+        return tag, b"", value
+    return tag, rfile.read(value), value
+
+
+def connect(timeout=None):
+    """Socket connected to the daemon of this directory, or None if none is running"""
+    if not supported() or not os.path.exists(SOCKET_FILE):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(SOCKET_FILE)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def control(action):
+    """Send a control request; returns the daemon's reply text, or None if it isn't running"""
+    sock = connect(timeout=5)
+    if not sock:
+        return None
+    with sock:
+        sock.sendall(json.dumps({"control": action}).encode() + b"\n")
+        rfile = sock.makefile("rb")
+        reply = []
+        while True:
+            frame = read_frame(rfile)
+            if frame is None:
+                return None
+            if frame[0] == b'x':
+                return "".join(reply)
+            reply.append(frame[1].decode("utf-8", "replace"))
+
+
+class _ClientStream(io.TextIOBase):
+    """Text stream writing one kind of frame to a client socket"""
+
+    encoding = "utf-8"
+    errors = "strict"
+
+    def __init__(self, sock, tag):
+        self._sock = sock
+        self._tag = tag
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return False
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError("write() argument must be str")
+        if text:
+            write_frame(self._sock, self._tag, text.encode("utf-8", "replace"))
+        return len(text)
+
+
+class _ThreadStreams:
+    """Stand-in for sys.stdout/stderr/stdin routing each thread to its own client
+
+    Commands run on the handler thread of their connection; output written
+    from other threads (e.g. export workers) goes to the daemon's own stream.
+    """
+
+    encoding = "utf-8"
+    errors = "strict"
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def use(self, stream):
+        self._local.stream = stream
+
+    def _stream(self):
+        return getattr(self._local, "stream", None) or self._default
+
+    def write(self, text):
+        return self._stream().write(text)
+
+    def flush(self):
+        return self._stream().flush()
+
+    def isatty(self):
+        return self._stream().isatty()
+
+    def __getattr__(self, name):
+        return getattr(self._stream(), name)
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path=SOCKET_FILE, idle_timeout=IDLE_TIMEOUT):
+        # Only the owner may connect: commands run with the saved account cookies
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.started = time.time()
+        self.last_active = time.time()
+        self.served = 0
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def status(self):
+        from src.helpers import warm_sessions
+
+        return (
+            f"pid {os.getpid()}, up {time.time() - self.started:.0f}s, "
+            f"{self.served} commands served, {self.active} running, "
+            f"{warm_sessions()} warm sessions"
+        )
+
+    def watch_idle(self):
+        """Shut the server down once it has been idle for idle_timeout seconds"""
+        while True:
+            time.sleep(min(self.idle_timeout, 30))
+            with self._lock:
+                idle = not self.active and time.time() - self.last_active >= self.idle_timeout
+            if idle:
+                self.shutdown()
+                return
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        request = json.loads(line)
+        server = self.server
+
+        if request.get("control") == "status":
+            write_frame(self.connection, b'o', server.status().encode())
+            return write_frame(self.connection, b'x', value=0)
+        if request.get("control") == "stop":
+            write_frame(self.connection, b'x', value=0)
+            return threading.Thread(target=server.shutdown, daemon=True).start()
+
+        with server._lock:
+            server.active += 1
+        try:
+            code = run_command(request.get("args", []), self.connection)
+        finally:
+            with server._lock:
+                server.active -= 1
+                server.served += 1
+                server.last_active = time.time()
+        try:
+            write_frame(self.connection, b'x', value=code)
+        except OSError:
+            pass
+
+
+def run_command(args, sock):
+    """Run one CLI command with its output sent to sock; returns the exit code"""
+    import click
+    from src.cli import cli
+    from src.state import get_state
+    import src.cache as cache
+
+    out, err = _ClientStream(sock, b'o'), _ClientStream(sock, b'e')
+    if VERBOSE_OPTIONS & set(args):
+        err.write("-v can't run in the daemon, where other commands share its counters; run it with CLAUDE_NO_DAEMON=1\n")
+        return 2
+    sys.stdout.use(out)
+    sys.stderr.use(err)
+    sys.stdin.use(io.StringIO(""))
+
+    # Revalidate against claude.ai as a fresh process would, but keep the cache itself warm
+    cache.forget_listings()
+    # Pick up config changes made by other processes; the daemon never exits to flush
+    get_state().reload()
+    try:
+        cli.main(args, prog_name="claude", standalone_mode=False)
+        return 0
+    except click.exceptions.Exit as e:
+        return e.exit_code
+    except click.ClickException as e:
+        e.show()
+        return e.exit_code
+    except click.exceptions.Abort:
+        click.echo("Aborted!", err=True)
+        return 1
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    except OSError:
+        # The client went away mid-command
+        return 1
+    except Exception:
+        traceback.print_exc(file=sys.__stderr__)
+        err.write(traceback.format_exc())
+        return 1
+    finally:
+        get_state().flush()
+        for stream in (sys.stdout, sys.stderr, sys.stdin):
+            stream.use(None)
+
+
+def serve(idle_timeout=IDLE_TIMEOUT):
+    """Run the daemon in this process until stopped or idle"""
+    if connect():
+        print(f"A daemon is already listening on {SOCKET_FILE}", file=sys.stderr)
+        return 1
+    if os.path.exists(SOCKET_FILE):
+        os.remove(SOCKET_FILE)
+
+    # Import everything up front so the first command is as fast as the rest
+    import click
+    import requests  # noqa: F401
+    from src.cli import cli
+    from src.cache import get_cache
+    ctx = click.Context(cli)
+    for name in cli.list_commands(ctx):
+        cli.get_command(ctx, name)
+    from src.metadata import get_metadata
+    get_cache()
+    get_metadata()
+
+    sys.stdout = _ThreadStreams(sys.stdout)
+    sys.stderr = _ThreadStreams(sys.stderr)
+    sys.stdin = _ThreadStreams(sys.stdin)
+
+    server = DaemonServer(idle_timeout=idle_timeout)
+    threading.Thread(target=server.watch_idle, daemon=True).start()
+    print(f"Daemon {os.getpid()} listening on {SOCKET_FILE}", file=sys.__stdout__, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(SOCKET_FILE):
+            os.remove(SOCKET_FILE)
+    return 0
+
+
+if __name__ == "__main__":
+    timeout = float(sys.argv[1]) if len(sys.argv) > 1 else IDLE_TIMEOUT
+    sys.exit(serve(timeout))
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+from src.export_writers import HashingWriter
+from src.helpers import open_atomic, write_file_atomic
+
+MANIFEST_FILE = "export_manifest.json"
+CHECKPOINT_EVERY = 25
+
+
+class _Unchanged(Exception):
+    """Aborts an atomic write whose content matches the existing file"""
+
+
+class ExportManifest:
+    """What an export directory holds: uuid -> updated_at, filename and content hash
+
+    Entries are kept per format, so json and markdown exports can share a
+    directory. Safe to update from export worker threads.
+    """
+
+    def __init__(self, directory, format, dedupe=False):
+        self.directory = directory
+        self.format = format
+        self.dedupe = dedupe
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._claimed = {}
+        self._blobs = set()
+
+        self.data = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        self.entries = self.data.setdefault(format, {})
+
+    def file_path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def is_current(self, conversation_uuid, updated_at):
+        """True when the exported file is already at this updated_at"""
+        entry = self.entries.get(conversation_uuid)
+        return (
+            entry is not None and updated_at is not None
+            and entry['updated_at'] == updated_at
+            and entry.get('dedupe', False) == self.dedupe
+            and os.path.exists(self.file_path(entry['filename']))
+        )
+
+    def claim_filename(self, conversation_uuid, base, ext):
+        """Pick a filename for a conversation that no other exported conversation uses"""
+        with self._lock:
+            taken = {e['filename'] for u, e in self.entries.items() if u != conversation_uuid}
+            # Names handed to other workers in this run but not recorded yet
+            taken.update(f for f, u in self._claimed.items() if u != conversation_uuid)
+            filename = f"{base}.{ext}"
+            if filename in taken:
+                filename = f"{base}-{conversation_uuid[:8]}.{ext}"
+            self._claimed[filename] = conversation_uuid
+            return filename
+
+    def export(self, conversation_uuid, updated_at, base, ext, write):
+        """Render one conversation with write(f) into the directory
+
+        The file is streamed to a temp file and only moved into place when
+        its content hash changed. Returns 'new', 'updated' or 'skipped'.
+        """
+        filename = self.claim_filename(conversation_uuid, base, ext)
+        entry = self.entries.get(conversation_uuid)
+        path = self.file_path(filename)
+        same_file = entry and entry['filename'] == filename and os.path.exists(path)
+
+        try:
+            with open_atomic(path) as f:
+                out = HashingWriter(f)
+                write(out)
+                digest = out.hexdigest()
+                if same_file and entry['hash'] == digest:
+                    raise _Unchanged()
+            status = 'updated' if entry else 'new'
+            # A renamed conversation leaves its old file behind otherwise
+            if entry and entry['filename'] != filename and os.path.exists(self.file_path(entry['filename'])):
+                os.remove(self.file_path(entry['filename']))
+        except _Unchanged:
+            status = 'skipped'
+
+        with self._lock:
+            self.entries[conversation_uuid] = {'updated_at': updated_at, 'filename': filename, 'hash': digest, 'dedupe': self.dedupe}
+            self._unsaved += 1
+            if self._unsaved >= CHECKPOINT_EVERY:
+                self._save()
+        return status
+
+    def write_blob(self, name, data):
+        """Write a blob file unless it already exists; returns whether it was written"""
+        path = self.file_path(name)
+        with self._lock:
+            if name in self._blobs or os.path.exists(path):
+                return False
+            self._blobs.add(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_file_atomic(path, data, mode='wb')
+        return True
+
+    def prune(self, keep_uuids):
+        """Delete exports of conversations not in keep_uuids; returns how many"""
+        removed = 0
+        with self._lock:
+            for conversation_uuid in [u for u in self.entries if u not in keep_uuids]:
+                path = self.file_path(self.entries.pop(conversation_uuid)['filename'])
+                if os.path.exists(path):
+                    os.remove(path)
+                removed += 1
+            self._unsaved += removed
+        return removed
+
+    def _save(self):
+        write_file_atomic(self.path, json.dumps(self.data, indent=2))
+        self._unsaved = 0
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def abort(self):
+        """Keep the entries of files already written, so a rerun skips them"""
+        self.save()
@@ -0,0 +1,346 @@
+import hashlib
+import io
+import json
+import os
+import tarfile
+import tempfile
+import threading
+import time
+from datetime import datetime
+from src.config import extension_languages as ext_lang
+
+
+ARCHIVE_SUFFIXES = ('.tar.gz', '.tgz', '.tar.zst')
+
+# Archive members larger than this are spooled to disk rather than memory
+SPOOL_BYTES = 8 * 1024 * 1024
+
+
+class HashingWriter:
+    """Text file wrapper that hashes everything written through it"""
+
+    def __init__(self, f):
+        self.f = f
+        self._hash = hashlib.sha256()
+
+    def write(self, text):
+        self._hash.update(text.encode('utf-8'))
+        return self.f.write(text)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def format_timestamp(ts):
+    try:
+        dt = datetime.fromisoformat(ts.replace('Z', '+00:00')).astimezone()
+        return dt.strftime('%B %d, %Y at %I:%M %p')
+    except:
+        return ts
+
+
+def code_block(lang, body, blobs=None):
+    """A fenced code block, or a link to the body's blob when deduplicating"""
+    if blobs and (path := blobs.put(body)):
+        return f"[{len(body.encode('utf-8')):,} bytes, stored once]({path})\n"
+    return f"```{lang}\n{body}\n```\n"
+
+
+def markdown_message_lines(msg, idx, blobs=None):
+    """Markdown lines for one message of an export"""
+    lines = []
+    sender = msg.get('sender', 'unknown')
+    timestamp = msg.get('created_at', '')
+
+    lines.append(f"## {sender.title()} · Message {idx}")
+    lines.append(f"<sub>{format_timestamp(timestamp)}</sub>\n")
+
+    has_content = False
+
+    for content in msg.get('content', []):
+        ctype = content.get('type')
+
+        if ctype == 'text':
+            text = content.get('text', '').strip()
+            if text:
+                lines.append(text + '\n')
+                has_content = True
+
+        elif ctype == 'tool_use':
+            tool = content.get('name', '')
+            cdata = content.get('input', {})
+
+            if tool == 'artifacts':
+                art_content = cdata.get('content', '').strip()
+
+                if not art_content:
+                    continue
+
+                title = cdata.get('title', 'Artifact')
+                art_type = cdata.get('type', '')
+                command = cdata.get('command', '')
+
+                if command == 'update':
+                    lines.append(f"\n### Artifact Update: {title}\n")
+                else:
+                    lines.append(f"\n### Artifact: {title}\n")
+
+                lang_map = {
+                    'application/vnd.ant.code': cdata.get('language', ''),
+                    'text/html': 'html',
+                    'application/vnd.ant.react': 'jsx',
+                    'text/markdown': 'markdown',
+                    'image/svg+xml': 'svg',
+                    'application/vnd.ant.mermaid': 'mermaid'
+                }
+                lang = lang_map.get(art_type, '')
+
+                if art_type:
+                    lines.append(f"> **Type:** `{art_type}`\n")
+
+                lines.append(code_block(lang, art_content, blobs))
+                has_content = True
+
+            elif tool == 'create_file':
+                file_text = cdata.get('file_text', '').strip()
+
+                if not file_text:
+                    continue
+
+                path = cdata.get('path', 'unknown')
+                lang = next((l for ext, l in ext_lang.items() if path.lower().endswith(ext)), '')
+
+                if not lang:
+                    basename = path.split('/')[-1].lower()
+                    if basename in ['dockerfile', 'makefile', 'rakefile']:
+                        lang = basename
+
+                lines.append(f"\n### Created File: `{path}`\n")
+                lines.append(code_block(lang, file_text, blobs))
+                has_content = True
+
+            elif tool == 'str_replace':
+                old = cdata.get('old_str', '')
+                new = cdata.get('new_str', '')
+                path = cdata.get('path', '')
+
+                if old or new:
+                    lines.append(f"\n### Edit: `{path}`\n")
+                    lines.append(f"```diff\n- {old}\n+ {new}\n```\n")
+                    has_content = True
+
+        elif ctype == 'tool_result':
+            tool = content.get('name', '')
+
+            if tool == 'bash_tool':
+                for rc in content.get('content', []):
+                    if isinstance(rc, dict) and rc.get('type') == 'text':
+                        result_text = rc.get('text', '').strip()
+                        if result_text:
+                            lines.append(f"\n### Terminal Output\n")
+                            lines.append(f"```bash\n{result_text}\n```\n")
+                            has_content = True
+
+            elif tool == 'view':
+                for rc in content.get('content', []):
+                    if isinstance(rc, dict) and rc.get('type') == 'text':
+                        result_text = rc.get('text', '').strip()
+                        if result_text:
+                            lines.append(f"\n### File View\n")
+                            lines.append(f"```\n{result_text}\n```\n")
+                            has_content = True
+
+            elif tool == 'present_files':
+                for rc in content.get('content', []):
+                    if isinstance(rc, dict) and (fp := rc.get('file_path')):
+                        try:
+                            with open(fp, 'r', encoding='utf-8') as f:
+                                file_data = f.read().strip()
+                                if file_data:
+                                    lang = next((l for ext, l in ext_lang.items() if fp.lower().endswith(ext)), '')
+                                    lines.append(f"\n### Presented File: `{fp}`\n")
+                                    lines.append(f"```{lang}\n{file_data}\n```\n")
+                                    has_content = True
+                        except:
+                            pass
+
+    if not has_content:
+        lines.append("*[No content]*\n")
+
+    lines.append("\n---\n")
+    return lines
+
+
+def write_markdown(convo_data, f, blobs=None):
+    """Write a conversation as Markdown to f, one message at a time"""
+    name = convo_data.get('name', 'Untitled')
+    uuid = convo_data.get('uuid', '')
+    created = convo_data.get('created_at', '')
+    messages = convo_data.get('chat_messages', [])
+
+    lines = []
+    lines.append(f"# {name}\n")
+    lines.append(f"> **Conversation ID:** `{uuid}`  ")
+    lines.append(f"> **Created:** {format_timestamp(created)}  ")
+    lines.append(f"> **Messages:** {len(messages)}\n")
+    lines.append("---\n")
+    f.write('\n'.join(lines))
+
+    for idx, msg in enumerate(messages, 1):
+        f.write('\n')
+        f.write('\n'.join(markdown_message_lines(msg, idx, blobs)))
+
+
+def write_json(convo_data, f, blobs=None):
+    """Write a conversation as indented JSON to f, serializing one message at a time
+
+    The output matches json.dump(convo_data, f, indent=2) without holding a
+    second copy of the whole tree as text.
+    """
+    def dumps(value, indent):
+        return json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n' + indent)
+
+    f.write('{')
+    for i, (key, value) in enumerate(convo_data.items()):
+        f.write(',' if i else '')
+        f.write(f'\n  {json.dumps(key, ensure_ascii=False)}: ')
+
+        if key == 'chat_messages' and isinstance(value, list) and value:
+            f.write('[')
+            for j, msg in enumerate(value):
+                f.write(',' if j else '')
+                f.write('\n    ' + dumps(blobs.replace_bodies(msg) if blobs else msg, '    '))
+            f.write('\n  ]')
+        else:
+            f.write(dumps(value, '  '))
+    f.write('\n}' if convo_data else '}')
+
+
+def write_ndjson(convo_data, f, blobs=None):
+    """Write a conversation as compact NDJSON: a header line, then one line per message"""
+    header = {k: v for k, v in convo_data.items() if k != 'chat_messages'}
+    f.write(json.dumps({'type': 'conversation', **header}, ensure_ascii=False, separators=(',', ':')))
+    f.write('\n')
+    for msg in convo_data.get('chat_messages', []):
+        if blobs:
+            msg = blobs.replace_bodies(msg)
+        f.write(json.dumps({'type': 'message', **msg}, ensure_ascii=False, separators=(',', ':')))
+        f.write('\n')
+
+
+WRITERS = {
+    'json': write_json,
+    'md': write_markdown,
+    'ndjson': write_ndjson,
+}
+
+
+def is_archive_path(path):
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def open_zstd(f):
+    """Wrap a binary file in a zstd compressor, from the stdlib or zstandard"""
+    try:
+        from compression import zstd
+        return zstd.ZstdFile(f, 'w')
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Writing .tar.zst needs Python 3.14+ or the zstandard package (pip install zstandard)")
+    return zstandard.ZstdCompressor().stream_writer(f, closefd=False)
+
+
+class ExportArchive:
+    """Writes a whole export into one .tar.gz or .tar.zst in a single pass
+
+    Members are rendered into a spooled buffer (tar headers need the size
+    up front) and appended under a lock, so export workers can share it.
+    The archive is built as path.part and moved into place by save(), or
+    thrown away by abort() when the export didn't finish.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + ".part"
+        self._lock = threading.Lock()
+        self._names = set()
+        self._file = open(self.tmp_path, 'wb')
+
+        try:
+            if path.lower().endswith('.tar.zst'):
+                self._compressor = open_zstd(self._file)
+                self._tar = tarfile.open(fileobj=self._compressor, mode='w|')
+            else:
+                self._compressor = None
+                self._tar = tarfile.open(fileobj=self._file, mode='w|gz')
+        except BaseException:
+            self._file.close()
+            os.remove(self.tmp_path)
+            raise
+
+    def is_current(self, conversation_uuid, updated_at):
+        return False
+
+    def export(self, conversation_uuid, updated_at, base, ext, write):
+        """Render one conversation with write(f) into the archive; returns 'new'"""
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+            text = io.TextIOWrapper(spool, encoding='utf-8')
+            write(text)
+            text.flush()
+            size = spool.tell()
+            spool.seek(0)
+
+            with self._lock:
+                name = f"{base}.{ext}"
+                if name in self._names:
+                    name = f"{base}-{conversation_uuid[:8]}.{ext}"
+                self._names.add(name)
+
+                info = tarfile.TarInfo(name)
+                info.size = size
+                info.mtime = time.time()
+                self._tar.addfile(info, spool)
+            text.detach()
+        return 'new'
+
+    def write_blob(self, name, data):
+        """Add a blob member unless the archive already has it; returns whether it was added"""
+        with self._lock:
+            if name in self._names:
+                return False
+            self._names.add(name)
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time.time()
+            self._tar.addfile(info, io.BytesIO(data))
+        return True
+
+    def save(self):
+        """Finish the archive and move it into place"""
+        with self._lock:
+            if self._tar is None:
+                return
+            self._tar.close()
+            if self._compressor is not None:
+                self._compressor.close()
+            self._file.close()
+            self._tar = None
+            os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Close the unfinished archive and delete path.part, leaving path as it was"""
+        with self._lock:
+            if self._tar is None:
+                return
+            try:
+                self._tar.close()
+                if self._compressor is not None:
+                    self._compressor.close()
+            except Exception:
+                pass
+            self._tar = None
+            self._file.close()
+            os.remove(self.tmp_path)
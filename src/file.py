@@ -3,6 +3,9 @@ import re
 import mimetypes
 from pathlib import Path
 
+# References read and uploaded at once for a prompt with several @files
+UPLOAD_JOBS = 4
+
 def get_mime_type(file_path):
     """Get MIME type for a file path"""
     mime_type, _ = mimetypes.guess_type(file_path)
@@ -101,66 +104,114 @@ def resolve_file_path(file_path):
     
     return None
 
-def process_prompt_with_files(prompt, session, org_id):
-    """Process prompt to extract @file references and create attachments/uploads"""
+def load_reference(file_path, session, org_id):
+    """Resolve one @file reference
+
+    Returns ('file', file_uuid) for an uploaded binary file, ('cached_file',
+    file_uuid) for one whose contents were uploaded before, ('attachment',
+    attachment) for a text file, or None when it can't be found or read.
+    """
     from src.claude import upload_file
+    from src.upload_cache import get_upload_cache
+    
+    resolved_path = resolve_file_path(file_path)
+    
+    if not resolved_path:
+        return None
+    
+    mime_type = get_mime_type(resolved_path)
+    
+    if needs_upload(mime_type):
+        # Binary file - reuse an earlier upload of the same contents, or upload it via claude.py
+        try:
+            uploads = get_upload_cache()
+            digest = uploads.content_hash(resolved_path)
+            file_uuid = uploads.get(org_id, digest)
+            if file_uuid:
+                return 'cached_file', file_uuid
+            
+            response = upload_file(session, org_id, resolved_path)
+            response.raise_for_status()
+            result = response.json()
+            
+            if not result.get('success'):
+                raise Exception(f"Upload failed for {file_path}")
+            
+            uploads.put(org_id, digest, os.path.getsize(resolved_path), result['file_uuid'])
+            return 'file', result['file_uuid']
+        except Exception as e:
+            raise Exception(f"Failed to upload {file_path}: {str(e)}")
+    
+    # Text file - can be sent as attachment
+    content = read_file_content(resolved_path)
+    
+    if content is None:
+        return None
     
-    file_refs = find_file_references(prompt)
+    return 'attachment', {
+        "file_name": file_path,
+        "file_type": mime_type,
+        "file_size": os.path.getsize(resolved_path),
+        "extracted_content": content,
+        "origin": "user_upload",
+        "kind": "file"
+    }
+
+def process_prompt_with_files(prompt, session, org_id, extra_files=(), progress=True):
+    """Process prompt to extract @file references and create attachments/uploads
+
+    extra_files are paths attached as if they had been referenced with @.
+    Several references are read and uploaded at once, UPLOAD_JOBS at a
+    time, with a progress bar on stderr unless progress=False. Attachments
+    and files keep the order they were referenced in. Files whose contents
+    were uploaded to the org before aren't uploaded again; their uuids are
+    also listed under 'cached_files'.
+    """
+    file_refs = find_file_references(prompt) + [(f"@{path}", path) for path in extra_files]
     
     if not file_refs:
         return {
             'prompt': prompt,
             'attachments': [],
             'files': [],
+            'cached_files': [],
         }
     
+    paths = [file_path for match_text, file_path in file_refs]
+    
+    if len(paths) == 1:
+        loaded = [load_reference(paths[0], session, org_id)]
+    elif progress:
+        from src.concurrency import run_concurrently
+        
+        results, failures = run_concurrently(
+            list(enumerate(paths)), lambda item: load_reference(item[1], session, org_id),
+            UPLOAD_JOBS, label='Attaching files', item_name=lambda item: item[1] if item else '', err=True
+        )
+        if failures:
+            # Report the failure of the earliest reference, as a serial run would
+            raise min(failures, key=lambda failure: failure[0][0])[1]
+        loaded = [result for item, result in sorted(results, key=lambda pair: pair[0][0])]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=UPLOAD_JOBS) as executor:
+            loaded = list(executor.map(lambda path: load_reference(path, session, org_id), paths))
+    
     attachments = []
     file_uuids = []
+    cached_file_uuids = []
     files_not_found = []
     
-    for match_text, file_path in file_refs:
-        resolved_path = resolve_file_path(file_path)
-        
-        if not resolved_path:
+    for file_path, result in zip(paths, loaded):
+        if result is None:
             files_not_found.append(file_path)
-            continue
-        
-        mime_type = get_mime_type(resolved_path)
-        
-        if needs_upload(mime_type):
-            # Binary file - upload it via claude.py
-            try:
-                response = upload_file(session, org_id, resolved_path)
-                response.raise_for_status()
-                result = response.json()
-                
-                if not result.get('success'):
-                    raise Exception(f"Upload failed for {file_path}")
-                
-                file_uuid = result['file_uuid']
-                file_uuids.append(file_uuid)
-            except Exception as e:
-                raise Exception(f"Failed to upload {file_path}: {str(e)}")
+        elif result[0] in ('file', 'cached_file'):
+            file_uuids.append(result[1])
+            if result[0] == 'cached_file':
+                cached_file_uuids.append(result[1])
         else:
-            # Text file - can be sent as attachment
-            content = read_file_content(resolved_path)
-            
-            if content is None:
-                files_not_found.append(file_path)
-                continue
-            
-            file_size = os.path.getsize(resolved_path)
-            
-            attachment = {
-                "file_name": file_path,
-                "file_type": mime_type,
-                "file_size": file_size,
-                "extracted_content": content,
-                "origin": "user_upload",
-                "kind": "file"
-            }
-            
-            attachments.append(attachment)
+            attachments.append(result[1])
     
     if files_not_found:
         raise FileNotFoundError(f"File(s) not found or unreadable: {', '.join(files_not_found)}")
@@ -169,4 +220,5 @@ def process_prompt_with_files(prompt, session, org_id):
         'prompt': prompt,
         'attachments': attachments,
         'files': file_uuids,
-    }
\ No newline at end of file
+        'cached_files': cached_file_uuids,
+    }
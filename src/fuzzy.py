@@ -0,0 +1,43 @@
+def fuzzy_score(query, text):
+    """Score how well text matches query, or None if it doesn't match
+
+    Every space-separated word of the query must appear in text as a
+    subsequence. Consecutive characters and word starts score higher,
+    gaps lower, so "mig db" ranks "Migrate database" above names where
+    those letters are scattered.
+    """
+    text = text.lower()
+    total = 0.0
+
+    for word in query.lower().split():
+        pos = -1
+        score = 0.0
+        for ch in word:
+            i = text.find(ch, pos + 1)
+            if i < 0:
+                return None
+            if i == pos + 1 and pos >= 0:
+                score += 3
+            if i == 0 or not text[i - 1].isalnum():
+                score += 2
+            if pos >= 0:
+                score -= 0.1 * (i - pos - 1)
+            pos = i
+        total += score
+
+    # Prefer shorter names among equally good matches
+    return total - 0.01 * len(text)
+
+
+def fuzzy_filter(query, items, key):
+    """Items matching query, best first; ties keep their original order"""
+    if not query.strip():
+        return list(items)
+
+    scored = []
+    for i, item in enumerate(items):
+        score = fuzzy_score(query, key(item))
+        if score is not None:
+            scored.append((-score, i, item))
+    scored.sort(key=lambda s: (s[0], s[1]))
+    return [item for _, _, item in scored]
@@ -2,15 +2,15 @@ import click
 import json
 import os
 import re
-import requests
-from pathlib import Path
+from contextlib import contextmanager
 import src.claude as claude
-
-AUTH_FILE = "auth.json"
-CONFIG_FILE = "config.json"
+from src.config import AUTH_FILE
+from src.state import get_state
 
 def create_session_from_cookies(cookie_string):
     """Create a requests session with cookies"""
+    import requests
+
     session = requests.Session()
     for cookie in cookie_string.split('; '):
         if '=' in cookie:
@@ -18,10 +18,59 @@ def create_session_from_cookies(cookie_string):
             session.cookies.set(name.strip(), value.strip())
     return session
 
+_sessions = {}
+
+def session_for(cookie_string):
+    """Session for a cookie string, reused so its connections stay open (e.g. in the daemon)"""
+    session = _sessions.get(cookie_string)
+    if session is None:
+        session = _sessions[cookie_string] = create_session_from_cookies(cookie_string)
+    return session
+
+def warm_sessions():
+    """Number of sessions kept by session_for"""
+    return len(_sessions)
+
 def get_cookie_string_from_session(session):
     """Extract cookie string from session"""
     return "; ".join([f"{c.name}={c.value}" for c in session.cookies])
 
+def pool_session(session, size):
+    """Let one session keep up to `size` connections open for concurrent requests
+
+    Worker threads share the session rather than cloning it, as export,
+    batch and the daemon do: its connection pool is thread-safe, and the
+    workers only send requests, never change its cookies or headers.
+    """
+    from requests.adapters import HTTPAdapter
+
+    if getattr(session.get_adapter("https://"), '_pool_maxsize', 0) >= size:
+        return session
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+    session.mount("https://", adapter)
+    return session
+
+@contextmanager
+def open_atomic(path, mode='w'):
+    """Open a temp file next to path that replaces it only once writing succeeds"""
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_file_atomic(path, data, mode='w'):
+    """Write a file via a temp file and rename so readers never see it half-written"""
+    with open_atomic(path, mode) as f:
+        f.write(data)
+
 def extract_org_id(cookies):
     """Extract organization ID from cookies"""
     match = re.search(r'lastActiveOrg=([a-f0-9\-]+)', cookies)
@@ -93,28 +142,13 @@ def list_accounts_interactive(accounts):
     
     return selection
 
-def load_config():
-    """Load config from config.json"""
-    if not os.path.exists(CONFIG_FILE):
-        return {}
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
-
-def save_config(config):
-    """Save config to config.json"""
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=2)
-
 def get_active_account():
     """Get the currently active account name"""
-    config = load_config()
-    return config.get("active_account")
+    return get_state().get("active_account")
 
 def set_active_account(account_name):
     """Set the active account"""
-    config = load_config()
-    config["active_account"] = account_name
-    save_config(config)
+    get_state().set("active_account", account_name)
 
 def get_active_session():
     """Get session for the active account"""
@@ -127,36 +161,31 @@ def get_active_session():
         return None, None
     
     cookies = accounts[active]
-    session = create_session_from_cookies(cookies)
+    session = session_for(cookies)
     org_id = extract_org_id(cookies)
     
     return session, org_id
 
 def get_active_conversation():
     """Get the currently active conversation UUID"""
-    config = load_config()
-    return config.get("active_conversation")
+    return get_state().get("active_conversation")
 
 def set_active_conversation(conversation_uuid, parent_message_uuid=None, settings=None):
     """Set the active conversation, parent message UUID, and optionally cache settings"""
-    config = load_config()
-    config['active_conversation'] = conversation_uuid
-    
-    if parent_message_uuid is not None:
-        config['parent_message_uuid'] = parent_message_uuid
-    
-    # Cache settings if provided
-    if settings is not None:
-        config['conversation_settings'] = settings
-    
-    save_config(config)
-
-def get_parent_message_uuid():
-    """Get the stored parent message UUID for the active conversation"""
-    config = load_config()
-    return config.get('parent_message_uuid', "00000000-0000-4000-8000-000000000000")
-
-def get_conversation_settings():
-    """Get cached conversation settings"""
-    config = load_config()
-    return config.get('conversation_settings')
\ No newline at end of file
+    state = get_state()
+    state.set('active_conversation', conversation_uuid)
+    state.update_conversation(conversation_uuid, parent_message_uuid=parent_message_uuid, settings=settings)
+
+def set_conversation_state(conversation_uuid, parent_message_uuid=None, settings=None):
+    """Record a conversation's parent message UUID and/or settings without making it active"""
+    get_state().update_conversation(conversation_uuid, parent_message_uuid=parent_message_uuid, settings=settings)
+
+def get_parent_message_uuid(conversation_uuid=None):
+    """Get the stored parent message UUID for a conversation, the active one by default"""
+    conversation_uuid = conversation_uuid or get_active_conversation()
+    return get_state().conversation(conversation_uuid).get('parent_message_uuid', "00000000-0000-4000-8000-000000000000")
+
+def get_conversation_settings(conversation_uuid=None):
+    """Get cached settings of a conversation, the active one by default"""
+    conversation_uuid = conversation_uuid or get_active_conversation()
+    return get_state().conversation(conversation_uuid).get('settings')
@@ -0,0 +1,151 @@
+import queue
+import threading
+import click
+from src.metadata import get_metadata
+import src.claude as claude
+
+PAGE_SIZE = 100
+
+
+class ListingError(Exception):
+    """A page of the conversation listing could not be fetched"""
+
+    def __init__(self, status_code):
+        super().__init__(f"status code {status_code}")
+        self.status_code = status_code
+
+
+def iter_conversation_pages(session, org_id, starred=False, limit=None, page_size=PAGE_SIZE):
+    """Yield pages of conversations until the listing, or limit, runs out"""
+    offset = 0
+    while limit is None or offset < limit:
+        size = page_size if limit is None else min(page_size, limit - offset)
+        response = claude.get_conversations(session, org_id, size, starred=starred, offset=offset)
+        if response.status_code != 200:
+            raise ListingError(response.status_code)
+
+        page = response.json()
+        if page:
+            yield page
+        offset += len(page)
+        if len(page) < size:
+            return
+
+
+def conversation_total(session, org_id):
+    """Number of conversations according to count_all, or None if unavailable"""
+    import requests
+
+    try:
+        response = claude.get_conversation_count(session, org_id)
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    count = data.get('count') if isinstance(data, dict) else None
+    return count if isinstance(count, int) else None
+
+
+def find_missed(session, org_id, regular, starred, expected):
+    """Add conversations in `expected` that a full listing skipped to regular and starred, in place
+
+    Pages are fetched by offset, so a conversation updated or deleted while
+    they are read shifts the rest by one and can be skipped, or show up
+    twice. Callers about to prune by the listing pass the uuids they hold;
+    each one the listing lacks is fetched on its own, and only a 404 counts
+    as deleted. Raises ListingError when that can't be told.
+    """
+    import requests
+
+    listed = {c.get('uuid') for c in regular + starred}
+    for conversation_uuid in set(expected) - listed:
+        try:
+            response = claude.get_conversation_details(session, org_id, conversation_uuid)
+        except requests.RequestException:
+            raise ListingError(None)
+        if response.status_code == 404:
+            continue
+        if response.status_code != 200:
+            raise ListingError(response.status_code)
+        convo = {k: v for k, v in response.json().items() if k != 'chat_messages'}
+        (starred if convo.get('is_starred') else regular).append(convo)
+
+
+def unique(convos):
+    """convos without the repeats of a page boundary that shifted"""
+    seen = set()
+    result = []
+    for convo in convos:
+        if convo.get('uuid') not in seen:
+            seen.add(convo.get('uuid'))
+            result.append(convo)
+    return result
+
+
+def list_conversations(session, org_id, limit=None, on_page=None, on_total=None, expected=()):
+    """Fetch regular and starred conversations concurrently, page by page
+
+    on_page(starred, page) and on_total(count) are called on the calling
+    thread as results arrive, so rows can be shown before the listing is
+    complete. limit caps each of the two lists. Callers about to prune by
+    a full listing pass the uuids they hold as `expected`, and those are
+    checked with find_missed. The result is recorded in the metadata
+    cache. Returns (regular, starred) or raises ListingError.
+    """
+    events = queue.Queue()
+
+    def fetch(starred):
+        try:
+            for page in iter_conversation_pages(session, org_id, starred, limit):
+                events.put(('page', starred, page))
+            events.put(('done', starred, None))
+        except Exception as e:
+            events.put(('done', starred, e))
+
+    def count():
+        events.put(('total', None, conversation_total(session, org_id)))
+
+    workers = [threading.Thread(target=fetch, args=(starred,), daemon=True) for starred in (False, True)]
+    if on_total:
+        workers.append(threading.Thread(target=count, daemon=True))
+    for worker in workers:
+        worker.start()
+
+    lists = {False: [], True: []}
+    pending = 2
+    error = None
+    while pending:
+        kind, starred, value = events.get()
+        if kind == 'page':
+            lists[starred].extend(value)
+            if on_page:
+                on_page(starred, value)
+        elif kind == 'total':
+            if value is not None:
+                on_total(value)
+        else:
+            pending -= 1
+            error = error or value
+
+    if error:
+        raise error
+    regular, starred = unique(lists[False]), unique(lists[True])
+    if limit is None and expected:
+        find_missed(session, org_id, regular, starred, expected)
+    get_metadata().store_listing(org_id, regular, starred, complete=limit is None)
+    return regular, starred
+
+
+def list_with_progress(session, org_id, limit=None, label='Listing conversations', expected=()):
+    """list_conversations behind a progress bar sized by count_all"""
+    total = conversation_total(session, org_id)
+    if total is None:
+        return list_conversations(session, org_id, limit, expected=expected)
+
+    if limit is not None:
+        total = min(total, 2 * limit)
+    with click.progressbar(length=total, label=label, show_eta=True, show_percent=True) as bar:
+        return list_conversations(
+            session, org_id, limit, on_page=lambda starred, page: bar.update(len(page)), expected=expected
+        )
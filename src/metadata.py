@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+import time
+
+METADATA_FILE = "metadata.db"
+
+# How long a conversation listing is trusted before the picker refreshes it
+LISTING_TTL = 5 * 60
+
+
+class MetadataCache:
+    """uuid, name, starred and updated_at of listed conversations, per org
+
+    Kept apart from the conversation cache and free of network imports, so
+    the picker and shell completion can read it without any startup cost.
+    """
+
+    def __init__(self, path=METADATA_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " uuid TEXT PRIMARY KEY,"
+            " org_id TEXT,"
+            " name TEXT,"
+            " is_starred INTEGER,"
+            " updated_at TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS conversations_org ON conversations (org_id, updated_at)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS listings (org_id TEXT PRIMARY KEY, fetched_at REAL)")
+        self._db.commit()
+
+    def conversations(self, org_id):
+        """Cached conversations of an org, most recently updated first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT uuid, name, is_starred, updated_at FROM conversations"
+                " WHERE org_id = ? ORDER BY updated_at DESC",
+                (org_id,)
+            ).fetchall()
+        return [
+            {'uuid': row[0], 'name': row[1], 'is_starred': bool(row[2]), 'updated_at': row[3]}
+            for row in rows
+        ]
+
+    def is_fresh(self, org_id, ttl=LISTING_TTL):
+        """True when the org's listing was fully refreshed within ttl seconds"""
+        with self._lock:
+            row = self._db.execute("SELECT fetched_at FROM listings WHERE org_id = ?", (org_id,)).fetchone()
+        return row is not None and time.time() - row[0] < ttl
+
+    def store_listing(self, org_id, regular, starred, complete=True):
+        """Record a listing; a complete one also drops conversations no longer listed"""
+        rows = [
+            (c['uuid'], org_id, c.get('name'), int(is_starred), c.get('updated_at'))
+            for convos, is_starred in ((regular, False), (starred, True))
+            for c in convos
+            if c.get('uuid')
+        ]
+        with self._lock:
+            if complete:
+                self._db.execute("DELETE FROM conversations WHERE org_id = ?", (org_id,))
+                self._db.execute("INSERT OR REPLACE INTO listings VALUES (?, ?)", (org_id, time.time()))
+            self._db.executemany("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def put(self, org_id, conversation_uuid, name, is_starred=False, updated_at=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?)",
+                (conversation_uuid, org_id, name, int(is_starred), updated_at)
+            )
+            self._db.commit()
+
+    def rename(self, conversation_uuid, name):
+        with self._lock:
+            self._db.execute("UPDATE conversations SET name = ? WHERE uuid = ?", (name, conversation_uuid))
+            self._db.commit()
+
+    def delete(self, conversation_uuid):
+        with self._lock:
+            self._db.execute("DELETE FROM conversations WHERE uuid = ?", (conversation_uuid,))
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+_metadata = None
+
+
+def get_metadata():
+    """Return the process-wide metadata cache"""
+    global _metadata
+    if _metadata is None:
+        _metadata = MetadataCache()
+    return _metadata
@@ -0,0 +1,23 @@
+"""Layout of a `claude mirror` directory, shared by the command and local indexes"""
+import json
+import os
+from src.helpers import write_file_atomic
+
+STATE_FILE = "mirror_state.json"
+
+
+def load_mirror_state(directory):
+    """Load the uuid -> updated_at map of conversations already mirrored"""
+    path = os.path.join(directory, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_mirror_state(directory, state):
+    write_file_atomic(os.path.join(directory, STATE_FILE), json.dumps(state, indent=2))
+
+
+def conversation_path(directory, conversation_uuid):
+    return os.path.join(directory, "conversations", f"{conversation_uuid}.json")
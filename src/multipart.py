@@ -0,0 +1,104 @@
+"""multipart/form-data bodies that stream a file from disk
+
+requests builds a files= upload completely in memory, so a large PDF
+costs a multiple of its size in RAM. MultipartFile is a body of known
+length that reads the file a chunk at a time as the socket takes it,
+so memory stays flat however big the file is.
+"""
+import os
+import time
+import uuid
+
+CHUNK_SIZE = 64 * 1024
+
+
+def quote_param(value):
+    """Escape a header parameter value the way browsers do for form uploads"""
+    return value.replace('\\', '\\\\').replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+
+
+class MultipartFile:
+    """A one-file multipart/form-data body, read from disk while it is sent
+
+    Pass it as data= with content_type as the Content-Type header. It has
+    a length, so it goes out with Content-Length rather than chunked.
+    sent, elapsed() and throughput() describe the upload so far.
+    """
+
+    def __init__(self, path, field='file', file_name=None, file_type='application/octet-stream', chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(path)
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self._head = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{quote_param(field)}"; '
+            f'filename="{quote_param(file_name or os.path.basename(path))}"\r\n'
+            f'Content-Type: {file_type}\r\n\r\n'
+        ).encode('utf-8')
+        self._tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        self._file = None
+        self._stage = 0
+        self.sent = 0
+        self.started = None
+        self.finished = None
+
+    def __len__(self):
+        return len(self._head) + self.size + len(self._tail)
+
+    def read(self, size=-1):
+        """Up to `size` bytes of the body (a chunk_size piece when size is -1); b'' at the end"""
+        if size is None or size < 0:
+            size = self.chunk_size
+        if self.started is None:
+            self.started = time.monotonic()
+
+        data = b''
+        while len(data) < size and self._stage < 3:
+            wanted = size - len(data)
+            position = self.sent + len(data)
+            if self._stage == 0:
+                data += self._head[position:position + wanted]
+                if position + wanted >= len(self._head):
+                    self._file = open(self.path, 'rb')
+                    self._stage = 1
+            elif self._stage == 1:
+                # Never more than the size Content-Length was given for, even if the file grows
+                remaining = self.size - (position - len(self._head))
+                piece = self._file.read(min(wanted, remaining)) if remaining > 0 else b''
+                if piece:
+                    data += piece
+                else:
+                    self._file.close()
+                    self._stage = 2
+            else:
+                offset = position - len(self._head) - self.size
+                data += self._tail[offset:offset + wanted]
+                if offset + wanted >= len(self._tail):
+                    self._stage = 3
+                    self.finished = time.monotonic()
+
+        self.sent += len(data)
+        return data
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def throughput(self):
+        """Bytes per second sent so far"""
+        elapsed = self.elapsed()
+        return self.sent / elapsed if elapsed else 0.0
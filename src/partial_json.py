@@ -0,0 +1,199 @@
+import re
+
+_PLAIN = re.compile(r'[^"\\]+')
+_WHITESPACE = ' \t\r\n'
+_ESCAPES = {
+    '"': '"', '\\': '\\', '/': '/',
+    'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t',
+}
+
+# Field fragments are joined into one once there are this many
+COMPACT_PARTS = 64
+
+
+class StreamingJSONObject:
+    """Incrementally decode the top-level string fields of a streamed JSON object
+
+    Chunks of the raw JSON text are fed in as they arrive. Each chunk is only
+    looked at once, and feed() returns just the characters it decoded, keyed
+    by field name. Escapes (including \\uXXXX and surrogate pairs) may be split
+    anywhere across chunk boundaries. Non-string values are skipped.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self.complete = set()
+        self.done = False
+        self._state = 'start'
+        self._key = None
+        self._key_parts = []
+        self._pending = ''
+        self._high_surrogate = None
+        self._depth = 0
+        self._nested_string = False
+        self._nested_escape = False
+
+    def get(self, key, default=None):
+        """Return the text decoded so far for a field
+
+        Read-only, so it is safe to call from another thread (e.g. a
+        rich Live refresh) while feed() is appending.
+        """
+        parts = self.fields.get(key)
+        if parts is None:
+            return default
+        return ''.join(parts)
+
+    def feed(self, chunk):
+        """Consume a chunk of JSON text and return {field: newly decoded text}"""
+        if self._pending:
+            chunk = self._pending + chunk
+            self._pending = ''
+
+        updates = {}
+        i, n = 0, len(chunk)
+        while i < n and not self.done:
+            state = self._state
+
+            if state == 'string':
+                out = []
+                i, closed = self._read_string(chunk, i, out)
+                if out:
+                    text = ''.join(out)
+                    parts = self.fields[self._key]
+                    parts.append(text)
+                    # Only feed() changes the parts, so compacting here can't lose a fragment
+                    if len(parts) >= COMPACT_PARTS:
+                        parts[:] = [''.join(parts)]
+                    updates[self._key] = updates.get(self._key, '') + text
+                if closed:
+                    self.complete.add(self._key)
+                    self._state = 'after'
+                continue
+
+            if state == 'key':
+                i, closed = self._read_string(chunk, i, self._key_parts)
+                if closed:
+                    self._key = ''.join(self._key_parts)
+                    self._key_parts = []
+                    self._state = 'colon'
+                continue
+
+            if state == 'other':
+                i = self._skip_value(chunk, i)
+                continue
+
+            char = chunk[i]
+            i += 1
+            if char in _WHITESPACE:
+                continue
+
+            if state == 'start':
+                if char == '{':
+                    self._state = 'key_or_end'
+            elif state == 'key_or_end':
+                if char == '"':
+                    self._state = 'key'
+                elif char == '}':
+                    self.done = True
+            elif state == 'colon':
+                if char == ':':
+                    self._state = 'value'
+            elif state == 'value':
+                if char == '"':
+                    self.fields[self._key] = []
+                    self._state = 'string'
+                else:
+                    self._state = 'other'
+                    i -= 1
+            elif state == 'after':
+                if char == ',':
+                    self._state = 'key_or_end'
+                elif char == '}':
+                    self.done = True
+
+        return updates
+
+    def _read_string(self, chunk, i, out):
+        """Decode string characters from chunk[i:] into out until the closing quote"""
+        n = len(chunk)
+        while i < n:
+            match = _PLAIN.match(chunk, i)
+            if match:
+                self._flush_surrogate(out)
+                out.append(match.group())
+                i = match.end()
+                continue
+
+            char = chunk[i]
+            if char == '"':
+                self._flush_surrogate(out)
+                return i + 1, True
+
+            # Backslash escape, which may be cut off by the end of the chunk
+            if i + 1 >= n:
+                self._pending = chunk[i:]
+                return n, False
+
+            code = chunk[i + 1]
+            if code == 'u':
+                if i + 6 > n:
+                    self._pending = chunk[i:]
+                    return n, False
+                try:
+                    value = int(chunk[i + 2:i + 6], 16)
+                except ValueError:
+                    value = 0xFFFD
+                self._append_codepoint(value, out)
+                i += 6
+            else:
+                self._flush_surrogate(out)
+                out.append(_ESCAPES.get(code, code))
+                i += 2
+
+        return i, False
+
+    def _append_codepoint(self, value, out):
+        if 0xD800 <= value <= 0xDBFF:
+            self._flush_surrogate(out)
+            self._high_surrogate = value
+        elif 0xDC00 <= value <= 0xDFFF and self._high_surrogate is not None:
+            high = self._high_surrogate
+            self._high_surrogate = None
+            out.append(chr(0x10000 + ((high - 0xD800) << 10) + (value - 0xDC00)))
+        else:
+            self._flush_surrogate(out)
+            out.append('\ufffd' if 0xDC00 <= value <= 0xDFFF else chr(value))
+
+    def _flush_surrogate(self, out):
+        # A high surrogate that isn't followed by a low one can't be printed
+        if self._high_surrogate is not None:
+            self._high_surrogate = None
+            out.append('\ufffd')
+
+    def _skip_value(self, chunk, i):
+        """Skip over a number, literal, array or object value"""
+        n = len(chunk)
+        while i < n:
+            char = chunk[i]
+            i += 1
+            if self._nested_string:
+                if self._nested_escape:
+                    self._nested_escape = False
+                elif char == '\\':
+                    self._nested_escape = True
+                elif char == '"':
+                    self._nested_string = False
+            elif char == '"':
+                self._nested_string = True
+            elif char in '[{':
+                self._depth += 1
+            elif char in ']}':
+                if self._depth == 0:
+                    self.done = True
+                    return i
+                self._depth -= 1
+            elif char == ',' and self._depth == 0:
+                self._state = 'key_or_end'
+                return i
+        return i
@@ -0,0 +1,105 @@
+import threading
+import click
+from rich.console import Console, Group
+from rich.live import Live
+from rich.text import Text
+from src.fuzzy import fuzzy_filter
+
+UP_KEYS = {'\x1b[A', '\x1bOA', '\xe0H', '\x00H', '\x10'}
+DOWN_KEYS = {'\x1b[B', '\x1bOB', '\xe0P', '\x00P', '\x0e'}
+ENTER_KEYS = {'\r', '\n'}
+BACKSPACE_KEYS = {'\x7f', '\x08'}
+CANCEL_KEYS = {'\x1b', '\x03', '\x04'}
+
+
+class ConversationPicker:
+    """Inline fuzzy picker: type to filter, arrows to move, Enter to pick
+
+    Items can be replaced from another thread with set_items(), e.g. when
+    a background refresh finishes; the selection follows the same uuid.
+    """
+
+    def __init__(self, items, active_uuid=None, height=15):
+        self.active_uuid = active_uuid
+        self.height = height
+        self.query = ""
+        self.status = ""
+        self.selected = 0
+        self._lock = threading.Lock()
+        self._items = list(items)
+        self._matches = list(items)
+
+    def set_items(self, items, status=""):
+        with self._lock:
+            current = self._matches[self.selected]['uuid'] if self._matches else None
+            self._items = list(items)
+            self.status = status
+            self._filter(keep_uuid=current)
+
+    def set_status(self, status):
+        with self._lock:
+            self.status = status
+
+    def _filter(self, keep_uuid=None):
+        self._matches = fuzzy_filter(self.query, self._items, key=lambda c: c.get('name') or 'Untitled')
+        uuids = [c['uuid'] for c in self._matches]
+        self.selected = uuids.index(keep_uuid) if keep_uuid in uuids else 0
+
+    def _key(self, key):
+        """Apply one key press; returns 'pick', 'cancel' or None"""
+        with self._lock:
+            if key in ENTER_KEYS:
+                return 'pick' if self._matches else None
+            if key in CANCEL_KEYS:
+                return 'cancel'
+            if key in UP_KEYS:
+                self.selected = max(self.selected - 1, 0)
+            elif key in DOWN_KEYS:
+                self.selected = min(self.selected + 1, max(len(self._matches) - 1, 0))
+            elif key in BACKSPACE_KEYS:
+                self.query = self.query[:-1]
+                self._filter()
+            elif key.isprintable():
+                self.query += key
+                self._filter()
+        return None
+
+    def __rich__(self):
+        with self._lock:
+            header = Text.assemble(
+                ("> ", "bold cyan"), self.query, ("▏", "cyan"),
+                (f"  {len(self._matches)}/{len(self._items)}", "dim"),
+                (f"  {self.status}" if self.status else "", "dim italic"),
+            )
+
+            # Scroll so the selected row stays visible
+            first = max(0, min(self.selected - self.height // 2, len(self._matches) - self.height))
+            rows = []
+            for i, convo in enumerate(self._matches[first:first + self.height], first):
+                marker = "->" if convo['uuid'] == self.active_uuid else "  "
+                star = "[*] " if convo.get('is_starred') else ""
+                line = Text(f"{marker} {star}{convo.get('name') or 'Untitled'} ({convo['uuid'][:8]}...)")
+                if i == self.selected:
+                    line.stylize("reverse")
+                rows.append(line)
+            if not rows:
+                rows.append(Text("  no matches" if self._items else "  loading...", style="dim"))
+
+        return Group(header, *rows)
+
+    def run(self):
+        """Show the picker until a conversation is picked; returns it, or None if cancelled"""
+        with Live(self, console=Console(), auto_refresh=True, refresh_per_second=15, transient=True) as live:
+            while True:
+                try:
+                    key = click.getchar()
+                except (KeyboardInterrupt, EOFError):
+                    return None
+
+                action = self._key(key)
+                live.refresh()
+                if action == 'cancel':
+                    return None
+                if action == 'pick':
+                    with self._lock:
+                        return self._matches[self.selected]
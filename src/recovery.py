@@ -0,0 +1,181 @@
+"""Finding out what became of a completion whose stream broke off
+
+claude.ai keeps generating a reply after the client goes away, so when a
+stream drops, stalls or times out the finished message can be read back
+from the conversation tree. That is cheaper than resending the prompt,
+and doesn't fork the conversation. The prompt is only sent again when the
+tree shows it never arrived.
+"""
+import time
+import src.claude as claude
+from src.content import extract_message_text
+
+# Events that keep a connection alive without making progress on the reply
+KEEPALIVE_EVENTS = {'ping'}
+
+# Give up on a stream that has only sent keep-alives for this long
+STALL_TIMEOUT = 90
+
+POLL_INTERVAL = 2
+
+# How long a prompt that may not have arrived is looked for before resending it
+RECEIPT_GRACE = 6
+
+# How long to wait for a reply that is still being written
+RECOVERY_TIMEOUT = 5 * 60
+
+# Give up after this many polls in a row that couldn't reach claude.ai at all
+UNREACHABLE_POLLS = 3
+
+
+class StreamStalled(Exception):
+    """A completion stream kept the connection open without producing anything"""
+
+
+class ReplyPending(Exception):
+    """The prompt arrived but its reply wasn't finished in time"""
+
+
+def watch_stall(events, timeout=None):
+    """Pass (event_type, event) pairs through, raising StreamStalled after `timeout` seconds (STALL_TIMEOUT) of keep-alives only
+
+    Silence on the socket itself is caught by the read timeout of the request.
+    """
+    timeout = STALL_TIMEOUT if timeout is None else timeout
+    last_progress = time.monotonic()
+    for event_type, event in events:
+        now = time.monotonic()
+        if event_type not in KEEPALIVE_EVENTS:
+            last_progress = now
+        elif now - last_progress > timeout:
+            raise StreamStalled(f"no progress for {now - last_progress:.0f}s")
+        yield event_type, event
+
+
+def message_text(message):
+    return "".join(extract_message_text(message)[0]).strip()
+
+
+def find_prompt(messages, parent_message_uuid, prompt):
+    """The human message that carried `prompt` as a reply to parent_message_uuid, if it arrived"""
+    prompt = prompt.strip()
+    for message in reversed(messages):
+        if message.get('sender') != 'human':
+            continue
+        if message.get('parent_message_uuid', parent_message_uuid) != parent_message_uuid:
+            continue
+        if message_text(message) == prompt:
+            return message
+    return None
+
+
+def find_reply(messages, prompt_message):
+    """The assistant message answering prompt_message, if there is one yet"""
+    for message in messages:
+        if message.get('sender') != 'assistant':
+            continue
+        if 'parent_message_uuid' in message:
+            if message['parent_message_uuid'] == prompt_message['uuid']:
+                return message
+        elif message.get('index') == prompt_message.get('index', -2) + 1:
+            return message
+    return None
+
+
+def recover_reply(session, org_id, conversation_uuid, parent_message_uuid, prompt, received=True,
+                  timeout=None, grace=None):
+    """Read the reply to `prompt` back from claude.ai after its stream broke off
+
+    Returns the finished assistant message, or None when the prompt never
+    arrived, which is only concluded when received is False and it hasn't
+    shown up within `grace` seconds (RECEIPT_GRACE), whether or not the
+    polls got an answer. Raises ReplyPending when the prompt arrived but
+    the reply wasn't finished within `timeout` seconds (RECOVERY_TIMEOUT).
+    While claude.ai can't be reached at all (UNREACHABLE_POLLS polls in a
+    row that were never sent) the connection error is raised at once.
+
+    A reply is finished once it has a stop_reason, or, for messages without
+    that field, when two polls in a row return the same content.
+    """
+    import requests
+    import src.cache as cache
+    from src.transport import never_sent
+
+    timeout = RECOVERY_TIMEOUT if timeout is None else timeout
+    grace = RECEIPT_GRACE if grace is None else grace
+    started = time.monotonic()
+    previous = None
+    unreachable = 0
+    while True:
+        try:
+            response = claude.get_conversation_details(session, org_id, conversation_uuid)
+            data = response.json() if response.status_code == 200 else None
+            unreachable = 0
+        except requests.RequestException as e:
+            data = None
+            unreachable = unreachable + 1 if never_sent(e) else 0
+            if unreachable >= UNREACHABLE_POLLS:
+                raise
+        except ValueError:
+            data = None
+
+        if data is not None:
+            messages = data.get('chat_messages', [])
+            prompt_message = find_prompt(messages, parent_message_uuid, prompt)
+            if prompt_message is not None:
+                received = True
+                reply = find_reply(messages, prompt_message)
+                if reply is not None:
+                    finished = reply.get('stop_reason') if 'stop_reason' in reply else reply == previous
+                    if finished:
+                        cache.store_conversation(org_id, conversation_uuid, data)
+                        return reply
+                    previous = reply
+
+        elapsed = time.monotonic() - started
+        if not received and elapsed >= grace:
+            return None
+        if elapsed >= timeout:
+            raise ReplyPending(f"the reply is still being written after {timeout:.0f}s")
+        time.sleep(POLL_INTERVAL)
+
+
+def send_or_recover(send, session, org_id, conversation_uuid, parent_message_uuid, prompt, notify=None):
+    """Return (send(), None), or (None, reply message) when sending broke but the reply was found
+
+    send() makes the completion request. A request that failed before it
+    was sent (no connection, or the circuit breaker is open) can't have
+    arrived, so its error is raised straight away. After any other error,
+    or a 5xx response, claude.ai is polled for the prompt, and send() is
+    called a second time only when the prompt didn't show up. If that
+    fails too, its error is raised or its response returned. notify(text),
+    if given, is told what is going on while claude.ai is polled.
+    """
+    import requests
+    from src.transport import never_sent, FAILURE_STATUSES
+
+    for attempt in range(2):
+        error = None
+        try:
+            response = send()
+        except requests.RequestException as e:
+            if never_sent(e):
+                raise
+            response, error, failure = None, e, type(e).__name__
+        else:
+            if response.status_code not in FAILURE_STATUSES:
+                return response, None
+            response.close()
+            failure = f"status {response.status_code}"
+
+        if notify:
+            notify(f"No response ({failure}), looking for the message on claude.ai...")
+        message = recover_reply(session, org_id, conversation_uuid, parent_message_uuid, prompt, received=False)
+        if message is not None:
+            return None, message
+        if attempt:
+            if error is not None:
+                raise error
+            return response, None
+        if notify:
+            notify("The message never arrived, sending it again...")
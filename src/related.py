@@ -0,0 +1,179 @@
+import json
+import math
+import os
+import re
+import zlib
+import numpy as np
+from src.cache import iter_changed_conversations, stored_conversation_uuids
+from src.content import extract_message_text
+from src.helpers import open_atomic, write_file_atomic
+
+RELATED_DIR = "related"
+DIMENSIONS = 4096
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def conversation_text(data):
+    """All searchable text of a conversation, as extracted for `search`"""
+    parts = [data.get('name') or '']
+    for msg in data.get('chat_messages', []):
+        text_parts, _ = extract_message_text(msg)
+        parts.extend(text_parts)
+    return '\n'.join(parts)
+
+
+def vectorize(text, dims=DIMENSIONS):
+    """Hash word unigrams and bigrams into a sublinear term-frequency vector"""
+    words = _WORD_RE.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = np.zeros(dims, dtype=np.float32)
+    if not features:
+        return vector
+
+    # crc32 rather than hash(), which is salted differently in every process
+    indices = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in features), dtype=np.uint32, count=len(features))
+    counts = np.bincount(indices % dims, minlength=dims)
+    nonzero = counts > 0
+    vector[nonzero] = 1 + np.log(counts[nonzero])
+    return vector
+
+
+class RelatedIndex:
+    """Hashed TF vectors of stored conversations in a memory-mapped matrix
+
+    Rows hold sublinear term frequencies (1 + log tf, from vectorize), and
+    document frequencies are kept alongside, so adding or replacing a
+    conversation only rewrites its own row. IDF weighting is applied at
+    query time.
+    """
+
+    def __init__(self, directory=RELATED_DIR, dims=DIMENSIONS):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, "index.json")
+        self.vectors_path = os.path.join(directory, "vectors.npy")
+        self.df_path = os.path.join(directory, "df.npy")
+        os.makedirs(directory, exist_ok=True)
+
+        meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+        if meta.get('dims', dims) != dims or not os.path.exists(self.vectors_path):
+            meta = {}
+        self.dims = dims
+        self.rows = meta.get('rows', {})
+        self.count = meta.get('count', 0)
+
+        if meta:
+            self.vectors = np.load(self.vectors_path, mmap_mode='r+')
+            self.df = np.load(self.df_path)
+        else:
+            self.vectors = None
+            self.df = np.zeros(dims, dtype=np.int64)
+
+    def indexed_versions(self, org_id):
+        return {u: r['updated_at'] for u, r in self.rows.items() if r['org_id'] == org_id}
+
+    def _ensure_capacity(self, size):
+        if self.vectors is not None and self.vectors.shape[0] >= size:
+            return
+        capacity = max(64, size, 2 * (self.vectors.shape[0] if self.vectors is not None else 0))
+        tmp_path = self.vectors_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(capacity, self.dims))
+        if self.vectors is not None:
+            grown[:self.count] = self.vectors[:self.count]
+        grown.flush()
+        del grown
+        self.vectors = None
+        os.replace(tmp_path, self.vectors_path)
+        self.vectors = np.load(self.vectors_path, mmap_mode='r+')
+
+    def add_conversation(self, org_id, data):
+        """(Re)vectorize one conversation into its row"""
+        conversation_uuid = data.get('uuid')
+        vector = vectorize(conversation_text(data), self.dims)
+
+        entry = self.rows.get(conversation_uuid)
+        if entry is None:
+            self._ensure_capacity(self.count + 1)
+            entry = {'row': self.count}
+            self.count += 1
+        else:
+            self.df -= self.vectors[entry['row']] > 0
+
+        self.vectors[entry['row']] = vector
+        self.df += vector > 0
+        entry.update({'org_id': org_id, 'name': data.get('name'), 'updated_at': data.get('updated_at')})
+        self.rows[conversation_uuid] = entry
+
+    def remove_conversation(self, conversation_uuid):
+        """Drop a conversation's row, moving the last row into its place"""
+        entry = self.rows.pop(conversation_uuid, None)
+        if entry is None:
+            return
+        row, last = entry['row'], self.count - 1
+        self.df -= self.vectors[row] > 0
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            moved = next(r for r in self.rows.values() if r['row'] == last)
+            moved['row'] = row
+        self.vectors[last] = 0
+        self.count -= 1
+
+    def update(self, org_id, mirror_dir=None):
+        """Vectorize stored conversations that are new or changed, and drop ones no longer stored
+
+        Returns (vectorized, removed) counts.
+        """
+        indexed_versions = self.indexed_versions(org_id)
+        changed = 0
+        for data in iter_changed_conversations(org_id, indexed_versions, mirror_dir):
+            self.add_conversation(org_id, data)
+            changed += 1
+
+        gone = set(indexed_versions) - stored_conversation_uuids(org_id, mirror_dir)
+        for conversation_uuid in gone:
+            self.remove_conversation(conversation_uuid)
+        if changed or gone:
+            self.save()
+        return changed, len(gone)
+
+    def save(self):
+        self.vectors.flush()
+        with open_atomic(self.df_path, 'wb') as f:
+            np.save(f, self.df)
+        meta = {'dims': self.dims, 'count': self.count, 'rows': self.rows}
+        write_file_atomic(self.meta_path, json.dumps(meta))
+
+    def query(self, vector, org_id, k=10, exclude=None):
+        """Return the k conversations most similar to vector by TF-IDF cosine"""
+        if not self.count:
+            return []
+
+        matrix = self.vectors[:self.count]
+        idf = (np.log((1 + self.count) / (1 + self.df)) + 1).astype(np.float32)
+        weights = idf * idf
+
+        # cos(M_i * idf, q * idf) for every row at once
+        query_norm = math.sqrt(float(np.dot(vector * vector, weights))) or 1.0
+        dots = matrix @ (vector * weights)
+        norms = np.sqrt(np.einsum('ij,ij,j->i', matrix, matrix, weights))
+        scores = dots / (np.maximum(norms, 1e-12) * query_norm)
+
+        by_row = {r['row']: (u, r) for u, r in self.rows.items()}
+        for row, (conversation_uuid, entry) in by_row.items():
+            if entry['org_id'] != org_id or conversation_uuid == exclude:
+                scores[row] = -1
+
+        k = min(k, self.count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        results = []
+        for row in top:
+            if scores[row] <= 0:
+                break
+            conversation_uuid, entry = by_row[int(row)]
+            results.append({'uuid': conversation_uuid, 'name': entry['name'], 'score': float(scores[row])})
+        return results
@@ -0,0 +1,149 @@
+import re
+from rich.markdown import Markdown
+from rich.segment import Segment, Segments
+
+FENCE_RE = re.compile(r' {0,3}(`{3,}|~{3,})')
+LIST_ITEM_RE = re.compile(r'([-*+]|\d+[.)])(\s|$)')
+
+
+def is_blank_line(segments):
+    """True for a rendered line with no text and no background colour"""
+    for segment in segments:
+        if segment.text.strip() or (segment.style and segment.style.bgcolor):
+            return False
+    return True
+
+
+class MarkdownTail:
+    """Renderable for the still-open end of a response, cut to fit the screen"""
+
+    def __init__(self):
+        self.text = ""
+        self.pending = ""
+
+    def __rich_console__(self, console, options):
+        height = max((options.height or console.height) - 1, 1)
+        pending = self.pending() if callable(self.pending) else self.pending
+        text = self.text + pending
+
+        # Only the last screenful can be seen, so don't parse anything above it
+        lines = text.split('\n')
+        if len(lines) > height:
+            fence = None
+            for line in lines[:-height]:
+                match = FENCE_RE.match(line)
+                if match:
+                    marker = match.group(1)
+                    if fence is None:
+                        fence = marker
+                    elif marker[0] == fence[0] and len(marker) >= len(fence) and not line.strip(marker[0] + ' '):
+                        fence = None
+            visible = lines[-height:]
+            if fence is not None:
+                visible.insert(0, fence)
+            text = '\n'.join(visible)
+
+        rendered = console.render_lines(Markdown(text), options.update(height=None), pad=False)
+        for line in rendered[-height:]:
+            yield from line
+            yield Segment.line()
+
+
+class MarkdownStream:
+    """Stream markdown into a rich Live region, one top-level block at a time
+
+    Finished blocks (paragraphs, closed code fences, tables...) are rendered
+    once and printed above the Live region into scrollback. Only the open tail
+    block stays live, and it is re-parsed at most once per refresh.
+    """
+
+    def __init__(self, live):
+        self.live = live
+        self.console = live.console
+        self.tail = MarkdownTail()
+        self.text = ""
+        self.committed = 0
+        self.blocks_printed = 0
+        self._pos = 0
+        self._fence = None
+        self._boundary = None
+        self.live.update(self.tail)
+
+    def update(self, text, pending=""):
+        """Set the full document so far, plus text shown only while it streams
+
+        pending may be a callable, so expensive previews are only built when
+        the Live region actually refreshes.
+        """
+        self.text = text
+        self._scan()
+        self.tail.text = text[self.committed:]
+        self.tail.pending = pending
+
+    def finish(self):
+        """Move whatever is left of the document into scrollback"""
+        self.tail.text = ""
+        self.tail.pending = ""
+        self.live.update(self.tail, refresh=True)
+        self._commit(len(self.text))
+
+    def _scan(self):
+        text = self.text
+        pos = self._pos
+        while True:
+            end = text.find('\n', pos)
+            if end == -1:
+                break
+            self._process_line(text[pos:end], pos, end + 1)
+            pos = end + 1
+        self._pos = pos
+
+    def _process_line(self, line, start, next_start):
+        stripped = line.strip()
+
+        if self._fence is not None:
+            fence = self._fence
+            if stripped.startswith(fence) and not stripped.strip(fence[0]):
+                self._fence = None
+                self._commit(next_start)
+            return
+
+        if self._boundary is not None and stripped:
+            # Indented lines and list items may still belong to the previous block
+            if line[0] not in ' \t' and not LIST_ITEM_RE.match(stripped):
+                self._commit(self._boundary)
+            self._boundary = None
+
+        if not stripped:
+            if self.text[self.committed:start].strip():
+                self._boundary = next_start
+            return
+
+        match = FENCE_RE.match(line)
+        if match:
+            self._fence = match.group(1)
+
+    def _commit(self, end):
+        block = self.text[self.committed:end]
+        self.committed = end
+        self.tail.text = self.text[end:]
+        if not block.strip():
+            return
+
+        lines = self.console.render_lines(Markdown(block), pad=False)
+        # Blocks bring their own surrounding blank lines; normalise them to one
+        while lines and is_blank_line(lines[-1]):
+            lines.pop()
+        while lines and is_blank_line(lines[0]):
+            lines.pop(0)
+        if not lines:
+            return
+
+        if self.blocks_printed:
+            self.console.line()
+        segments = []
+        for line in lines:
+            segments.extend(line)
+            segments.append(Segment.line())
+        self.console.print(Segments(segments), end="")
+        self.blocks_printed += 1
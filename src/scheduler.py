@@ -0,0 +1,219 @@
+import threading
+import time
+from contextlib import contextmanager
+import click
+from src.concurrency import TokenBucket
+from src.helpers import load_accounts, get_active_account, extract_org_id, session_for, pool_session
+
+# How long an account sits out after a 429 that doesn't say when to come back
+COOLDOWN = 60
+
+# Fail instead of waiting when every usable account cools down for longer than this
+MAX_WAIT = 10 * 60
+
+
+class AccountThrottled(Exception):
+    """The account hit a rate or message limit; the work should move elsewhere"""
+
+    def __init__(self, seconds):
+        super().__init__(f"rate limited for {seconds:.0f}s")
+        self.seconds = seconds
+
+
+class AccountsExhausted(Exception):
+    """Every account the work can run on is cooling down for too long"""
+
+
+class _Unsuccessful(Exception):
+    """Marks a call that ended in an error status without being throttled"""
+
+
+def throttle_seconds(response):
+    """How long to rest an account after a 429: Retry-After when given, else COOLDOWN"""
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return COOLDOWN
+
+
+def message_limit_cooldown(event):
+    """Seconds until the limit resets for an exceeded message_limit SSE event, None otherwise"""
+    limit = event.get('message_limit') or {}
+    if limit.get('type') != 'exceeded_limit':
+        return None
+    resets_at = limit.get('resetsAt')
+    return max(1, resets_at - time.time()) if isinstance(resets_at, (int, float)) else COOLDOWN
+
+
+class Account:
+    """One account of a pool: its session, rate limit, cooldown and counters"""
+
+    def __init__(self, pool, name, session, org_id, bucket):
+        self.pool = pool
+        self.name = name
+        self.session = session
+        self.org_id = org_id
+        self.bucket = bucket
+        self.in_flight = 0
+        self.last_used = 0
+        self.cooldown_until = 0
+        self.completed = 0
+        self.failed = 0
+        self.throttled = 0
+
+    def cool_down(self, seconds):
+        """Keep work off this account for `seconds`"""
+        self.pool._cool_down(self, seconds)
+
+
+class AccountPool:
+    """Spreads work over several accounts, each behind its own token bucket
+
+    'least-loaded' gives work to the account with the fewest calls in
+    flight, 'round-robin' cycles through them. An account that hits a 429
+    or a message limit sits out until its cooldown ends while the others
+    carry on. Work can also be pinned to a named account, e.g. to continue
+    a conversation that only exists there.
+    """
+
+    def __init__(self, rate, burst=None, strategy='least-loaded', max_wait=MAX_WAIT):
+        self.rate = rate
+        self.burst = burst
+        self.strategy = strategy
+        self.max_wait = max_wait
+        self.accounts = {}
+        self.shared = []
+        self.started = time.monotonic()
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def add(self, name, session, org_id, shared=True):
+        """Add an account; only shared accounts take work that isn't pinned"""
+        with self._cond:
+            if name not in self.accounts:
+                self.accounts[name] = Account(self, name, session, org_id, TokenBucket(self.rate, self.burst))
+            account = self.accounts[name]
+            if shared and account not in self.shared:
+                self.shared.append(account)
+            return account
+
+    def _pick(self, ready):
+        if self.strategy == 'round-robin':
+            for offset in range(len(self.shared)):
+                account = self.shared[(self._next + offset) % len(self.shared)]
+                if account in ready:
+                    self._next = (self._next + offset + 1) % len(self.shared)
+                    return account
+        return min(ready, key=lambda a: (a.in_flight, a.last_used))
+
+    def acquire(self, name=None):
+        """Take an account for one unit of work, waiting while all candidates cool down"""
+        with self._cond:
+            candidates = [self.accounts[name]] if name else self.shared
+            while True:
+                now = time.monotonic()
+                ready = [a for a in candidates if a.cooldown_until <= now]
+                if ready:
+                    account = ready[0] if name else self._pick(ready)
+                    account.in_flight += 1
+                    account.last_used = now
+                    return account
+                wait = min(a.cooldown_until for a in candidates) - now
+                if wait > self.max_wait:
+                    names = ', '.join(a.name for a in candidates)
+                    until = time.strftime('%H:%M', time.localtime(time.time() + wait))
+                    raise AccountsExhausted(f"{names} rate limited until {until}")
+                self._cond.wait(wait)
+
+    def _release(self, account, outcome):
+        with self._cond:
+            account.in_flight -= 1
+            if outcome == 'completed':
+                account.completed += 1
+            elif outcome == 'failed':
+                account.failed += 1
+            self._cond.notify_all()
+
+    def _cool_down(self, account, seconds):
+        with self._cond:
+            account.cooldown_until = max(account.cooldown_until, time.monotonic() + seconds)
+            account.throttled += 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def use(self, name=None):
+        """Run a block on an account; AccountThrottled from it cools the account down"""
+        account = self.acquire(name)
+        outcome = 'failed'
+        try:
+            yield account
+            outcome = 'completed'
+        except AccountThrottled as e:
+            outcome = 'throttled'
+            account.cool_down(e.seconds)
+            raise
+        finally:
+            self._release(account, outcome)
+
+    def call(self, request, retries=3, name=None):
+        """Return request(account) from a pool account
+
+        Brief errors and throttling are retried in place by the transport; a
+        429 that still comes back cools that account down and the call
+        moves to another one, up to `retries` times more than there are
+        accounts.
+        """
+        response = None
+        for _ in range(retries + len(self.shared)):
+            try:
+                with self.use(name) as account:
+                    account.bucket.acquire()
+                    response = request(account)
+                    if response.status_code == 429:
+                        raise AccountThrottled(throttle_seconds(response))
+                    if response.status_code >= 400:
+                        raise _Unsuccessful()
+                return response
+            except _Unsuccessful:
+                return response
+            except AccountThrottled:
+                continue
+        return response
+
+    def summary(self):
+        """One line of throughput and outcomes per account"""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        width = max(len(name) for name in self.accounts)
+        return [
+            f"  {a.name:{width}}  {a.completed} done, {a.failed} failed, {a.throttled} throttled"
+            f"  ({a.completed / elapsed:.2f}/s)"
+            for a in self.accounts.values()
+        ]
+
+
+def account_pool(names, rate, burst=None, strategy='least-loaded', org_id=None, pinned=()):
+    """Pool of the named accounts from auth.json, or of the active account when none are named
+
+    With org_id, every account must belong to that organization. Accounts in
+    `pinned` are added for work pinned to them without taking other work.
+    Returns None when no account is named and none is active.
+    """
+    accounts = load_accounts()
+    names = list(names) or [get_active_account()]
+    if names == [None]:
+        return None
+
+    pool = AccountPool(rate, burst, strategy)
+    for name, shared in [(name, True) for name in names] + [(name, False) for name in pinned]:
+        if name in pool.accounts and not shared:
+            continue
+        if name not in accounts:
+            raise click.UsageError(f"No account named '{name}'. Use 'accounts' to list them.")
+        account_org = extract_org_id(accounts[name])
+        if not account_org:
+            raise click.UsageError(f"Account '{name}' has no lastActiveOrg cookie. Run 'update-account {name}'.")
+        if org_id and account_org != org_id:
+            raise click.UsageError(f"Account '{name}' belongs to another organization.")
+        session = pool_session(session_for(accounts[name]), burst or 10)
+        pool.add(name, session, account_org, shared)
+    return pool
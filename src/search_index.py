@@ -0,0 +1,139 @@
+import sqlite3
+from src.cache import iter_changed_conversations, stored_conversation_uuids
+from src.content import extract_message_text
+
+INDEX_FILE = "search.db"
+SCHEMA_VERSION = 1
+
+
+class SearchIndex:
+    """Persistent FTS5 index over the messages of locally stored conversations"""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # The index is derived data, so an old layout is simply rebuilt
+            self._db.executescript(
+                "DROP TABLE IF EXISTS messages;"
+                " DROP TABLE IF EXISTS message_info;"
+                " DROP TABLE IF EXISTS conversations;"
+            )
+        self._db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5("
+            " text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        # Kept outside the FTS table so a conversation's rows can be found by index
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS message_info ("
+            " id INTEGER PRIMARY KEY,"
+            " conversation_uuid TEXT,"
+            " message_uuid TEXT,"
+            " sender TEXT,"
+            " created_at TEXT)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS message_info_conversation ON message_info (conversation_uuid)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " uuid TEXT PRIMARY KEY,"
+            " org_id TEXT,"
+            " name TEXT,"
+            " updated_at TEXT)"
+        )
+        self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.commit()
+
+    def indexed_versions(self, org_id):
+        """Return uuid -> updated_at for everything indexed for an org"""
+        rows = self._db.execute(
+            "SELECT uuid, updated_at FROM conversations WHERE org_id = ?", (org_id,)
+        ).fetchall()
+        return dict(rows)
+
+    def add_conversation(self, org_id, data):
+        """(Re)index one conversation tree, replacing any older version"""
+        conversation_uuid = data.get('uuid')
+        self._delete_messages(conversation_uuid)
+
+        for msg in data.get('chat_messages', []):
+            text_parts, _ = extract_message_text(msg)
+            text = ' '.join(text_parts).strip()
+            if not text:
+                continue
+            cursor = self._db.execute(
+                "INSERT INTO message_info (conversation_uuid, message_uuid, sender, created_at) VALUES (?, ?, ?, ?)",
+                (conversation_uuid, msg.get('uuid'), msg.get('sender'), msg.get('created_at'))
+            )
+            self._db.execute("INSERT INTO messages (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?)",
+            (conversation_uuid, org_id, data.get('name'), data.get('updated_at'))
+        )
+
+    def _delete_messages(self, conversation_uuid):
+        self._db.execute(
+            "DELETE FROM messages WHERE rowid IN"
+            " (SELECT id FROM message_info WHERE conversation_uuid = ?)",
+            (conversation_uuid,)
+        )
+        self._db.execute("DELETE FROM message_info WHERE conversation_uuid = ?", (conversation_uuid,))
+
+    def remove_conversation(self, conversation_uuid):
+        self._delete_messages(conversation_uuid)
+        self._db.execute("DELETE FROM conversations WHERE uuid = ?", (conversation_uuid,))
+
+    def commit(self):
+        self._db.commit()
+
+    def update(self, org_id, mirror_dir=None):
+        """Index stored conversations that are new or changed, and drop ones no longer stored
+
+        Returns (indexed, removed) counts.
+        """
+        indexed_versions = self.indexed_versions(org_id)
+        changed = 0
+        for data in iter_changed_conversations(org_id, indexed_versions, mirror_dir):
+            self.add_conversation(org_id, data)
+            changed += 1
+
+        gone = set(indexed_versions) - stored_conversation_uuids(org_id, mirror_dir)
+        for conversation_uuid in gone:
+            self.remove_conversation(conversation_uuid)
+        self.commit()
+        return changed, len(gone)
+
+    def search(self, query, org_id, limit=20):
+        """Return BM25-ranked messages containing every word of the query, best first"""
+        terms = ' '.join('"' + word.replace('"', '""') + '"' for word in query.split())
+        if not terms:
+            return []
+        rows = self._db.execute(
+            "SELECT m.conversation_uuid, c.name, m.message_uuid, m.sender, m.created_at,"
+            "       snippet(messages, 0, '[', ']', '...', 16), bm25(messages)"
+            " FROM messages"
+            " JOIN message_info m ON m.id = messages.rowid"
+            " JOIN conversations c ON c.uuid = m.conversation_uuid"
+            " WHERE messages MATCH ? AND c.org_id = ?"
+            " ORDER BY bm25(messages) LIMIT ?",
+            (terms, org_id, limit)
+        ).fetchall()
+        return [
+            {
+                'conversation_uuid': row[0],
+                'name': row[1],
+                'msg_uuid': row[2],
+                'sender': row[3],
+                'timestamp': row[4],
+                'snippet': row[5],
+                'score': -row[6],
+            }
+            for row in rows
+        ]
+
+    def close(self):
+        self._db.close()
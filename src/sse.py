@@ -0,0 +1,131 @@
+import json
+from collections import namedtuple
+
+ServerSentEvent = namedtuple('ServerSentEvent', ['event', 'data', 'id'])
+
+_raw_decode_json = json.JSONDecoder().raw_decode
+
+
+class SSEDecoder:
+    """Incremental text/event-stream decoder working directly on bytes"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data = []
+        self._event = None
+        self._event_names = {}
+        self.last_event_id = None
+
+    def feed(self, chunk):
+        """Feed raw bytes and return the list of events completed by them"""
+        buf = self._buffer
+        buf += chunk
+        if b'\n' not in chunk and b'\r' not in chunk:
+            return []
+
+        # bytes.splitlines only breaks on \r, \n and \r\n, matching the SSE spec
+        lines = bytes(buf).splitlines(True)
+        buf.clear()
+
+        last = lines[-1]
+        # Keep an unterminated tail, or a lone \r that may be half of a \r\n
+        if last[-1:] != b'\n':
+            buf += lines.pop()
+
+        events = []
+        data = self._data
+        for line in lines:
+            line = line.rstrip(b'\r\n')
+            # Fast paths for the lines every completion event is made of
+            if line[:6] == b'data: ':
+                data.append(line[6:])
+            elif not line:
+                if data:
+                    events.append(self._dispatch())
+                    data = self._data
+                else:
+                    self._event = None
+            elif line[:7] == b'event: ':
+                self._event = line[7:]
+            else:
+                self._process_field(line)
+        return events
+
+    def flush(self):
+        """Process whatever is left once the stream has ended"""
+        if self._buffer:
+            tail = bytes(self._buffer).rstrip(b'\r')
+            self._buffer.clear()
+            if tail:
+                self.feed(tail + b'\n')
+        if self._data:
+            return [self._dispatch()]
+        return []
+
+    def _process_field(self, line):
+        if line[0] == 0x3A:  # ':' comment line
+            return
+
+        field, sep, value = line.partition(b':')
+        if sep and value[:1] == b' ':
+            value = value[1:]
+
+        if field == b'data':
+            self._data.append(value)
+        elif field == b'event':
+            self._event = value
+        elif field == b'id':
+            if b'\0' not in value:
+                self.last_event_id = value.decode('utf-8', 'replace')
+
+    def _dispatch(self):
+        data, event = self._data, self._event
+        self._data = []
+        self._event = None
+
+        # Event names repeat constantly, so decode each one only once
+        name = 'message'
+        if event:
+            name = self._event_names.get(event)
+            if name is None:
+                name = self._event_names[event] = event.decode('utf-8', 'replace')
+
+        payload = data[0] if len(data) == 1 else b'\n'.join(data)
+        return ServerSentEvent(name, payload, self.last_event_id)
+
+
+def iter_events(chunks):
+    """Yield ServerSentEvents from an iterable of byte chunks"""
+    decoder = SSEDecoder()
+    for chunk in chunks:
+        if chunk:
+            yield from decoder.feed(chunk)
+    yield from decoder.flush()
+
+
+def decode_event_json(sse):
+    """Decode an event's data as JSON, returning None when it is not JSON"""
+    try:
+        return _raw_decode_json(sse.data.decode('utf-8'))[0]
+    except ValueError:
+        return None
+
+
+def iter_json_events(chunks):
+    """Yield (event_type, payload) for every JSON event in the stream
+
+    The type comes from the payload's 'type' key and falls back to the
+    SSE event name. Events whose data is not JSON are skipped.
+    """
+    decoder = SSEDecoder()
+    for chunk in chunks:
+        if not chunk:
+            continue
+        for sse in decoder.feed(chunk):
+            payload = decode_event_json(sse)
+            if isinstance(payload, dict):
+                yield payload.get('type') or sse.event, payload
+    for sse in decoder.flush():
+        payload = decode_event_json(sse)
+        if isinstance(payload, dict):
+            yield payload.get('type') or sse.event, payload
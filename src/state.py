@@ -0,0 +1,146 @@
+import atexit
+import json
+import os
+import threading
+from contextlib import contextmanager
+from src.config import CONFIG_FILE
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+# Top-level keys older versions kept for the active conversation only
+LEGACY_CONVERSATION_KEYS = {'parent_message_uuid': 'parent_message_uuid', 'conversation_settings': 'settings'}
+
+
+@contextmanager
+def file_lock(path):
+    """Advisory exclusive lock on path + '.lock', held for the duration of the block"""
+    with open(path + ".lock", "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        elif msvcrt:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            elif msvcrt:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def migrate(data):
+    """Move legacy top-level conversation state under conversations[active_conversation]"""
+    active = data.get('active_conversation')
+    conversations = data.setdefault('conversations', {})
+    for legacy_key, key in LEGACY_CONVERSATION_KEYS.items():
+        if legacy_key in data:
+            value = data.pop(legacy_key)
+            if active:
+                conversations.setdefault(active, {}).setdefault(key, value)
+    return data
+
+
+class StateStore:
+    """config.json, read once per process and written back behind the caller
+
+    Changes are kept as a list of key-level operations. flush() takes an
+    advisory lock, re-reads the file, replays only this process's changes
+    on top and replaces the file atomically, so concurrent processes
+    don't lose each other's updates. Parent message and settings are kept
+    per conversation, so runs on different conversations never collide.
+    """
+
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._pending = []
+        self._data = self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return migrate({})
+        with open(self.path, "r") as f:
+            try:
+                return migrate(json.load(f))
+            except ValueError:
+                return migrate({})
+
+    def _apply(self, data, op):
+        kind, key, value = op
+        if kind == 'set':
+            data[key] = value
+        elif kind == 'conversation':
+            conversations = data.setdefault('conversations', {})
+            if value is None:
+                conversations.pop(key, None)
+            else:
+                conversations.setdefault(key, {}).update(value)
+
+    def _change(self, op):
+        with self._lock:
+            self._pending.append(op)
+            self._apply(self._data, op)
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key, value):
+        self._change(('set', key, value))
+
+    def conversation(self, conversation_uuid):
+        """Copy of the stored state (parent_message_uuid, settings) of a conversation"""
+        with self._lock:
+            return dict(self._data.get('conversations', {}).get(conversation_uuid, {}))
+
+    def update_conversation(self, conversation_uuid, **changes):
+        changes = {key: value for key, value in changes.items() if value is not None}
+        if conversation_uuid and changes:
+            self._change(('conversation', conversation_uuid, changes))
+
+    def forget_conversation(self, conversation_uuid):
+        self._change(('conversation', conversation_uuid, None))
+
+    def reload(self):
+        """Re-read the file, keeping changes that haven't been flushed yet"""
+        with self._lock:
+            data = self._read()
+            for op in self._pending:
+                self._apply(data, op)
+            self._data = data
+
+    def flush(self):
+        """Write pending changes, merged into the file's current contents"""
+        from src.helpers import write_file_atomic
+
+        with self._lock:
+            if not self._pending:
+                return
+            with file_lock(self.path):
+                data = self._read()
+                for op in self._pending:
+                    self._apply(data, op)
+                write_file_atomic(self.path, json.dumps(data, indent=2))
+            self._pending = []
+            self._data = data
+
+
+_state = None
+
+
+def get_state():
+    """Return the process-wide state store, flushed when the process exits"""
+    global _state
+    if _state is None:
+        _state = StateStore()
+        atexit.register(_state.flush)
+    return _state
@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+
+_END = object()
+
+
+class StreamReader:
+    """Drain an iterable of byte chunks on a background thread
+
+    Chunks go into a bounded queue, so the socket keeps being read while the
+    consumer is busy writing to a slow terminal or pipe. If the consumer falls
+    so far behind that the queue fills up, the reader waits, and the time it
+    spent waiting is recorded in blocked_time.
+    """
+
+    def __init__(self, chunks, maxsize=256):
+        self.chunks = chunks
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.maxsize = maxsize
+        self.blocked_time = 0.0
+        self.chunk_count = 0
+        self.byte_count = 0
+        self.peak_size = 0
+        self._error = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Ask the reader thread to stop and unblock it if it is waiting"""
+        self._stopped.set()
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            start = time.perf_counter()
+            while not self._stopped.is_set():
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            self.blocked_time += time.perf_counter() - start
+
+    def _run(self):
+        try:
+            for chunk in self.chunks:
+                if self._stopped.is_set():
+                    return
+                if chunk:
+                    self.chunk_count += 1
+                    self.byte_count += len(chunk)
+                    self._put(chunk)
+                    self.peak_size = max(self.peak_size, self.queue.qsize())
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(_END)
+
+    def iter_chunks(self, on_idle=None):
+        """Yield chunks as they arrive, calling on_idle before waiting for more"""
+        try:
+            while True:
+                if on_idle is not None and self.queue.empty():
+                    on_idle()
+                chunk = self.queue.get()
+                if chunk is _END:
+                    break
+                yield chunk
+        finally:
+            self.stop()
+        if self._error is not None:
+            raise self._error
+
+    def summary(self):
+        return (f"{self.chunk_count} chunks, {self.byte_count / 1024:.1f} KB, "
+                f"reader blocked {self.blocked_time:.3f}s, "
+                f"peak buffer {self.peak_size}/{self.maxsize}")
+
+
+class FrameWriter:
+    """Coalesce many small writes into at most `fps` real writes per second"""
+
+    def __init__(self, write, fps=30):
+        self._write = write
+        self.interval = 1.0 / fps
+        self._parts = []
+        self._last_flush = 0.0
+
+    def write(self, text):
+        self._parts.append(text)
+        self.tick()
+
+    def tick(self):
+        if self._parts and time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if self._parts:
+            text = ''.join(self._parts)
+            self._parts = []
+            self._write(text)
@@ -0,0 +1,212 @@
+"""How every claude.ai request is sent: retries with backoff, and a circuit breaker
+
+Idempotent requests (GET) are retried on connection errors, timeouts, 429
+and 5xx responses with exponential backoff and jitter, honouring
+Retry-After. Requests that change something are sent once, since sending
+a completion or a create twice would do it twice. All requests pass
+through one process-wide circuit breaker: after FAILURE_THRESHOLD
+failures in a row it opens and requests fail at once, until RESET_TIMEOUT
+has passed and a single trial request is let through.
+
+Imports nothing heavy, so src.claude can use it without pulling requests
+into commands that never go online.
+"""
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import click
+
+# Responses worth another attempt: rate limited or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Responses that count as claude.ai failing; a 429 means it is up but busy
+FAILURE_STATUSES = {500, 502, 503, 504}
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+RETRIES = 3
+BACKOFF = 0.5
+
+# Longer waits than this aren't slept through; the response goes back to the caller
+MAX_DELAY = 30
+
+DEFAULT_TIMEOUT = 30
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30
+
+
+def retry_delay(response, attempt, backoff=None):
+    """Honour Retry-After when given, otherwise exponential backoff with jitter"""
+    backoff = BACKOFF if backoff is None else backoff
+    retry_after = getattr(response, 'headers', {}).get('Retry-After') if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(MAX_DELAY, backoff * 2 ** attempt * (0.5 + random.random()))
+
+
+_CircuitOpen = None
+
+
+def circuit_open_error(message):
+    """The requests.ConnectionError raised for a request the open circuit didn't send"""
+    global _CircuitOpen
+    if _CircuitOpen is None:
+        import requests
+
+        class CircuitOpen(requests.ConnectionError):
+            """A request refused by the circuit breaker without being sent"""
+
+        _CircuitOpen = CircuitOpen
+    return _CircuitOpen(message)
+
+
+def never_sent(error):
+    """Whether a request failed before any of it could reach the server
+
+    True for the circuit breaker's refusals and for connections that were
+    never made (DNS failures, refused connections, connect timeouts).
+    """
+    import requests
+    from urllib3.exceptions import NewConnectionError, ConnectTimeoutError
+
+    if _CircuitOpen is not None and isinstance(error, _CircuitOpen):
+        return True
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    # requests wraps urllib3's MaxRetryError, whose reason is the underlying failure
+    reason = getattr(error.args[0], 'reason', error.args[0])
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class CircuitBreaker:
+    """Stops sending requests while claude.ai keeps failing
+
+    closed: requests flow. open: requests fail at once for reset_timeout
+    seconds. half-open: one trial request decides whether to close again.
+    """
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def before(self):
+        """Raise if the circuit is open; lets one trial through once reset_timeout has passed
+
+        Returns True for that trial request, which must be passed on to record().
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining <= 0 and not self.trial:
+                self.trial = True
+                return True
+        raise circuit_open_error(
+            f"claude.ai failed {self.threshold} times in a row; not retrying for another {max(remaining, 1):.0f}s"
+        )
+
+    def record(self, ok, trial=False):
+        """Count a request's outcome; returns True while the circuit is open
+
+        Only the trial request before() admitted ends the half-open state;
+        requests that were already in flight when the circuit opened don't.
+        """
+        with self._lock:
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if trial or (self.opened_at is None and self.failures >= self.threshold):
+                    self.opened_at = time.monotonic()
+                    self.trips += 1
+            if trial:
+                self.trial = False
+            return self.opened_at is not None
+
+
+breaker = CircuitBreaker()
+
+_stats = {'requests': 0, 'retries': 0, 'backoff': 0.0}
+_stats_lock = threading.Lock()
+_verbose = False
+
+
+def set_verbose(verbose):
+    global _verbose
+    _verbose = verbose
+
+
+def log(text):
+    """Print a line to stderr when -v is on"""
+    if _verbose:
+        click.echo(text, err=True)
+
+
+def stats():
+    """Requests sent, retries, seconds spent backing off and circuit trips so far"""
+    with _stats_lock:
+        return dict(_stats, trips=breaker.trips)
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def request(session, method, url, retries=RETRIES, **kwargs):
+    """Send a request through the circuit breaker, retrying idempotent ones"""
+    import requests
+
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    send = getattr(session, method.lower())
+    attempts = retries + 1 if method in IDEMPOTENT_METHODS else 1
+
+    for attempt in range(attempts):
+        trial = breaker.before()
+        _count('requests')
+        try:
+            response = send(url, **kwargs)
+        except requests.RequestException as e:
+            # Once the circuit is open there is no point in waiting to try again
+            if breaker.record(False, trial) or attempt == attempts - 1:
+                raise
+            reason, delay = type(e).__name__, retry_delay(None, attempt)
+        else:
+            is_open = breaker.record(response.status_code not in FAILURE_STATUSES, trial)
+            if response.status_code not in RETRY_STATUSES or is_open or attempt == attempts - 1:
+                return response
+            reason, delay = f"status {response.status_code}", retry_delay(response, attempt)
+            if delay > MAX_DELAY:
+                return response
+            response.close()
+
+        log(f"{method} {urlsplit(url).path}: {reason}, retry {attempt + 1}/{retries} in {delay:.1f}s")
+        _count('retries')
+        _count('backoff', delay)
+        time.sleep(delay)
+
+
+def report(since):
+    """Summary line of the requests made since a stats() snapshot"""
+    now = stats()
+    line = (
+        f"claude.ai: {now['requests'] - since['requests']} requests, "
+        f"{now['retries'] - since['retries']} retries, "
+        f"{now['backoff'] - since['backoff']:.1f}s backing off"
+    )
+    if now['trips'] > since['trips']:
+        line += f", circuit opened {now['trips'] - since['trips']} times"
+    return line
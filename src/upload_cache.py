@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+UPLOAD_CACHE_FILE = "uploads.db"
+MAX_UPLOADS = 2000
+MAX_HASHED_FILES = 5000
+
+HASH_CHUNK = 1024 * 1024
+
+
+def hash_file(path):
+    """sha256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UploadCache:
+    """Persistent map from file contents to the file_uuid claude.ai gave them, per organization
+
+    Files are identified by the sha256 of their contents, so a copy or a
+    file that was touched without changing still matches. The hash of
+    each path is kept with its size and mtime, and only computed again
+    when either changes.
+    """
+
+    def __init__(self, path=UPLOAD_CACHE_FILE, max_uploads=MAX_UPLOADS, max_hashed_files=MAX_HASHED_FILES):
+        self.path = path
+        self.max_uploads = max_uploads
+        self.max_hashed_files = max_hashed_files
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER,"
+            " mtime_ns INTEGER,"
+            " sha256 TEXT,"
+            " used_at REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " org_id TEXT,"
+            " sha256 TEXT,"
+            " size INTEGER,"
+            " file_uuid TEXT,"
+            " used_at REAL,"
+            " PRIMARY KEY (org_id, sha256))"
+        )
+        self._db.commit()
+
+    def content_hash(self, path):
+        """sha256 of a file, reusing the stored one while its size and mtime are unchanged"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256 FROM hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        if row:
+            return row[0]
+
+        digest = hash_file(path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest, time.time())
+            )
+            self._evict('hashes', 'path', self.max_hashed_files)
+            self._db.commit()
+        return digest
+
+    def get(self, org_id, sha256):
+        """The file_uuid of an earlier upload of these contents to org_id, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT file_uuid FROM uploads WHERE org_id = ? AND sha256 = ?",
+                (org_id, sha256)
+            ).fetchone()
+            if not row:
+                return None
+            self._db.execute(
+                "UPDATE uploads SET used_at = ? WHERE org_id = ? AND sha256 = ?",
+                (time.time(), org_id, sha256)
+            )
+            self._db.commit()
+        return row[0]
+
+    def put(self, org_id, sha256, size, file_uuid):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?)",
+                (org_id, sha256, size, file_uuid, time.time())
+            )
+            self._evict('uploads', 'file_uuid', self.max_uploads)
+            self._db.commit()
+
+    def forget(self, org_id, file_uuids):
+        """Drop uploads claude.ai no longer accepts"""
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM uploads WHERE org_id = ? AND file_uuid = ?",
+                [(org_id, file_uuid) for file_uuid in file_uuids]
+            )
+            self._db.commit()
+
+    def _evict(self, table, key, max_entries):
+        count = self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if count > max_entries:
+            self._db.execute(
+                f"DELETE FROM {table} WHERE {key} IN"
+                f" (SELECT {key} FROM {table} ORDER BY used_at ASC LIMIT ?)",
+                (count - max_entries,)
+            )
+
+    def close(self):
+        self._db.close()
+
+
+_upload_cache = None
+_upload_cache_lock = threading.Lock()
+
+
+def get_upload_cache():
+    """Return the process-wide upload cache"""
+    global _upload_cache
+    with _upload_cache_lock:
+        if _upload_cache is None:
+            _upload_cache = UploadCache()
+    return _upload_cache